@@ -13,6 +13,7 @@
 
   const state = {
     library: { songs: [] },
+    libraryEtag: null,
     expandedSongs: new Set(),
     expandedVersions: new Set(),
     selectedSongs: new Set(),
@@ -1512,6 +1513,36 @@
     restorePlayback(snapshot);
   }
 
+  function followImportJob(job) {
+    if (!job?.job_id || job.status !== 'running') return Promise.resolve(job || {});
+    return new Promise((resolve, reject) => {
+      const es = new EventSource(`/api/library/import_scan/${encodeURIComponent(job.job_id)}/events`);
+      let last = job;
+      es.onmessage = (evt) => {
+        try {
+          last = JSON.parse(evt.data);
+        } catch (_err) {
+          return;
+        }
+        if (syncStatus && last.status === 'running') {
+          const done = (last.imported || 0) + (last.errors?.length || 0);
+          syncStatus.textContent = `Importing ${done}/${last.total || 0}…`;
+        }
+        if (last.status !== 'running') {
+          es.close();
+          resolve(last);
+        }
+      };
+      es.onerror = () => {
+        es.close();
+        fetch(`/api/library/import_scan/${encodeURIComponent(job.job_id)}`, { cache: 'no-store' })
+          .then((res) => (res.ok ? res.json() : Promise.reject(new Error('import_status_failed'))))
+          .then((snapshot) => (snapshot.status === 'running' ? followImportJob(snapshot) : snapshot))
+          .then(resolve, reject);
+      };
+    });
+  }
+
   async function runSync() {
     const snapshot = capturePlayback();
     if (!syncBtn) return;
@@ -1524,7 +1555,8 @@
         body: JSON.stringify({ delete_after_import: true }),
       });
       if (!res.ok) throw new Error(await res.text());
-      const summary = await res.json();
+      const job = await res.json();
+      const summary = await followImportJob(job);
       await loadLibrary();
       refreshBrowser();
       if (syncStatus) {
@@ -1545,10 +1577,16 @@
   async function loadLibrary() {
     const snapshot = capturePlayback();
     try {
-      const res = await fetch('/api/library', { cache: 'no-store' });
+      const headers = state.libraryEtag ? { 'If-None-Match': state.libraryEtag } : {};
+      const res = await fetch('/api/library', { cache: 'no-store', headers });
+      if (res.status === 304) {
+        restorePlayback(snapshot);
+        return;
+      }
       if (!res.ok) throw new Error('library_failed');
       const data = await res.json();
       state.library = data || { songs: [] };
+      state.libraryEtag = res.headers.get('ETag');
       renderList();
       updateBulkButtons();
       refreshActiveDetail();
@@ -210,6 +210,7 @@
       search: localStorage.getItem(SEARCH_KEY) || '',
       songs: [],
       disabledSongIds: new Set(),
+      revision: null,
     };
 
     container.innerHTML = `
@@ -754,15 +755,37 @@
       }
     }
 
+    async function applyLibraryChanges(signal) {
+      // Returns false when the change feed cannot be applied and a full reload is needed.
+      const res = await fetch(`/api/library/changes?since=${encodeURIComponent(state.revision)}`, { cache: 'no-store', signal });
+      if (!res.ok) return false;
+      const data = await res.json();
+      if (data.reset) return false;
+      if (data.revision === state.revision) return true;
+      const removed = new Set([
+        ...(Array.isArray(data.deleted_songs) ? data.deleted_songs : []),
+        ...(Array.isArray(data.songs) ? data.songs.map((song) => song.song_id) : []),
+      ]);
+      state.songs = state.songs.filter((song) => !removed.has(song.song_id)).concat(data.songs || []);
+      state.revision = data.revision;
+      renderList();
+      return true;
+    }
+
     async function loadLibrary() {
       try {
         const controller = new AbortController();
         const timeout = setTimeout(() => controller.abort(), 12000);
+        if (state.revision !== null && await applyLibraryChanges(controller.signal)) {
+          clearTimeout(timeout);
+          return;
+        }
         const res = await fetch('/api/library', { cache: 'no-store', signal: controller.signal });
         clearTimeout(timeout);
         if (!res.ok) throw new Error('library_failed');
         const data = await res.json();
         state.songs = Array.isArray(data.songs) ? data.songs : [];
+        state.revision = Number.isInteger(data.revision) ? data.revision : null;
         renderList();
       } catch (_err) {
         console.error('Library load failed', _err);
@@ -12,11 +12,13 @@ from pathlib import Path
 from datetime import datetime
 from typing import List
 from fastapi import APIRouter, Request, HTTPException, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sonustemper.tools import bundle_root, is_frozen
 from sonustemper.storage import DATA_ROOT, PRESETS_DIR
 from sonustemper import library_db as library_index
+from sonustemper import library_async
 
 # New tandem UI router (mounted at root).
 
@@ -326,7 +328,7 @@ async def starter(request: Request):
 
 
 @router.get("/mastering", response_class=HTMLResponse)
-async def mastering_page(request: Request):
+def mastering_page(request: Request):
     response = TEMPLATES.TemplateResponse(
         "pages/mastering.html",
         _page_context(
@@ -437,7 +439,7 @@ def _render_sections(request: Request, util: str) -> HTMLResponse:
 
 
 @router.get("/partials/files_sections", response_class=HTMLResponse)
-async def files_sections(request: Request, util: str = "mastering"):
+def files_sections(request: Request, util: str = "mastering"):
     return _render_sections(request, util)
 
 
@@ -458,7 +460,7 @@ def _recent_runs(limit: int = 12) -> List[dict]:
 
 
 @router.get("/partials/master_prev", response_class=HTMLResponse)
-async def master_prev(request: Request):
+def master_prev(request: Request):
     runs = _recent_runs()
     return TEMPLATES.TemplateResponse(
         "partials/master_prev.html",
@@ -550,6 +552,7 @@ def _list_mastering_outputs(q: str, limit: int, context: str = "") -> list[dict]
             continue
         run_mtime = d.stat().st_mtime if d.exists() else 0
         outputs = _run_outputs(d.name)
+        _register_master_versions(d.name, outputs)
         for out in outputs:
             stem = out.get("name") or ""
             display_title = out.get("display_title") or stem or d.name
@@ -721,7 +724,7 @@ def _list_tagging_uploads(q: str, limit: int, context: str = "") -> list[dict]:
 
 
 @router.get("/partials/library_list", response_class=HTMLResponse)
-async def library_list(request: Request, view: str, q: str = "", limit: int = 200):
+def library_list(request: Request, view: str, q: str = "", limit: int = 200):
     view = (view or "").strip().lower()
     context = (request.query_params.get("context") or "").strip().lower()
     scope = (request.query_params.get("scope") or "").strip().lower()
@@ -1427,7 +1430,6 @@ def _run_outputs(song: str) -> list[dict]:
             "metric_pills": _metric_pills(m),
             "badges": badges,
         })
-    _register_master_versions(song, items)
     return items
 
 
@@ -1441,7 +1443,8 @@ async def master_output(request: Request, song: str = ""):
         )
     root = _util_root("mastering", "output")
     base = _safe_rel(root, song)
-    items = _run_outputs(song)
+    items = await run_in_threadpool(_run_outputs, song)
+    await library_async.run(_register_master_versions, song, items)
     return TEMPLATES.TemplateResponse(
         "partials/master_output.html",
         {"request": request, "song": song, "items": items},
@@ -1469,7 +1472,7 @@ def _detail_title(target: Path, utility: str, section: str) -> dict:
 
 
 @router.get("/partials/file_detail", response_class=HTMLResponse)
-async def file_detail(request: Request, utility: str, section: str, rel: str):
+def file_detail(request: Request, utility: str, section: str, rel: str):
     root = _util_root(utility, section)
     target = _safe_rel(root, rel)
     if not target.exists() or target.is_dir():
@@ -1721,7 +1724,7 @@ def _file_manager_data(category: str, q: str = "") -> dict:
 
 
 @router.get("/partials/file_manager_list", response_class=HTMLResponse)
-async def file_manager_list(request: Request, category: str = "", q: str = ""):
+def file_manager_list(request: Request, category: str = "", q: str = ""):
     data = _file_manager_data(category, q)
     return TEMPLATES.TemplateResponse(
         "partials/file_manager_list.html",
@@ -1730,7 +1733,7 @@ async def file_manager_list(request: Request, category: str = "", q: str = ""):
 
 
 @router.post("/actions/delete", response_class=HTMLResponse)
-async def delete_items(request: Request, util: str = Form(...), section: str = Form(...), delete_all: str = Form(default=""), rels: list[str] = Form(default=[]), context: str = Form(default=""), category: str = Form(default="")):
+def delete_items(request: Request, util: str = Form(...), section: str = Form(...), delete_all: str = Form(default=""), rels: list[str] = Form(default=[]), context: str = Form(default=""), category: str = Form(default="")):
     util = util if util in ("mastering", "tagging", "presets", "analysis") else "mastering"
     root = _util_root(util, section)
     to_delete = []
@@ -0,0 +1,53 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from . import library_db
+from .logging_util import log_debug
+
+# Async facade over library_db for code running on the event loop. Every call is
+# dispatched to a small dedicated executor, so a slow query never stalls SSE
+# streams and DB work does not compete with ffmpeg jobs in the default pool.
+# Readers keep one cached connection per executor thread (see library_db);
+# writes still serialize on library_db's writer lock.
+#
+#   song = await library_async.upsert_song_for_source(rel, title, ...)
+#   items = await library_async.run(some_sync_helper, arg)
+DB_EXECUTOR_WORKERS = max(1, int(os.getenv("LIBRARY_DB_EXECUTOR_WORKERS", "4")))
+_EXECUTOR: ThreadPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(
+                    max_workers=DB_EXECUTOR_WORKERS,
+                    thread_name_prefix="library-db",
+                )
+                log_debug("db", "async executor started", workers=DB_EXECUTOR_WORKERS)
+    return _EXECUTOR
+
+
+async def run(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor(), functools.partial(fn, *args, **kwargs))
+
+
+def __getattr__(name: str):
+    # library_async.<fn>(...) is the awaitable form of library_db.<fn>(...).
+    target = getattr(library_db, name, None) if not name.startswith("_") else None
+    if not callable(target) or isinstance(target, type):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    @functools.wraps(target)
+    async def _call(*args: Any, **kwargs: Any) -> Any:
+        return await run(target, *args, **kwargs)
+
+    globals()[name] = _call
+    return _call
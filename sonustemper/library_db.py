@@ -1,4 +1,8 @@
+import base64
+import hashlib
 import json
+import os
+import re
 import sqlite3
 import threading
 import time
@@ -23,10 +27,36 @@ from .logging_util import log_debug, log_summary, log_error
 
 
 LIBRARY_VERSION = 1
-SCHEMA_VERSION = 1
+SCHEMA_VERSION = 3
 _WRITE_LOCK = threading.Lock()
 _INIT_LOCK = threading.Lock()
 _DB_READY = False
+# Readers keep one connection per thread; all writes go through a single connection
+# guarded by _WRITE_LOCK. close() on a pooled connection hands it back instead.
+_READ_LOCAL = threading.local()
+_WRITER: sqlite3.Connection | None = None
+_WAL_MODE = False
+_FTS_ENABLED = False
+_LAST_CHECKPOINT = 0.0
+_LAST_CHECKPOINT_UTC: str | None = None
+_LAST_CHECKPOINT_RESULT: tuple[int, int, int] | None = None
+LIBRARY_DB_CHECKPOINT_SEC = float(os.getenv("LIBRARY_DB_CHECKPOINT_SEC", "60"))
+# A WAL larger than this is checkpointed on the next write instead of waiting for the
+# interval, and is truncated back to this size once a checkpoint has drained it.
+LIBRARY_DB_WAL_LIMIT_BYTES = int(float(os.getenv("LIBRARY_DB_WAL_CHECKPOINT_MB", "16")) * 1024 * 1024)
+# Maintenance (run_maintenance): ANALYZE once this many rows were bulk-written since the last
+# one, PRAGMA optimize otherwise; incremental vacuum is opt-in because enabling it rewrites
+# an existing database once.
+LIBRARY_DB_ANALYZE_ROWS = int(os.getenv("LIBRARY_DB_ANALYZE_ROWS", "1000"))
+LIBRARY_DB_INCREMENTAL_VACUUM = os.getenv("LIBRARY_DB_INCREMENTAL_VACUUM", "0") == "1"
+LIBRARY_DB_VACUUM_PAGES = max(1, int(os.getenv("LIBRARY_DB_VACUUM_PAGES", "2048")))
+_ROWS_SINCE_ANALYZE = 0
+_LAST_ANALYZE_UTC: str | None = None
+_LAST_OPTIMIZE_UTC: str | None = None
+_LAST_VACUUM_UTC: str | None = None
+LIBRARY_CHANGES_KEEP = int(os.getenv("LIBRARY_CHANGES_KEEP", "10000"))
+LIBRARY_CHANGES_PRUNE_SEC = 60.0
+_LAST_CHANGES_PRUNE = 0.0
 
 METRIC_FIELDS = [
     "duration_sec",
@@ -97,6 +127,136 @@ METRIC_SUMMARY_KEYS = {
     "width",
 }
 
+# Every write to a library table appends to library_changes; its AUTOINCREMENT sequence is the
+# library revision (used for ETags and the change feed) and never goes backwards after pruning.
+_CHANGE_SONG_EXPR = {
+    "songs": "{row}.song_id",
+    "versions": "{row}.song_id",
+    "song_metrics": "{row}.song_id",
+    "renditions": "(SELECT song_id FROM versions WHERE version_id = {row}.version_id)",
+    "version_metrics": "(SELECT song_id FROM versions WHERE version_id = {row}.version_id)",
+}
+
+
+def _change_triggers_sql() -> str:
+    parts = []
+    for table, song_expr in _CHANGE_SONG_EXPR.items():
+        for event, row, op in (("INSERT", "NEW", "upsert"), ("UPDATE", "NEW", "upsert"), ("DELETE", "OLD", "delete")):
+            parts.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_changes_{table}_{event.lower()} "
+                f"AFTER {event} ON {table} BEGIN "
+                f"INSERT INTO library_changes (song_id, entity, op) "
+                f"VALUES ({song_expr.format(row=row)}, '{table}', '{op}'); END;"
+            )
+    return "\n".join(parts)
+
+
+# Cached per-version payloads are invalidated by bumping a generation counter, so a listing that
+# rebuilt a payload from an older snapshot can never overwrite a newer invalidation.
+_PAYLOAD_BUMP_SQL = (
+    "INSERT INTO version_payloads (version_id, gen, payload_json) VALUES (NEW.version_id, 1, NULL) "
+    "ON CONFLICT(version_id) DO UPDATE SET gen = gen + 1, payload_json = NULL;"
+)
+# A rendition moved to another version also changes the payload of the version it left.
+_PAYLOAD_BUMP_OLD_SQL = _PAYLOAD_BUMP_SQL.replace("NEW.version_id", "OLD.version_id")
+_PAYLOAD_CLEAR_SQL = "UPDATE version_payloads SET gen = gen + 1, payload_json = NULL WHERE version_id = OLD.version_id;"
+_PAYLOAD_TRIGGERS = (
+    ("versions", "update", "UPDATE", _PAYLOAD_BUMP_SQL),
+    ("version_metrics", "insert", "INSERT", _PAYLOAD_BUMP_SQL),
+    ("version_metrics", "update", "UPDATE", _PAYLOAD_BUMP_SQL),
+    ("version_metrics", "delete", "DELETE", _PAYLOAD_CLEAR_SQL),
+    ("renditions", "insert", "INSERT", _PAYLOAD_BUMP_SQL),
+    # content_hash backfills don't change the payload.
+    ("renditions", "update", "UPDATE OF version_id, format, rel", _PAYLOAD_BUMP_SQL),
+    ("renditions", "move", "UPDATE OF version_id", _PAYLOAD_BUMP_OLD_SQL),
+    ("renditions", "delete", "DELETE", _PAYLOAD_CLEAR_SQL),
+)
+
+
+def _payload_triggers_sql() -> str:
+    return "\n".join(
+        f"CREATE TRIGGER IF NOT EXISTS trg_payload_{table}_{name} AFTER {event} ON {table} BEGIN {body} END;"
+        for table, name, event, body in _PAYLOAD_TRIGGERS
+    )
+
+
+def _metric_indexes_sql() -> str:
+    # (metric, id) so range filters and metric sorts, including their tie-break, stay on the index.
+    return "\n".join(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_{field} ON {table}({field}, {key});"
+        for table, key in (("song_metrics", "song_id"), ("version_metrics", "version_id"))
+        for field in METRIC_FIELDS
+    )
+
+
+# Full-text search keeps one FTS5 document per song (rowid = songs.rowid): its title, version
+# titles/labels, voicings/profiles and the MP3 tags of its files. Triggers rebuild a song's
+# document whenever one of those inputs changes.
+_SEARCH_DOC_SELECT = """
+    SELECT s.rowid, s.title,
+        (SELECT group_concat(v.title || ' ' || v.label, ' ') FROM versions v WHERE v.song_id = s.song_id),
+        (SELECT group_concat(coalesce(v.voicing, '') || ' ' || coalesce(v.loudness_profile, ''), ' ')
+           FROM versions v WHERE v.song_id = s.song_id),
+        (SELECT group_concat(coalesce(t.title, '') || ' ' || coalesce(t.artist, '') || ' ' || coalesce(t.album, ''), ' ')
+           FROM media_tags t
+           WHERE t.rel = s.source_rel
+              OR t.rel IN (SELECT r.rel FROM renditions r JOIN versions v ON v.version_id = r.version_id
+                           WHERE v.song_id = s.song_id))
+    FROM songs s
+"""
+_TAGGED_SONGS_SQL = (
+    "SELECT song_id FROM songs WHERE source_rel = {row}.rel UNION "
+    "SELECT v.song_id FROM renditions r JOIN versions v ON v.version_id = r.version_id WHERE r.rel = {row}.rel"
+)
+_SEARCH_TRIGGERS = (
+    ("songs", "insert", "INSERT", "", "NEW.song_id"),
+    ("songs", "update", "UPDATE OF title, source_rel", "", "NEW.song_id"),
+    ("versions", "insert", "INSERT", "", "NEW.song_id"),
+    ("versions", "update", "UPDATE OF song_id, title, label, voicing, loudness_profile", "", "NEW.song_id, OLD.song_id"),
+    ("versions", "delete", "DELETE", "", "OLD.song_id"),
+    ("renditions", "insert", "INSERT", "WHEN EXISTS (SELECT 1 FROM media_tags WHERE rel = NEW.rel)",
+     "SELECT song_id FROM versions WHERE version_id = NEW.version_id"),
+    ("renditions", "delete", "DELETE", "WHEN EXISTS (SELECT 1 FROM media_tags WHERE rel = OLD.rel)",
+     "SELECT song_id FROM versions WHERE version_id = OLD.version_id"),
+    ("media_tags", "insert", "INSERT", "", _TAGGED_SONGS_SQL.format(row="NEW")),
+    ("media_tags", "update", "UPDATE", "", _TAGGED_SONGS_SQL.format(row="NEW")),
+    ("media_tags", "delete", "DELETE", "", _TAGGED_SONGS_SQL.format(row="OLD")),
+)
+
+
+def _search_triggers_sql() -> str:
+    parts = [
+        "CREATE TRIGGER IF NOT EXISTS trg_search_songs_delete AFTER DELETE ON songs BEGIN "
+        "DELETE FROM library_fts WHERE rowid = OLD.rowid; END;"
+    ]
+    for table, name, event, when, song_ids in _SEARCH_TRIGGERS:
+        parts.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_search_{table}_{name} AFTER {event} ON {table} {when} BEGIN "
+            f"DELETE FROM library_fts WHERE rowid IN (SELECT rowid FROM songs WHERE song_id IN ({song_ids})); "
+            f"INSERT INTO library_fts (rowid, title, versions, voicing, tags) "
+            f"{_SEARCH_DOC_SELECT} WHERE s.song_id IN ({song_ids}); END;"
+        )
+    return "\n".join(parts)
+
+
+def _ensure_search_index(conn: sqlite3.Connection) -> bool:
+    """Create (and on first creation populate) the FTS5 index; False if this SQLite lacks FTS5."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'library_fts'").fetchone()
+    if not exists:
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE library_fts USING fts5("
+                "title, versions, voicing, tags, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        except sqlite3.OperationalError as exc:
+            log_summary("db", "fts5 unavailable; search falls back to title LIKE", err=str(exc))
+            return False
+        conn.execute(f"INSERT INTO library_fts (rowid, title, versions, voicing, tags) {_SEARCH_DOC_SELECT}")
+        log_debug("db", "search index built", rows=conn.execute("SELECT count(*) FROM library_fts").fetchone()[0])
+    conn.executescript(_search_triggers_sql())
+    return True
+
+
 def _has_column(conn: sqlite3.Connection, table: str, col: str) -> bool:
     rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
     return any((row[1] if len(row) > 1 else row["name"]) == col for row in rows)
@@ -193,6 +353,27 @@ def _apply_migrations(conn: sqlite3.Connection, from_v: int, to_v: int) -> None:
                 (voicing, profile, meta_json, row["version_id"]),
             )
         log_summary("db", "migration applied", from_v=from_v, to_v=to_v)
+    if from_v < 2:
+        for table, column in (("songs", "content_hash"), ("songs", "pcm_hash"), ("renditions", "content_hash")):
+            if not _has_column(conn, table, column):
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+                log_debug("db", "migrated", action="add_column", table=table, column=column)
+    if from_v < 3:
+        if not _has_column(conn, "versions", "strength"):
+            conn.execute("ALTER TABLE versions ADD COLUMN strength REAL")
+            log_debug("db", "migrated", action="add_column", table="versions", column="strength")
+        updates = []
+        for row in conn.execute("SELECT version_id, meta_json FROM versions WHERE meta_json LIKE '%strength%'"):
+            try:
+                meta = json.loads(row["meta_json"] or "{}")
+            except Exception:
+                continue
+            if isinstance(meta, dict):
+                strength = _coerce_float(meta.get("strength"))
+                if strength is not None:
+                    updates.append((strength, row["version_id"]))
+        conn.executemany("UPDATE versions SET strength = ? WHERE version_id = ?", updates)
+        log_debug("db", "migrated strength from meta_json", rows=len(updates))
 
 
 def _row_get(obj: Any, key: str, default: Any = None) -> Any:
@@ -224,34 +405,112 @@ def _clean_title(raw: str) -> str:
     return cleaned or "Untitled"
 
 
-def _connect() -> sqlite3.Connection:
+class _PooledConnection(sqlite3.Connection):
+    _release = None
+
+    def close(self) -> None:
+        if self.in_transaction:
+            self.rollback()
+        if self._release is None:
+            super().close()
+        else:
+            self._release(self)
+
+
+def _connect(factory: type[sqlite3.Connection] = sqlite3.Connection) -> sqlite3.Connection:
     ensure_data_roots()
-    conn = sqlite3.connect(LIBRARY_DB, timeout=30, check_same_thread=False)
+    conn = sqlite3.connect(LIBRARY_DB, timeout=30, check_same_thread=False, factory=factory)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA busy_timeout = 30000")
     return conn
 
 
+def _read_conn() -> sqlite3.Connection:
+    """Thread-local read connection; close() keeps it open for the next call on this thread."""
+    conn = getattr(_READ_LOCAL, "conn", None)
+    if conn is None:
+        conn = _connect(_PooledConnection)
+        conn._release = lambda _conn: None
+        _READ_LOCAL.conn = conn
+    return conn
+
+
+def _write_conn() -> sqlite3.Connection:
+    """The shared writer connection. Callers must hold _WRITE_LOCK."""
+    global _WRITER
+    if _WRITER is None:
+        _WRITER = _connect(_PooledConnection)
+        _WRITER._release = _release_writer
+        if _WAL_MODE and LIBRARY_DB_WAL_LIMIT_BYTES > 0:
+            _WRITER.execute(f"PRAGMA journal_size_limit = {LIBRARY_DB_WAL_LIMIT_BYTES}")
+    return _WRITER
+
+
+def _wal_bytes() -> int:
+    try:
+        return os.path.getsize(f"{LIBRARY_DB}-wal")
+    except OSError:
+        return 0
+
+
+def _checkpoint(conn: sqlite3.Connection, reason: str) -> tuple[int, int, int] | None:
+    global _LAST_CHECKPOINT, _LAST_CHECKPOINT_UTC, _LAST_CHECKPOINT_RESULT
+    _LAST_CHECKPOINT = time.monotonic()
+    # PASSIVE never blocks readers; pages still pinned by a reader are copied on a later pass.
+    try:
+        row = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    except sqlite3.Error as exc:
+        log_debug("db", "wal checkpoint failed", reason=reason, err=str(exc))
+        return None
+    _LAST_CHECKPOINT_UTC = _now_iso()
+    _LAST_CHECKPOINT_RESULT = (row[0], row[1], row[2]) if row else None
+    if row:
+        log_debug("db", "wal checkpoint", reason=reason, busy=row[0], wal_pages=row[1], checkpointed=row[2])
+    return _LAST_CHECKPOINT_RESULT
+
+
+def _release_writer(conn: sqlite3.Connection) -> None:
+    global _LAST_CHANGES_PRUNE
+    now = time.monotonic()
+    if now - _LAST_CHANGES_PRUNE >= LIBRARY_CHANGES_PRUNE_SEC:
+        _LAST_CHANGES_PRUNE = now
+        try:
+            res = conn.execute(
+                "DELETE FROM library_changes WHERE rev <= ?",
+                (_library_revision(conn) - LIBRARY_CHANGES_KEEP,),
+            )
+            conn.commit()
+            if res.rowcount:
+                log_debug("db", "library_changes pruned", rows=res.rowcount)
+        except sqlite3.Error as exc:
+            log_debug("db", "library_changes prune failed", err=str(exc))
+    if not _WAL_MODE:
+        return
+    if LIBRARY_DB_CHECKPOINT_SEC > 0 and now - _LAST_CHECKPOINT >= LIBRARY_DB_CHECKPOINT_SEC:
+        _checkpoint(conn, "interval")
+    elif LIBRARY_DB_WAL_LIMIT_BYTES > 0 and _wal_bytes() > LIBRARY_DB_WAL_LIMIT_BYTES:
+        _checkpoint(conn, "wal_size")
+
+
+def _enable_incremental_vacuum(conn: sqlite3.Connection) -> None:
+    row = conn.execute("PRAGMA auto_vacuum").fetchone()
+    if row and int(row[0]) == 2:
+        return
+    # auto_vacuum only changes on an empty database or through a full VACUUM (one-time rewrite).
+    t0 = time.monotonic()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    log_summary("db", "incremental vacuum enabled", ms=round((time.monotonic() - t0) * 1000, 1))
+
+
 def init_db() -> None:
-    global _DB_READY
+    global _DB_READY, _WAL_MODE, _FTS_ENABLED
     if _DB_READY:
-        conn = _connect()
-        try:
-            uv = _get_user_version(conn)
-            if uv == SCHEMA_VERSION and _has_column(conn, "versions", "meta_json"):
-                return
-        finally:
-            conn.close()
+        return
     with _INIT_LOCK:
         if _DB_READY:
-            conn = _connect()
-            try:
-                uv = _get_user_version(conn)
-                if uv == SCHEMA_VERSION and _has_column(conn, "versions", "meta_json"):
-                    return
-            finally:
-                conn.close()
+            return
         ensure_data_roots()
         with _WRITE_LOCK:
             conn = _connect()
@@ -271,7 +530,10 @@ def init_db() -> None:
                     conn.execute("PRAGMA synchronous = NORMAL")
                 conn.execute("PRAGMA busy_timeout = 30000")
                 jm = conn.execute("PRAGMA journal_mode").fetchone()
+                _WAL_MODE = bool(jm) and str(jm[0]).lower() == "wal"
                 log_debug("db", "journal_mode set", mode=str(jm[0]) if jm else "unknown")
+                if LIBRARY_DB_INCREMENTAL_VACUUM:
+                    _enable_incremental_vacuum(conn)
                 conn.executescript(
                     """
                 CREATE TABLE IF NOT EXISTS songs (
@@ -286,7 +548,9 @@ def init_db() -> None:
                     source_analyzed INTEGER NOT NULL DEFAULT 0,
                     source_metrics_json TEXT NOT NULL DEFAULT "{}",
                     file_mtime_utc TEXT,
-                    is_demo INTEGER NOT NULL DEFAULT 0
+                    is_demo INTEGER NOT NULL DEFAULT 0,
+                    content_hash TEXT,
+                    pcm_hash TEXT
                 );
                 CREATE TABLE IF NOT EXISTS song_metrics (
                     song_id TEXT PRIMARY KEY REFERENCES songs(song_id) ON DELETE CASCADE,
@@ -318,7 +582,20 @@ def init_db() -> None:
                     created_at TEXT NOT NULL,
                     updated_at TEXT NOT NULL,
                     meta_json TEXT NOT NULL DEFAULT "{}",
-                    metrics_json TEXT NOT NULL DEFAULT "{}"
+                    metrics_json TEXT NOT NULL DEFAULT "{}",
+                    strength REAL
+                );
+                CREATE TABLE IF NOT EXISTS media_tags (
+                    rel TEXT PRIMARY KEY,
+                    title TEXT,
+                    artist TEXT,
+                    album TEXT,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS version_payloads (
+                    version_id TEXT PRIMARY KEY REFERENCES versions(version_id) ON DELETE CASCADE,
+                    gen INTEGER NOT NULL DEFAULT 0,
+                    payload_json TEXT
                 );
                 CREATE TABLE IF NOT EXISTS version_metrics (
                     version_id TEXT PRIMARY KEY REFERENCES versions(version_id) ON DELETE CASCADE,
@@ -342,19 +619,56 @@ def init_db() -> None:
                     rendition_id INTEGER PRIMARY KEY AUTOINCREMENT,
                     version_id TEXT NOT NULL REFERENCES versions(version_id) ON DELETE CASCADE,
                     format TEXT NOT NULL,
-                    rel TEXT NOT NULL
+                    rel TEXT NOT NULL,
+                    content_hash TEXT
+                );
+                CREATE TABLE IF NOT EXISTS library_changes (
+                    rev INTEGER PRIMARY KEY AUTOINCREMENT,
+                    song_id TEXT,
+                    entity TEXT NOT NULL,
+                    op TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS fs_index (
+                    path TEXT PRIMARY KEY,
+                    parent TEXT,
+                    mtime_ns INTEGER NOT NULL,
+                    entries INTEGER NOT NULL,
+                    names_hash TEXT NOT NULL
                 );
                 CREATE INDEX IF NOT EXISTS idx_versions_song_created ON versions(song_id, created_at);
                 CREATE INDEX IF NOT EXISTS idx_renditions_version ON renditions(version_id);
                 CREATE INDEX IF NOT EXISTS idx_songs_last_used ON songs(last_used_at);
                 CREATE INDEX IF NOT EXISTS idx_songs_title ON songs(title);
+                CREATE INDEX IF NOT EXISTS idx_songs_title_nocase ON songs(title COLLATE NOCASE);
+                CREATE INDEX IF NOT EXISTS idx_songs_unanalyzed ON songs(created_at) WHERE source_analyzed = 0;
+                CREATE INDEX IF NOT EXISTS idx_songs_created_page ON songs(created_at, song_id);
+                CREATE INDEX IF NOT EXISTS idx_songs_last_used_page ON songs(last_used_at, song_id);
                 """
                 )
+                conn.executescript(_change_triggers_sql())
+                conn.executescript(_payload_triggers_sql())
+                conn.executescript(_metric_indexes_sql())
                 uv = _get_user_version(conn)
                 needs_migration = uv < SCHEMA_VERSION or not _has_column(conn, "versions", "meta_json")
                 if needs_migration:
                     _apply_migrations(conn, uv, SCHEMA_VERSION)
                     _set_user_version(conn, SCHEMA_VERSION)
+                # Created after migrations so upgraded databases already have the hash columns.
+                conn.executescript(
+                    """
+                CREATE INDEX IF NOT EXISTS idx_songs_content_hash ON songs(content_hash) WHERE content_hash IS NOT NULL;
+                CREATE INDEX IF NOT EXISTS idx_songs_pcm_hash ON songs(pcm_hash) WHERE pcm_hash IS NOT NULL;
+                CREATE INDEX IF NOT EXISTS idx_renditions_content_hash ON renditions(content_hash)
+                    WHERE content_hash IS NOT NULL;
+                CREATE INDEX IF NOT EXISTS idx_songs_unhashed ON songs(created_at) WHERE content_hash IS NULL;
+                CREATE INDEX IF NOT EXISTS idx_versions_song_summary
+                    ON versions(song_id, created_at, kind, utility, voicing, loudness_profile, strength);
+                CREATE INDEX IF NOT EXISTS idx_versions_voicing_summary
+                    ON versions(voicing, loudness_profile, strength, song_id);
+                CREATE INDEX IF NOT EXISTS idx_renditions_rel ON renditions(rel);
+                """
+                )
+                _FTS_ENABLED = _ensure_search_index(conn)
                 conn.commit()
                 has_meta = _has_column(conn, "versions", "meta_json")
                 log_debug(
@@ -370,13 +684,88 @@ def init_db() -> None:
 
 def get_schema_version() -> int:
     init_db()
-    conn = _connect()
+    conn = _read_conn()
     try:
         return _get_user_version(conn)
     finally:
         conn.close()
 
 
+def run_maintenance(analyze: bool = False) -> dict:
+    """Checkpoint an oversized WAL, refresh planner statistics and reclaim free pages.
+
+    ANALYZE runs when `analyze` is set or LIBRARY_DB_ANALYZE_ROWS rows were bulk-written since
+    the last one; otherwise PRAGMA optimize re-analyzes only the tables that need it. Returns
+    the steps that ran.
+    """
+    global _ROWS_SINCE_ANALYZE, _LAST_ANALYZE_UTC, _LAST_OPTIMIZE_UTC, _LAST_VACUUM_UTC
+    init_db()
+    done: dict[str, Any] = {}
+    t0 = time.monotonic()
+    with _WRITE_LOCK:
+        conn = _write_conn()
+        try:
+            if _WAL_MODE and LIBRARY_DB_WAL_LIMIT_BYTES > 0 and _wal_bytes() > LIBRARY_DB_WAL_LIMIT_BYTES:
+                result = _checkpoint(conn, "maintenance")
+                if result:
+                    done["checkpoint"] = {"busy": result[0], "wal_pages": result[1], "checkpointed": result[2]}
+            if analyze or (LIBRARY_DB_ANALYZE_ROWS > 0 and _ROWS_SINCE_ANALYZE >= LIBRARY_DB_ANALYZE_ROWS):
+                conn.execute("ANALYZE")
+                conn.commit()
+                done["analyze"] = _ROWS_SINCE_ANALYZE
+                _ROWS_SINCE_ANALYZE = 0
+                _LAST_ANALYZE_UTC = _now_iso()
+            else:
+                conn.execute("PRAGMA optimize")
+                conn.commit()
+                done["optimize"] = True
+                _LAST_OPTIMIZE_UTC = _now_iso()
+            if LIBRARY_DB_INCREMENTAL_VACUUM:
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if free >= LIBRARY_DB_VACUUM_PAGES:
+                    # The pragma frees one page per step and sqlite3's execute() stops after the
+                    # first; executescript() runs it to completion.
+                    conn.executescript(f"PRAGMA incremental_vacuum({LIBRARY_DB_VACUUM_PAGES});")
+                    done["vacuum_pages"] = min(free, LIBRARY_DB_VACUUM_PAGES)
+                    _LAST_VACUUM_UTC = _now_iso()
+        except sqlite3.Error as exc:
+            log_error("db", "maintenance failed", err=str(exc), done=done)
+            raise
+        finally:
+            conn.close()
+    log_debug("db", "maintenance", ms=round((time.monotonic() - t0) * 1000, 1), **done)
+    return done
+
+
+def db_health() -> dict:
+    init_db()
+    conn = _read_conn()
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "journal_mode": "wal" if _WAL_MODE else "delete",
+        "db_bytes": page_size * page_count,
+        "freelist_pages": freelist,
+        "wal_bytes": _wal_bytes() if _WAL_MODE else 0,
+        "wal_limit_bytes": LIBRARY_DB_WAL_LIMIT_BYTES,
+        "last_checkpoint_at": _LAST_CHECKPOINT_UTC,
+        "last_checkpoint": (
+            dict(zip(("busy", "wal_pages", "checkpointed"), _LAST_CHECKPOINT_RESULT))
+            if _LAST_CHECKPOINT_RESULT
+            else None
+        ),
+        "last_optimize_at": _LAST_OPTIMIZE_UTC,
+        "last_analyze_at": _LAST_ANALYZE_UTC,
+        "rows_since_analyze": _ROWS_SINCE_ANALYZE,
+        "incremental_vacuum": LIBRARY_DB_INCREMENTAL_VACUUM,
+        "last_vacuum_at": _LAST_VACUUM_UTC,
+    }
+
+
 def _select_metrics(metrics: dict | None, prefer_output: bool) -> dict:
     if not isinstance(metrics, dict):
         return {}
@@ -530,10 +919,126 @@ def _pick_preferred_file(files: list[Path]) -> Path | None:
     return files[0]
 
 
-def list_library() -> dict:
+def _version_from_row(row: sqlite3.Row, renditions: list[dict], metrics_row: sqlite3.Row | None) -> dict:
+    summary = {}
+    meta_raw = row["meta_json"] if "meta_json" in row.keys() else None
+    summary_raw = row["summary_json"] if "summary_json" in row.keys() else None
+    base_raw = meta_raw or summary_raw
+    if base_raw:
+        try:
+            raw = json.loads(base_raw)
+            if isinstance(raw, dict):
+                summary.update(raw)
+        except Exception as exc:
+            log_debug("db", "meta_json parse failed", version_id=row["version_id"], err=str(exc))
+            summary = {}
+    if row["voicing"]:
+        summary["voicing"] = row["voicing"]
+    if row["loudness_profile"]:
+        summary["loudness_profile"] = row["loudness_profile"]
+    metrics = _metrics_from_row(metrics_row)
+    utility = _normalize_utility_label(row["utility"], row["kind"])
+    version = {
+        "version_id": row["version_id"],
+        "song_id": row["song_id"],
+        "kind": row["kind"],
+        "title": row["title"],
+        "label": row["label"],
+        "utility": utility,
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+        "summary": summary,
+        "meta": summary,
+        "metrics": metrics,
+        "renditions": renditions,
+    }
+    primary = _primary_rendition(renditions)
+    if primary:
+        version["rel"] = primary.get("rel")
+    return version
+
+
+def _song_from_row(row: sqlite3.Row, metrics_row: sqlite3.Row | None) -> dict:
+    metrics = _metrics_from_row(metrics_row, duration_override=row["duration_sec"])
+    return {
+        "song_id": row["song_id"],
+        "title": row["title"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+        "last_used_at": row["last_used_at"],
+        "is_demo": bool(row["is_demo"]) if "is_demo" in row.keys() else False,
+        "chain": {},
+        "tags": [],
+        "source": {
+            "kind": "source",
+            "rel": row["source_rel"],
+            "format": row["source_format"],
+            "duration_sec": row["duration_sec"],
+            "analyzed": bool(row["source_analyzed"]),
+            "metrics": metrics,
+        },
+    }
+
+
+def _store_version_payloads(fills: list[tuple[str, int, str]]) -> None:
+    """Cache rebuilt payloads; rows whose generation moved on since they were read are left alone."""
+    if not fills:
+        return
+    with _WRITE_LOCK:
+        conn = _write_conn()
+        try:
+            conn.executemany(
+                """
+                INSERT INTO version_payloads (version_id, gen, payload_json)
+                SELECT ?1, ?2, ?3 WHERE EXISTS (SELECT 1 FROM versions WHERE version_id = ?1)
+                ON CONFLICT(version_id) DO UPDATE SET payload_json = excluded.payload_json
+                WHERE version_payloads.gen = excluded.gen
+                """,
+                fills,
+            )
+            conn.commit()
+        except sqlite3.Error as exc:
+            conn.rollback()
+            log_debug("db", "version payload cache write failed", rows=len(fills), err=str(exc))
+        finally:
+            conn.close()
+
+
+def _version_payloads(conn: sqlite3.Connection, rows: list[sqlite3.Row]) -> dict[str, str]:
+    """Serialized version entries for rows of (version_id, gen, payload_json).
+
+    Cached payloads are returned as-is; missing ones are rebuilt from the version, metrics and
+    rendition rows and written back for the next listing.
+    """
+    payloads = {row["version_id"]: row["payload_json"] for row in rows if row["payload_json"] is not None}
+    gens = {row["version_id"]: row["gen"] or 0 for row in rows if row["payload_json"] is None}
+    if not gens:
+        return payloads
+    version_ids = list(gens)
+    full_rows: list[sqlite3.Row] = []
+    for start in range(0, len(version_ids), 500):
+        chunk = version_ids[start:start + 500]
+        full_rows.extend(
+            conn.execute(f"SELECT * FROM versions WHERE version_id IN ({','.join(['?'] * len(chunk))})", chunk)
+        )
+    fills = []
+    for version in _build_versions(conn, full_rows):
+        text = json.dumps(version, ensure_ascii=False, separators=(",", ":"))
+        payloads[version["version_id"]] = text
+        fills.append((version["version_id"], gens[version["version_id"]], text))
+    _store_version_payloads(fills)
+    return payloads
+
+
+def list_library_json() -> tuple[str, int]:
+    """The full song list as JSON array text (newest first) and its length.
+
+    Version entries are spliced in from their cached payloads, so an unchanged library is listed
+    without parsing meta_json or walking metric rows in Python.
+    """
     init_db()
     t0 = time.monotonic()
-    conn = _connect()
+    conn = _read_conn()
     try:
         t_conn = time.monotonic()
         songs_rows = conn.execute("SELECT * FROM songs ORDER BY created_at DESC").fetchall()
@@ -557,22 +1062,22 @@ def list_library() -> dict:
             log_summary("db", "list_library query slow", query="song_metrics", ms=round(t_song_metrics, 1))
 
         t_q = time.monotonic()
-        version_rows = conn.execute("SELECT * FROM versions ORDER BY created_at DESC").fetchall()
+        version_rows = conn.execute(
+            """
+            SELECT v.version_id, v.song_id, p.gen, p.payload_json
+            FROM versions v LEFT JOIN version_payloads p ON p.version_id = v.version_id
+            ORDER BY v.created_at DESC
+            """
+        ).fetchall()
         t_versions = (time.monotonic() - t_q) * 1000
         if t_versions > 250:
             log_summary("db", "list_library query slow", query="versions", ms=round(t_versions, 1))
 
         t_q = time.monotonic()
-        version_metrics_rows = conn.execute("SELECT * FROM version_metrics").fetchall()
-        t_version_metrics = (time.monotonic() - t_q) * 1000
-        if t_version_metrics > 250:
-            log_summary("db", "list_library query slow", query="version_metrics", ms=round(t_version_metrics, 1))
-
-        t_q = time.monotonic()
-        rendition_rows = conn.execute("SELECT version_id, format, rel FROM renditions ORDER BY rendition_id").fetchall()
-        t_renditions = (time.monotonic() - t_q) * 1000
-        if t_renditions > 250:
-            log_summary("db", "list_library query slow", query="renditions", ms=round(t_renditions, 1))
+        payloads = _version_payloads(conn, version_rows)
+        t_payloads = (time.monotonic() - t_q) * 1000
+        if t_payloads > 250:
+            log_summary("db", "list_library payload rebuild slow", ms=round(t_payloads, 1))
     except Exception as exc:
         elapsed = (time.monotonic() - t0) * 1000
         log_error("db", "list_library failed", ms=round(elapsed, 1), err=str(exc))
@@ -581,82 +1086,17 @@ def list_library() -> dict:
         conn.close()
 
     song_metrics = {row["song_id"]: row for row in song_metrics_rows}
-    version_metrics = {row["version_id"]: row for row in version_metrics_rows}
-    renditions_map: dict[str, list[dict]] = {}
-    for row in rendition_rows:
-        renditions_map.setdefault(row["version_id"], []).append({
-            "format": row["format"],
-            "rel": row["rel"],
-        })
-
-    versions_by_song: dict[str, list[dict]] = {}
-    latest_by_song: dict[str, dict] = {}
+    # Rows are newest first, so each song's first payload is its latest version.
+    versions_by_song: dict[str, list[str]] = {}
     for row in version_rows:
-        renditions = renditions_map.get(row["version_id"], [])
-        summary = {}
-        meta_raw = row["meta_json"] if "meta_json" in row.keys() else None
-        summary_raw = row["summary_json"] if "summary_json" in row.keys() else None
-        base_raw = meta_raw or summary_raw
-        if base_raw:
-            try:
-                raw = json.loads(base_raw)
-                if isinstance(raw, dict):
-                    summary.update(raw)
-            except Exception as exc:
-                log_debug("db", "meta_json parse failed", version_id=row["version_id"], err=str(exc))
-                summary = {}
-        if row["voicing"]:
-            summary["voicing"] = row["voicing"]
-        if row["loudness_profile"]:
-            summary["loudness_profile"] = row["loudness_profile"]
-        metrics = _metrics_from_row(version_metrics.get(row["version_id"]))
-        utility = _normalize_utility_label(row["utility"], row["kind"])
-        version = {
-            "version_id": row["version_id"],
-            "song_id": row["song_id"],
-            "kind": row["kind"],
-            "title": row["title"],
-            "label": row["label"],
-            "utility": utility,
-            "created_at": row["created_at"],
-            "updated_at": row["updated_at"],
-            "summary": summary,
-            "meta": summary,
-            "metrics": metrics,
-            "renditions": renditions,
-        }
-        primary = _primary_rendition(renditions)
-        if primary:
-            version["rel"] = primary.get("rel")
-        versions_by_song.setdefault(row["song_id"], []).append(version)
-        current = latest_by_song.get(row["song_id"])
-        if not current or (row["created_at"] or "") > (current.get("created_at") or ""):
-            latest_by_song[row["song_id"]] = version
+        payload = payloads.get(row["version_id"])
+        if payload is not None:
+            versions_by_song.setdefault(row["song_id"], []).append(payload)
 
-    songs = []
-    for row in songs_rows:
-        metrics = _metrics_from_row(song_metrics.get(row["song_id"]), duration_override=row["duration_sec"])
-        song = {
-            "song_id": row["song_id"],
-            "title": row["title"],
-            "created_at": row["created_at"],
-            "updated_at": row["updated_at"],
-            "last_used_at": row["last_used_at"],
-            "is_demo": bool(row["is_demo"]) if "is_demo" in row.keys() else False,
-            "chain": {},
-            "tags": [],
-            "source": {
-                "kind": "source",
-                "rel": row["source_rel"],
-                "format": row["source_format"],
-                "duration_sec": row["duration_sec"],
-                "analyzed": bool(row["source_analyzed"]),
-                "metrics": metrics,
-            },
-            "versions": versions_by_song.get(row["song_id"], []),
-            "latest_version": latest_by_song.get(row["song_id"]),
-        }
-        songs.append(song)
+    parts = [
+        _song_json(_song_from_row(row, song_metrics.get(row["song_id"])), versions_by_song.get(row["song_id"], []))
+        for row in songs_rows
+    ]
 
     total_ms = (time.monotonic() - t0) * 1000
     if total_ms > 500:
@@ -664,17 +1104,485 @@ def list_library() -> dict:
             "db",
             "list_library slow",
             ms=round(total_ms, 1),
-            songs=len(songs),
+            songs=len(parts),
             versions=len(version_rows),
         )
     else:
-        log_debug("db", "list_library ok", ms=round(total_ms, 1), songs=len(songs), versions=len(version_rows))
-    return {"version": LIBRARY_VERSION, "songs": songs}
+        log_debug("db", "list_library ok", ms=round(total_ms, 1), songs=len(parts), versions=len(version_rows))
+    return f"[{','.join(parts)}]", len(parts)
+
+
+def _song_json(song: dict, versions: list[str] | None) -> str:
+    """A song entry as JSON text, with cached version payloads spliced in unless versions is None."""
+    song_json = json.dumps(song, ensure_ascii=False, separators=(",", ":"))
+    if versions is None:
+        return song_json
+    return (
+        f'{song_json[:-1]},"versions":[{",".join(versions)}],'
+        f'"latest_version":{versions[0] if versions else "null"}}}'
+    )
+
+
+def list_library() -> dict:
+    songs_json, _count = list_library_json()
+    return {"version": LIBRARY_VERSION, "songs": json.loads(songs_json)}
+
+
+LIBRARY_PAGE_SORTS = ("created_at", "last_used_at")
+LIBRARY_PAGE_MAX = 500
+
+
+def _encode_page_cursor(sort_value: str | None, song_id: str) -> str:
+    raw = json.dumps([sort_value or "", song_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_page_cursor(cursor: str) -> tuple[str, str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        sort_value, song_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as exc:
+        raise ValueError("invalid_cursor") from exc
+    if not isinstance(sort_value, str) or not isinstance(song_id, str):
+        raise ValueError("invalid_cursor")
+    return sort_value, song_id
+
+
+def _build_versions(conn: sqlite3.Connection, version_rows: list[sqlite3.Row]) -> list[dict]:
+    """Attach metrics and renditions to version rows, preserving their order."""
+    version_ids = [row["version_id"] for row in version_rows]
+    version_metrics: dict[str, sqlite3.Row] = {}
+    renditions_map: dict[str, list[dict]] = {}
+    # Stay well under SQLITE_MAX_VARIABLE_NUMBER on older builds.
+    for start in range(0, len(version_ids), 500):
+        chunk = version_ids[start:start + 500]
+        chunk_placeholders = ",".join(["?"] * len(chunk))
+        for row in conn.execute(
+            f"SELECT * FROM version_metrics WHERE version_id IN ({chunk_placeholders})",
+            chunk,
+        ):
+            version_metrics[row["version_id"]] = row
+        for row in conn.execute(
+            f"SELECT version_id, format, rel FROM renditions WHERE version_id IN ({chunk_placeholders}) "
+            "ORDER BY rendition_id",
+            chunk,
+        ):
+            renditions_map.setdefault(row["version_id"], []).append({
+                "format": row["format"],
+                "rel": row["rel"],
+            })
+    return [
+        _version_from_row(row, renditions_map.get(row["version_id"], []), version_metrics.get(row["version_id"]))
+        for row in version_rows
+    ]
+
+
+def _hydrate_versions(conn: sqlite3.Connection, song_ids: list[str]) -> dict[str, list[str]]:
+    """Cached version payloads as JSON text (newest first) for the given songs only."""
+    if not song_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(song_ids))
+    version_rows = conn.execute(
+        f"""
+        SELECT v.version_id, v.song_id, p.gen, p.payload_json
+        FROM versions v LEFT JOIN version_payloads p ON p.version_id = v.version_id
+        WHERE v.song_id IN ({placeholders}) ORDER BY v.created_at DESC
+        """,
+        song_ids,
+    ).fetchall()
+    payloads = _version_payloads(conn, version_rows)
+    versions_by_song: dict[str, list[str]] = {}
+    for row in version_rows:
+        payload = payloads.get(row["version_id"])
+        if payload is not None:
+            versions_by_song.setdefault(row["song_id"], []).append(payload)
+    return versions_by_song
+
+
+def list_library_page(
+    *,
+    limit: int = 50,
+    cursor: str | None = None,
+    sort: str = "created_at",
+    query: str | None = None,
+    kind: str | None = None,
+    include_versions: bool = True,
+) -> dict:
+    songs_json, next_cursor, _count = list_library_page_json(
+        limit=limit, cursor=cursor, sort=sort, query=query, kind=kind, include_versions=include_versions,
+    )
+    return {"version": LIBRARY_VERSION, "songs": json.loads(songs_json), "next_cursor": next_cursor}
+
+
+def list_library_page_json(
+    *,
+    limit: int = 50,
+    cursor: str | None = None,
+    sort: str = "created_at",
+    query: str | None = None,
+    kind: str | None = None,
+    include_versions: bool = True,
+) -> tuple[str, str | None, int]:
+    """One page of songs as JSON array text, its next cursor and its length.
+
+    Songs are newest first by `sort`, using a keyset cursor on (sort, song_id). `query` matches
+    titles (case-insensitive substring); `kind` keeps songs that have at least one version of
+    that kind. Versions are spliced in from their cached payloads for songs on the page only,
+    and skipped entirely when include_versions is False (see list_song_versions).
+    """
+    if sort not in LIBRARY_PAGE_SORTS:
+        raise ValueError("invalid_sort")
+    limit = max(1, min(int(limit), LIBRARY_PAGE_MAX))
+    init_db()
+    t0 = time.monotonic()
+    where: list[str] = []
+    params: list[Any] = []
+    if cursor:
+        after_value, after_id = _decode_page_cursor(cursor)
+        where.append(f"(s.{sort} < ? OR (s.{sort} = ? AND s.song_id < ?))")
+        params.extend([after_value, after_value, after_id])
+    if query:
+        init_db()
+        match = _fts_match_expr(query) if _FTS_ENABLED else None
+        if match:
+            where.append("s.rowid IN (SELECT rowid FROM library_fts WHERE library_fts MATCH ?)")
+            params.append(match)
+        else:
+            where.append("s.title LIKE ? ESCAPE '\\'")
+            params.append(f"%{_like_escape(query.strip())}%")
+    if kind:
+        where.append("EXISTS (SELECT 1 FROM versions v WHERE v.song_id = s.song_id AND v.kind = ?)")
+        params.append(kind)
+    sql = "SELECT s.* FROM songs s"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY s.{sort} DESC, s.song_id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    conn = _read_conn()
+    try:
+        song_rows = conn.execute(sql, params).fetchall()
+        has_more = len(song_rows) > limit
+        song_rows = song_rows[:limit]
+        song_ids = [row["song_id"] for row in song_rows]
+        song_metrics: dict[str, sqlite3.Row] = {}
+        version_counts: dict[str, int] = {}
+        if song_ids:
+            placeholders = ",".join(["?"] * len(song_ids))
+            for row in conn.execute(f"SELECT * FROM song_metrics WHERE song_id IN ({placeholders})", song_ids):
+                song_metrics[row["song_id"]] = row
+            for row in conn.execute(
+                f"SELECT song_id, COUNT(*) AS n FROM versions WHERE song_id IN ({placeholders}) GROUP BY song_id",
+                song_ids,
+            ):
+                version_counts[row["song_id"]] = row["n"]
+        versions_by_song = _hydrate_versions(conn, song_ids) if include_versions else {}
+    except Exception as exc:
+        log_error("db", "list_library_page failed", ms=round((time.monotonic() - t0) * 1000, 1), err=str(exc))
+        raise
+    finally:
+        conn.close()
+
+    songs = []
+    for row in song_rows:
+        song = _song_from_row(row, song_metrics.get(row["song_id"]))
+        song["version_count"] = version_counts.get(row["song_id"], 0)
+        songs.append(_song_json(song, versions_by_song.get(row["song_id"], []) if include_versions else None))
+    next_cursor = None
+    if has_more and song_rows:
+        last = song_rows[-1]
+        next_cursor = _encode_page_cursor(last[sort], last["song_id"])
+    log_debug(
+        "db",
+        "list_library_page ok",
+        ms=round((time.monotonic() - t0) * 1000, 1),
+        songs=len(songs),
+        more=has_more,
+    )
+    return f"[{','.join(songs)}]", next_cursor, len(songs)
+
+
+def list_song_versions(song_id: str) -> list[dict] | None:
+    versions_json = list_song_versions_json(song_id)
+    return None if versions_json is None else json.loads(versions_json)
+
+
+def list_song_versions_json(song_id: str) -> str | None:
+    """Versions of one song (newest first) as JSON array text, or None if the song does not exist."""
+    init_db()
+    conn = _read_conn()
+    try:
+        if not conn.execute("SELECT 1 FROM songs WHERE song_id = ?", (song_id,)).fetchone():
+            return None
+        return f"[{','.join(_hydrate_versions(conn, [song_id]).get(song_id, []))}]"
+    finally:
+        conn.close()
+
+
+LIBRARY_QUERY_OPS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "eq": "=", "ne": "!=", "null": None, "notnull": None}
+LIBRARY_QUERY_MAX = 1000
+
+
+def query_metrics(
+    *,
+    scope: str = "versions",
+    filters: list[tuple[str, str, float | None]] | None = None,
+    sort: str | None = None,
+    order: str = "desc",
+    limit: int = 100,
+    offset: int = 0,
+    kind: str | None = None,
+    voicing: str | None = None,
+    loudness_profile: str | None = None,
+) -> dict:
+    """Songs or versions selected by METRIC_FIELDS range filters, evaluated in SQL.
+
+    filters are (field, op, value) with op in LIBRARY_QUERY_OPS ("null"/"notnull" ignore value).
+    Sorting by a metric puts rows where it is NULL last; without `sort`, newest entries come first.
+    Entries without a metrics row are included, with every metric NULL.
+    kind/voicing/loudness_profile only apply to the versions scope.
+    """
+    if scope not in ("songs", "versions"):
+        raise ValueError("invalid_scope")
+    if order not in ("asc", "desc"):
+        raise ValueError("invalid_order")
+    if sort is not None and sort not in METRIC_FIELDS and sort != "created_at":
+        raise ValueError("invalid_sort")
+    limit = max(1, min(int(limit), LIBRARY_QUERY_MAX))
+    offset = max(0, int(offset))
+    init_db()
+    t0 = time.monotonic()
+    metric_columns = ", ".join(f"m.{field}" for field in METRIC_FIELDS)
+    if scope == "songs":
+        sql = f"SELECT s.song_id, s.title, s.created_at, s.source_rel, s.source_analyzed, {metric_columns} " \
+              "FROM songs s LEFT JOIN song_metrics m ON m.song_id = s.song_id"
+        key, entity = "s.song_id", "s"
+    else:
+        sql = (
+            "SELECT v.version_id, v.song_id, s.title AS song_title, v.kind, v.label, v.utility, v.voicing, "
+            f"v.loudness_profile, v.strength, v.created_at, {metric_columns} FROM versions v "
+            "JOIN songs s ON s.song_id = v.song_id LEFT JOIN version_metrics m ON m.version_id = v.version_id"
+        )
+        key, entity = "v.version_id", "v"
+    where: list[str] = []
+    params: list[Any] = []
+    for field, op, value in filters or []:
+        if field not in METRIC_FIELDS:
+            raise ValueError("invalid_field")
+        if op not in LIBRARY_QUERY_OPS:
+            raise ValueError("invalid_op")
+        if op == "null":
+            where.append(f"m.{field} IS NULL")
+        elif op == "notnull":
+            where.append(f"m.{field} IS NOT NULL")
+        else:
+            if value is None:
+                raise ValueError("invalid_value")
+            where.append(f"m.{field} {LIBRARY_QUERY_OPS[op]} ?")
+            params.append(float(value))
+    if scope == "versions":
+        for column, value in (("kind", kind), ("voicing", voicing), ("loudness_profile", loudness_profile)):
+            if value:
+                where.append(f"v.{column} = ?")
+                params.append(value)
+    direction = "ASC" if order == "asc" else "DESC"
+    if sort in METRIC_FIELDS:
+        order_by = f"m.{sort} IS NULL, m.{sort} {direction}, {key} {direction}"
+    else:
+        order_by = f"{entity}.created_at {direction}, {key} {direction}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+    params.extend([limit + 1, offset])
+    conn = _read_conn()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except Exception as exc:
+        log_error("db", "query_metrics failed", ms=round((time.monotonic() - t0) * 1000, 1), err=str(exc))
+        raise
+    finally:
+        conn.close()
+    has_more = len(rows) > limit
+    items = []
+    for row in rows[:limit]:
+        metrics = {field: row[field] for field in METRIC_FIELDS}
+        if scope == "songs":
+            items.append({
+                "song_id": row["song_id"],
+                "title": row["title"],
+                "created_at": row["created_at"],
+                "rel": row["source_rel"],
+                "analyzed": bool(row["source_analyzed"]),
+                "metrics": metrics,
+            })
+        else:
+            items.append({
+                "version_id": row["version_id"],
+                "song_id": row["song_id"],
+                "song_title": row["song_title"],
+                "kind": row["kind"],
+                "label": row["label"],
+                "utility": _normalize_utility_label(row["utility"], row["kind"]),
+                "voicing": row["voicing"],
+                "loudness_profile": row["loudness_profile"],
+                "strength": row["strength"],
+                "created_at": row["created_at"],
+                "metrics": metrics,
+            })
+    log_debug("db", "query_metrics ok", ms=round((time.monotonic() - t0) * 1000, 1), scope=scope, rows=len(items))
+    return {"scope": scope, "items": items, "limit": limit, "offset": offset, "has_more": has_more}
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts_match_expr(text: str) -> str | None:
+    """Turn free text into an FTS5 query: every word must match, each as a prefix."""
+    terms = re.findall(r"\w+", text or "")[:16]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_library(query: str, limit: int = 50) -> dict:
+    """Songs matching `query` across titles, version titles/labels, voicings/profiles and MP3 tags,
+    best match first. Falls back to a title substring scan when FTS5 is unavailable."""
+    limit = max(1, min(int(limit), LIBRARY_PAGE_MAX))
+    init_db()
+    t0 = time.monotonic()
+    match = _fts_match_expr(query)
+    if not match:
+        return {"query": query, "ranked": _FTS_ENABLED, "items": []}
+    conn = _read_conn()
+    try:
+        if _FTS_ENABLED:
+            rows = conn.execute(
+                """
+                SELECT s.song_id, s.title, s.created_at, s.source_rel, f.rank AS score,
+                       snippet(library_fts, -1, '[', ']', '…', 8) AS excerpt
+                FROM library_fts f JOIN songs s ON s.rowid = f.rowid
+                WHERE library_fts MATCH ? AND rank MATCH 'bm25(10.0, 4.0, 2.0, 3.0)'
+                ORDER BY f.rank LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                """
+                SELECT song_id, title, created_at, source_rel, NULL AS score, title AS excerpt
+                FROM songs WHERE title LIKE ? ESCAPE '\\' ORDER BY created_at DESC LIMIT ?
+                """,
+                (f"%{_like_escape(query.strip())}%", limit),
+            ).fetchall()
+    except sqlite3.OperationalError as exc:
+        log_error("db", "search_library failed", err=str(exc))
+        raise ValueError("invalid_query") from exc
+    finally:
+        conn.close()
+    items = [
+        {
+            "song_id": row["song_id"],
+            "title": row["title"],
+            "created_at": row["created_at"],
+            "rel": row["source_rel"],
+            "score": row["score"],
+            "excerpt": row["excerpt"],
+        }
+        for row in rows
+    ]
+    log_debug("db", "search_library ok", ms=round((time.monotonic() - t0) * 1000, 1), rows=len(items))
+    return {"query": query, "ranked": _FTS_ENABLED, "items": items}
+
+
+def pending_tags(limit: int) -> list[str]:
+    """Rels of library MP3s whose tags have not been indexed yet."""
+    init_db()
+    conn = _read_conn()
+    try:
+        rows = conn.execute(
+            """
+            SELECT rel FROM (
+                SELECT r.rel AS rel FROM renditions r WHERE r.format = 'mp3'
+                UNION SELECT source_rel FROM songs WHERE source_format = 'mp3'
+            ) WHERE rel NOT IN (SELECT rel FROM media_tags) LIMIT ?
+            """,
+            (max(0, int(limit)),),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [row["rel"] for row in rows]
+
+
+def _library_revision(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'library_changes'").fetchone()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def library_revision() -> int:
+    """Monotonic counter bumped by every write to songs, versions, renditions or their metrics."""
+    init_db()
+    conn = _read_conn()
+    try:
+        return _library_revision(conn)
+    finally:
+        conn.close()
+
+
+def library_changes_since(since: int) -> dict:
+    changes_json, _revision = library_changes_json(since)
+    return json.loads(changes_json)
+
+
+def library_changes_json(since: int) -> tuple[str, int]:
+    """Songs touched after revision `since`, hydrated like list_library entries, as a JSON
+    object text plus the current revision.
+
+    The object carries reset=True when the caller must refetch everything: the revision is unknown
+    (newer than ours) or older than the retained change log, or too many songs changed.
+    """
+    init_db()
+    conn = _read_conn()
+    try:
+        revision = _library_revision(conn)
+        if since == revision:
+            return f'{{"revision":{revision},"songs":[],"deleted_songs":[]}}', revision
+        oldest = conn.execute("SELECT MIN(rev) FROM library_changes").fetchone()[0]
+        if since > revision or oldest is None or since < oldest - 1:
+            return f'{{"revision":{revision},"reset":true}}', revision
+        song_ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT song_id FROM library_changes WHERE rev > ? AND rev <= ? AND song_id IS NOT NULL",
+                (since, revision),
+            )
+        ]
+        if len(song_ids) > LIBRARY_PAGE_MAX:
+            return f'{{"revision":{revision},"reset":true}}', revision
+        song_rows: list[sqlite3.Row] = []
+        song_metrics: dict[str, sqlite3.Row] = {}
+        if song_ids:
+            placeholders = ",".join(["?"] * len(song_ids))
+            song_rows = conn.execute(f"SELECT * FROM songs WHERE song_id IN ({placeholders})", song_ids).fetchall()
+            for row in conn.execute(f"SELECT * FROM song_metrics WHERE song_id IN ({placeholders})", song_ids):
+                song_metrics[row["song_id"]] = row
+        live_ids = [row["song_id"] for row in song_rows]
+        versions_by_song = _hydrate_versions(conn, live_ids)
+    finally:
+        conn.close()
+    songs = [
+        _song_json(_song_from_row(row, song_metrics.get(row["song_id"])), versions_by_song.get(row["song_id"], []))
+        for row in song_rows
+    ]
+    live = set(live_ids)
+    deleted = json.dumps([song_id for song_id in song_ids if song_id not in live], ensure_ascii=False,
+                         separators=(",", ":"))
+    return f'{{"revision":{revision},"songs":[{",".join(songs)}],"deleted_songs":{deleted}}}', revision
 
 
 def get_song(song_id: str) -> dict | None:
     init_db()
-    conn = _connect()
+    conn = _read_conn()
     try:
         song_row = conn.execute("SELECT * FROM songs WHERE song_id = ?", (song_id,)).fetchone()
         if not song_row:
@@ -708,90 +1616,87 @@ def get_song(song_id: str) -> dict | None:
 
     versions = []
     for row in version_rows:
-        renditions = renditions_map.get(row["version_id"], [])
-        summary = {}
-        meta_raw = row["meta_json"] if "meta_json" in row.keys() else None
-        summary_raw = row["summary_json"] if "summary_json" in row.keys() else None
-        base_raw = meta_raw or summary_raw
-        if base_raw:
-            try:
-                raw = json.loads(base_raw)
-                if isinstance(raw, dict):
-                    summary.update(raw)
-            except Exception as exc:
-                log_debug("db", "meta_json parse failed", version_id=row["version_id"], err=str(exc))
-                summary = {}
-        if row["voicing"]:
-            summary["voicing"] = row["voicing"]
-        if row["loudness_profile"]:
-            summary["loudness_profile"] = row["loudness_profile"]
-        metrics = _metrics_from_row(version_metrics.get(row["version_id"]))
-        utility = _normalize_utility_label(row["utility"], row["kind"])
-        version = {
-            "version_id": row["version_id"],
-            "song_id": row["song_id"],
-            "kind": row["kind"],
-            "title": row["title"],
-            "label": row["label"],
-            "utility": utility,
-            "created_at": row["created_at"],
-            "updated_at": row["updated_at"],
-            "summary": summary,
-            "meta": summary,
-            "metrics": metrics,
-            "renditions": renditions,
-        }
-        primary = _primary_rendition(renditions)
-        if primary:
-            version["rel"] = primary.get("rel")
+        version = _version_from_row(
+            row,
+            renditions_map.get(row["version_id"], []),
+            version_metrics.get(row["version_id"]),
+        )
         versions.append(version)
 
-    metrics = _metrics_from_row(song_metrics_row, duration_override=song_row["duration_sec"])
-    return {
-        "song_id": song_row["song_id"],
-        "title": song_row["title"],
-        "created_at": song_row["created_at"],
-        "updated_at": song_row["updated_at"],
-        "last_used_at": song_row["last_used_at"],
-        "is_demo": bool(song_row["is_demo"]) if "is_demo" in song_row.keys() else False,
-        "chain": {},
-        "tags": [],
-        "source": {
-            "kind": "source",
-            "rel": song_row["source_rel"],
-            "format": song_row["source_format"],
-            "duration_sec": song_row["duration_sec"],
-            "analyzed": bool(song_row["source_analyzed"]),
-            "metrics": metrics,
-        },
-        "versions": versions,
-    }
+    song = _song_from_row(song_row, song_metrics_row)
+    song["versions"] = versions
+    return song
 
 
 def latest_version(song_id: str) -> dict | None:
     init_db()
-    conn = _connect()
+    conn = _read_conn()
     try:
         row = conn.execute(
-            "SELECT version_id FROM versions WHERE song_id = ? ORDER BY created_at DESC LIMIT 1",
+            "SELECT * FROM versions WHERE song_id = ? ORDER BY created_at DESC LIMIT 1",
             (song_id,),
         ).fetchone()
+        if not row:
+            return None
+        return _build_versions(conn, [row])[0]
     finally:
         conn.close()
-    if not row:
+
+
+def recent_songs(limit: int = 30) -> list[dict]:
+    """Most recently used songs with their latest version, in a fixed number of queries."""
+    init_db()
+    conn = _read_conn()
+    try:
+        song_rows = conn.execute(
+            """
+            SELECT s.song_id AS recent_song_id, s.title AS recent_title, v.*
+            FROM (SELECT song_id, title, last_used_at FROM songs ORDER BY last_used_at DESC LIMIT ?) s
+            LEFT JOIN versions v ON v.version_id = (
+                SELECT v2.version_id FROM versions v2
+                WHERE v2.song_id = s.song_id
+                ORDER BY v2.created_at DESC LIMIT 1
+            )
+            ORDER BY s.last_used_at DESC
+            """,
+            (max(0, int(limit)),),
+        ).fetchall()
+        version_rows = [row for row in song_rows if row["version_id"]]
+        latest = {version["version_id"]: version for version in _build_versions(conn, version_rows)}
+    finally:
+        conn.close()
+    return [
+        {
+            "song_id": row["recent_song_id"],
+            "title": row["recent_title"],
+            "latest": latest.get(row["version_id"]) if row["version_id"] else None,
+        }
+        for row in song_rows
+    ]
+
+
+def find_song_by_title(title: str) -> dict | None:
+    """Case-insensitive exact title match (newest song wins), via the NOCASE title index."""
+    title = (title or "").strip()
+    if not title:
         return None
-    song = get_song(song_id)
-    if not song:
+    init_db()
+    conn = _read_conn()
+    try:
+        row = conn.execute(
+            "SELECT song_id FROM songs WHERE title = ? COLLATE NOCASE ORDER BY created_at DESC LIMIT 1",
+            (title,),
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row:
         return None
-    for version in song.get("versions", []):
-        if version.get("version_id") == row["version_id"]:
-            return version
-    return None
+    return get_song(row["song_id"])
 
 
 def find_song_by_source(rel: str) -> dict | None:
     init_db()
-    conn = _connect()
+    conn = _read_conn()
     try:
         row = conn.execute("SELECT song_id FROM songs WHERE source_rel = ?", (rel,)).fetchone()
     finally:
@@ -806,7 +1711,7 @@ def find_by_rel(rel: str) -> tuple[dict | None, dict | None]:
     if not rel:
         return None, None
     init_db()
-    conn = _connect()
+    conn = _read_conn()
     try:
         song_row = conn.execute("SELECT song_id FROM songs WHERE source_rel = ?", (rel,)).fetchone()
         if song_row:
@@ -835,6 +1740,24 @@ def find_by_rel(rel: str) -> tuple[dict | None, dict | None]:
     return song, None
 
 
+def _metrics_upsert_sql(table: str, key: str) -> str:
+    columns = ", ".join(METRIC_FIELDS)
+    placeholders = ", ".join(["?"] * (len(METRIC_FIELDS) + 1))
+    updates = ",\n    ".join(f"{field}=excluded.{field}" for field in METRIC_FIELDS)
+    return (
+        f"INSERT INTO {table} ({key}, {columns}) VALUES ({placeholders})\n"
+        f"ON CONFLICT({key}) DO UPDATE SET\n    {updates}"
+    )
+
+
+_SONG_METRICS_UPSERT_SQL = _metrics_upsert_sql("song_metrics", "song_id")
+_VERSION_METRICS_UPSERT_SQL = _metrics_upsert_sql("version_metrics", "version_id")
+
+
+def _metrics_params(key: str, mapped_metrics: dict) -> tuple:
+    return (key, *(mapped_metrics[field] for field in METRIC_FIELDS))
+
+
 def upsert_song_for_source(
     rel: str,
     title_hint: str | None,
@@ -853,7 +1776,7 @@ def upsert_song_for_source(
     raw_metrics_json = "{}"
 
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             demo_value = None if is_demo is None else (1 if is_demo else 0)
             existing_by_id = None
@@ -934,48 +1857,7 @@ def upsert_song_for_source(
                             demo_value,
                         ),
                     )
-            conn.execute(
-                """
-                INSERT INTO song_metrics
-                (song_id, duration_sec, lufs_i, lra, true_peak_dbtp, target_i, target_tp, delta_i, tp_margin,
-                 crest_factor, dynamic_range, rms_level, peak_level, noise_floor, stereo_corr, width)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(song_id) DO UPDATE SET
-                    duration_sec=excluded.duration_sec,
-                    lufs_i=excluded.lufs_i,
-                    lra=excluded.lra,
-                    true_peak_dbtp=excluded.true_peak_dbtp,
-                    target_i=excluded.target_i,
-                    target_tp=excluded.target_tp,
-                    delta_i=excluded.delta_i,
-                    tp_margin=excluded.tp_margin,
-                    crest_factor=excluded.crest_factor,
-                    dynamic_range=excluded.dynamic_range,
-                    rms_level=excluded.rms_level,
-                    peak_level=excluded.peak_level,
-                    noise_floor=excluded.noise_floor,
-                    stereo_corr=excluded.stereo_corr,
-                    width=excluded.width
-                """,
-                (
-                    song_id,
-                    mapped_metrics["duration_sec"],
-                    mapped_metrics["lufs_i"],
-                    mapped_metrics["lra"],
-                    mapped_metrics["true_peak_dbtp"],
-                    mapped_metrics["target_i"],
-                    mapped_metrics["target_tp"],
-                    mapped_metrics["delta_i"],
-                    mapped_metrics["tp_margin"],
-                    mapped_metrics["crest_factor"],
-                    mapped_metrics["dynamic_range"],
-                    mapped_metrics["rms_level"],
-                    mapped_metrics["peak_level"],
-                    mapped_metrics["noise_floor"],
-                    mapped_metrics["stereo_corr"],
-                    mapped_metrics["width"],
-                ),
-            )
+            conn.execute(_SONG_METRICS_UPSERT_SQL, _metrics_params(song_id, mapped_metrics))
             conn.commit()
         finally:
             conn.close()
@@ -985,6 +1867,25 @@ def upsert_song_for_source(
     return song
 
 
+def _prepare_version(
+    kind: str,
+    summary: dict | None,
+    metrics: dict | None,
+    version_id: str | None,
+    utility: str | None,
+) -> tuple[str, str, str | None, str | None, float | None, str, dict]:
+    summary_clean = _strip_summary_metrics(summary)
+    metrics_payload = _merge_summary_metrics(metrics, summary)
+    meta_json = json.dumps(summary_clean) if summary_clean else "{}"
+    voicing = summary_clean.get("voicing") if isinstance(summary_clean, dict) else None
+    loudness_profile = summary_clean.get("loudness_profile") if isinstance(summary_clean, dict) else None
+    strength = _coerce_float(summary_clean.get("strength")) if isinstance(summary_clean, dict) else None
+    mapped_metrics = _map_metrics(metrics_payload, prefer_output=True)
+    version_id = version_id or new_version_id(kind)
+    utility_value = (utility or "").strip() or _utility_from_kind(kind)
+    return version_id, utility_value, voicing, loudness_profile, strength, meta_json, mapped_metrics
+
+
 def create_version_with_renditions(
     song_id: str,
     kind: str,
@@ -998,17 +1899,12 @@ def create_version_with_renditions(
 ) -> dict:
     init_db()
     now = _now_iso()
-    summary_clean = _strip_summary_metrics(summary)
-    metrics_payload = _merge_summary_metrics(metrics, summary)
-    meta_json = json.dumps(summary_clean) if summary_clean else "{}"
+    version_id, utility_value, voicing, loudness_profile, strength, meta_json, mapped_metrics = _prepare_version(
+        kind, summary, metrics, version_id, utility
+    )
     raw_metrics_json = "{}"
-    voicing = summary_clean.get("voicing") if isinstance(summary_clean, dict) else None
-    loudness_profile = summary_clean.get("loudness_profile") if isinstance(summary_clean, dict) else None
-    mapped_metrics = _map_metrics(metrics_payload, prefer_output=True)
-    version_id = version_id or new_version_id(kind)
-    utility_value = (utility or "").strip() or _utility_from_kind(kind)
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             exists = conn.execute("SELECT song_id FROM songs WHERE song_id = ?", (song_id,)).fetchone()
             if not exists:
@@ -1019,11 +1915,11 @@ def create_version_with_renditions(
                 conn.execute(
                     """
                     INSERT INTO versions (version_id, song_id, kind, title, label, utility, voicing, loudness_profile,
-                                          created_at, updated_at, meta_json, metrics_json)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                          strength, created_at, updated_at, meta_json, metrics_json)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """,
                     (version_id, song_id, kind, title, label, utility_value, voicing, loudness_profile,
-                     now, now, meta_json, raw_metrics_json),
+                     strength, now, now, meta_json, raw_metrics_json),
                 )
 
             try:
@@ -1037,48 +1933,7 @@ def create_version_with_renditions(
                     _insert_version_row()
                 else:
                     raise
-            conn.execute(
-                """
-                INSERT INTO version_metrics
-                (version_id, duration_sec, lufs_i, lra, true_peak_dbtp, target_i, target_tp, delta_i, tp_margin,
-                 crest_factor, dynamic_range, rms_level, peak_level, noise_floor, stereo_corr, width)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(version_id) DO UPDATE SET
-                    duration_sec=excluded.duration_sec,
-                    lufs_i=excluded.lufs_i,
-                    lra=excluded.lra,
-                    true_peak_dbtp=excluded.true_peak_dbtp,
-                    target_i=excluded.target_i,
-                    target_tp=excluded.target_tp,
-                    delta_i=excluded.delta_i,
-                    tp_margin=excluded.tp_margin,
-                    crest_factor=excluded.crest_factor,
-                    dynamic_range=excluded.dynamic_range,
-                    rms_level=excluded.rms_level,
-                    peak_level=excluded.peak_level,
-                    noise_floor=excluded.noise_floor,
-                    stereo_corr=excluded.stereo_corr,
-                    width=excluded.width
-                """,
-                (
-                    version_id,
-                    mapped_metrics["duration_sec"],
-                    mapped_metrics["lufs_i"],
-                    mapped_metrics["lra"],
-                    mapped_metrics["true_peak_dbtp"],
-                    mapped_metrics["target_i"],
-                    mapped_metrics["target_tp"],
-                    mapped_metrics["delta_i"],
-                    mapped_metrics["tp_margin"],
-                    mapped_metrics["crest_factor"],
-                    mapped_metrics["dynamic_range"],
-                    mapped_metrics["rms_level"],
-                    mapped_metrics["peak_level"],
-                    mapped_metrics["noise_floor"],
-                    mapped_metrics["stereo_corr"],
-                    mapped_metrics["width"],
-                ),
-            )
+            conn.execute(_VERSION_METRICS_UPSERT_SQL, _metrics_params(version_id, mapped_metrics))
             for rendition in renditions:
                 fmt = rendition.get("format") or _format_from_rel(rendition.get("rel"))
                 rel = rendition.get("rel")
@@ -1128,11 +1983,477 @@ def add_version(
     )
 
 
+LIBRARY_BULK_CHUNK = int(os.getenv("LIBRARY_BULK_CHUNK", "500"))
+
+
+def _note_bulk_rows(rows: int) -> None:
+    # Called under _WRITE_LOCK; run_maintenance() turns enough bulk churn into an ANALYZE.
+    global _ROWS_SINCE_ANALYZE
+    _ROWS_SINCE_ANALYZE += rows
+
+
+class LibraryBulkWriter:
+    """Queue library writes and apply them in chunked transactions on the writer connection.
+
+    Consecutive operations of the same kind are applied with executemany; a transaction is
+    committed every LIBRARY_BULK_CHUNK queued operations (and on flush()/exit), and _WRITE_LOCK
+    is only held while a chunk is applied. When a chunk fails it is replayed one operation at a
+    time (still one transaction) so only the offending operations land in `errors`.
+    """
+
+    def __init__(self, chunk: int | None = None) -> None:
+        init_db()
+        self.chunk = max(1, chunk or LIBRARY_BULK_CHUNK)
+        self.rows = 0
+        self.seconds = 0.0
+        self.errors: list[tuple[str, str | None, Exception]] = []
+        self._ops: list[tuple[str, tuple, str, str | None]] = []
+
+    def __enter__(self) -> "LibraryBulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
+
+    @property
+    def rows_per_sec(self) -> float:
+        return round(self.rows / self.seconds, 1) if self.seconds > 0 else 0.0
+
+    def _queue(self, kind: str, args: tuple, tag: str, song_id: str | None) -> None:
+        self._ops.append((kind, args, tag, song_id))
+        if len(self._ops) >= self.chunk:
+            self.flush()
+
+    def upsert_song(
+        self,
+        rel: str,
+        title_hint: str | None,
+        duration_sec: float | None,
+        fmt: str | None,
+        metrics: dict | None,
+        analyzed: bool,
+        song_id: str,
+        file_mtime_utc: str | None = None,
+        *,
+        tag: str | None = None,
+    ) -> None:
+        """Same semantics as upsert_song_for_source, but song_id is required up front."""
+        title = _clean_title(title_hint or Path(rel).stem)
+        mapped_metrics = _map_metrics(metrics, prefer_output=False, duration_override=duration_sec)
+        args = (song_id, title, rel, fmt, duration_sec, 1 if analyzed else 0, file_mtime_utc, mapped_metrics)
+        self._queue("song", args, tag or f"song:{song_id}", song_id)
+
+    def add_version(
+        self,
+        song_id: str,
+        kind: str,
+        label: str,
+        title: str,
+        summary: dict | None,
+        metrics: dict | None,
+        renditions: list[dict],
+        version_id: str | None = None,
+        utility: str | None = None,
+    ) -> str:
+        version_id, utility_value, voicing, loudness_profile, strength, meta_json, mapped_metrics = _prepare_version(
+            kind, summary, metrics, version_id, utility
+        )
+        rows = _rendition_rows(version_id, renditions)
+        args = (version_id, song_id, kind, title, label, utility_value, voicing, loudness_profile, strength,
+                meta_json, mapped_metrics, rows)
+        self._queue("version", args, f"version:{version_id}", song_id)
+        return version_id
+
+    def replace_renditions(self, song_id: str, version_id: str, renditions: list[dict]) -> None:
+        self._queue("renditions", (version_id, _rendition_rows(version_id, renditions)),
+                    f"renditions:{version_id}", song_id)
+
+    def set_song_metrics(self, song_id: str, metrics: dict) -> None:
+        """Store analysis results for a song source and mark it analyzed."""
+        duration_sec = _coerce_float(metrics.get("duration_sec"))
+        mapped_metrics = _map_metrics(metrics, prefer_output=False, duration_override=duration_sec)
+        self._queue("song_metrics", (song_id, duration_sec, mapped_metrics), f"song:{song_id}", song_id)
+
+    def set_version_metrics(self, song_id: str | None, version_id: str, metrics: dict) -> None:
+        mapped_metrics = _map_metrics(metrics, prefer_output=True)
+        self._queue("version_metrics", (version_id, mapped_metrics), f"version:{version_id}", song_id)
+
+    def set_source_hash(self, song_id: str, content_hash: str, pcm_hash: str | None = None) -> None:
+        self._queue("source_hash", (song_id, content_hash, pcm_hash), f"hash:{song_id}", song_id)
+
+    def set_rendition_hash(self, rendition_id: int, content_hash: str) -> None:
+        self._queue("rendition_hash", (rendition_id, content_hash), f"hash:rendition:{rendition_id}", None)
+
+    def set_file_hash(self, rel: str, content_hash: str | None) -> None:
+        """Re-fingerprint a file rewritten in place (source or rendition at rel); None clears it."""
+        self._queue("file_hash", (rel, content_hash), f"hash:{rel}", None)
+
+    def set_media_tags(self, rel: str, tags: dict) -> None:
+        """Record the title/artist/album tags of a library file for search (empty tags still mark it read)."""
+        args = (rel, tags.get("title") or None, tags.get("artist") or None, tags.get("album") or None)
+        self._queue("media_tags", args, f"tags:{rel}", None)
+
+    def delete_version(self, song_id: str | None, version_id: str) -> None:
+        self._queue("delete_version", (version_id,), f"delete:{version_id}", song_id)
+
+    def delete_song(self, song_id: str) -> None:
+        self._queue("delete_song", (song_id,), f"delete:{song_id}", song_id)
+
+    def flush(self) -> None:
+        if not self._ops:
+            return
+        ops, self._ops = self._ops, []
+        t0 = time.monotonic()
+        with _WRITE_LOCK:
+            conn = _write_conn()
+            try:
+                try:
+                    rows = self._apply(conn, ops)
+                    conn.commit()
+                except Exception as exc:
+                    conn.rollback()
+                    log_debug("db", "bulk chunk failed; replaying per operation", ops=len(ops), err=str(exc))
+                    rows = 0
+                    conn.execute("BEGIN")
+                    for op in ops:
+                        conn.execute("SAVEPOINT bulk_op")
+                        try:
+                            rows += self._apply(conn, [op])
+                            conn.execute("RELEASE bulk_op")
+                        except Exception as op_exc:
+                            conn.execute("ROLLBACK TO bulk_op")
+                            conn.execute("RELEASE bulk_op")
+                            self.errors.append((op[2], op[3], op_exc))
+                    conn.commit()
+                _note_bulk_rows(rows)
+            finally:
+                conn.close()
+        self.rows += rows
+        self.seconds += time.monotonic() - t0
+
+    def _apply(self, conn: sqlite3.Connection, ops: list[tuple[str, tuple, str, str | None]]) -> int:
+        rows = 0
+        start = 0
+        while start < len(ops):
+            end = start
+            while end < len(ops) and ops[end][0] == ops[start][0]:
+                end += 1
+            group = [op[1] for op in ops[start:end]]
+            rows += getattr(self, f"_apply_{ops[start][0]}")(conn, group)
+            start = end
+        return rows
+
+    def _apply_song(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        now = _now_iso()
+        song_ids = [args[0] for args in group]
+        rels = [args[2] for args in group]
+        by_id = {
+            row["song_id"]: row
+            for row in conn.execute(
+                f"SELECT song_id, is_demo FROM songs WHERE song_id IN ({','.join(['?'] * len(song_ids))})",
+                song_ids,
+            )
+        }
+        by_rel = {
+            row["source_rel"]: row["song_id"]
+            for row in conn.execute(
+                f"SELECT song_id, source_rel FROM songs WHERE source_rel IN ({','.join(['?'] * len(rels))})",
+                rels,
+            )
+        }
+        updates_by_id, updates_by_rel, inserts, metrics = [], [], [], []
+        for song_id, title, rel, fmt, duration_sec, analyzed, mtime, mapped_metrics in group:
+            if song_id in by_id:
+                updates_by_id.append((title, now, now, rel, fmt, duration_sec, analyzed, "{}", mtime,
+                                      by_id[song_id]["is_demo"], song_id))
+            elif rel in by_rel:
+                song_id = by_rel[rel]
+                updates_by_rel.append((title, now, now, fmt, duration_sec, analyzed, "{}", mtime, song_id))
+            else:
+                inserts.append((song_id, title, now, now, now, rel, fmt, duration_sec, analyzed, "{}", mtime, 0))
+                by_id[song_id] = {"is_demo": 0}
+                by_rel[rel] = song_id
+            metrics.append(_metrics_params(song_id, mapped_metrics))
+        conn.executemany(
+            """
+            UPDATE songs
+            SET title = ?, updated_at = ?, last_used_at = ?, source_rel = ?, source_format = ?, duration_sec = ?,
+                source_analyzed = ?, source_metrics_json = ?, file_mtime_utc = ?, is_demo = ?
+            WHERE song_id = ?
+            """,
+            updates_by_id,
+        )
+        conn.executemany(
+            """
+            UPDATE songs
+            SET title = ?, updated_at = ?, last_used_at = ?, source_format = ?, duration_sec = ?,
+                source_analyzed = ?, source_metrics_json = ?, file_mtime_utc = ?
+            WHERE song_id = ?
+            """,
+            updates_by_rel,
+        )
+        conn.executemany(
+            """
+            INSERT INTO songs (song_id, title, created_at, updated_at, last_used_at, source_rel,
+                               source_format, duration_sec, source_analyzed, source_metrics_json, file_mtime_utc,
+                               is_demo)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            inserts,
+        )
+        conn.executemany(_SONG_METRICS_UPSERT_SQL, metrics)
+        return len(group) + len(metrics)
+
+    def _apply_version(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        now = _now_iso()
+        song_ids = sorted({args[1] for args in group})
+        known = {
+            row[0]
+            for row in conn.execute(
+                f"SELECT song_id FROM songs WHERE song_id IN ({','.join(['?'] * len(song_ids))})",
+                song_ids,
+            )
+        }
+        if known != set(song_ids):
+            raise ValueError("song_not_found")
+        if any(not args[11] for args in group):
+            raise ValueError("missing_renditions")
+        conn.executemany(
+            """
+            INSERT INTO versions (version_id, song_id, kind, title, label, utility, voicing, loudness_profile,
+                                  strength, created_at, updated_at, meta_json, metrics_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(vid, sid, kind, title, label, utility, voicing, profile, strength, now, now, meta_json, "{}")
+             for vid, sid, kind, title, label, utility, voicing, profile, strength, meta_json, _m, _r in group],
+        )
+        conn.executemany(_VERSION_METRICS_UPSERT_SQL, [_metrics_params(args[0], args[10]) for args in group])
+        rendition_rows = [row for args in group for row in args[11]]
+        conn.executemany("INSERT INTO renditions (version_id, format, rel) VALUES (?, ?, ?)", rendition_rows)
+        conn.executemany(
+            "UPDATE songs SET updated_at = ?, last_used_at = ? WHERE song_id = ?",
+            [(now, now, song_id) for song_id in song_ids],
+        )
+        return 2 * len(group) + len(rendition_rows) + len(song_ids)
+
+    def _apply_renditions(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        now = _now_iso()
+        conn.executemany("DELETE FROM renditions WHERE version_id = ?", [(args[0],) for args in group])
+        rendition_rows = [row for args in group for row in args[1]]
+        conn.executemany("INSERT INTO renditions (version_id, format, rel) VALUES (?, ?, ?)", rendition_rows)
+        conn.executemany(
+            "UPDATE versions SET updated_at = ? WHERE version_id = ?",
+            [(now, args[0]) for args in group],
+        )
+        return 2 * len(group) + len(rendition_rows)
+
+    def _apply_song_metrics(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        now = _now_iso()
+        conn.executemany(
+            "UPDATE songs SET source_analyzed = 1, duration_sec = COALESCE(?, duration_sec), updated_at = ? "
+            "WHERE song_id = ?",
+            [(duration_sec, now, song_id) for song_id, duration_sec, _m in group],
+        )
+        conn.executemany(_SONG_METRICS_UPSERT_SQL, [_metrics_params(song_id, m) for song_id, _d, m in group])
+        return 2 * len(group)
+
+    def _apply_version_metrics(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        now = _now_iso()
+        conn.executemany(_VERSION_METRICS_UPSERT_SQL, [_metrics_params(vid, m) for vid, m in group])
+        conn.executemany("UPDATE versions SET updated_at = ? WHERE version_id = ?", [(now, vid) for vid, _m in group])
+        return 2 * len(group)
+
+    def _apply_source_hash(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        conn.executemany(
+            "UPDATE songs SET content_hash = ?, pcm_hash = COALESCE(?, pcm_hash) WHERE song_id = ?",
+            [(content_hash, pcm_hash, song_id) for song_id, content_hash, pcm_hash in group],
+        )
+        return len(group)
+
+    def _apply_rendition_hash(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        conn.executemany(
+            "UPDATE renditions SET content_hash = ? WHERE rendition_id = ?",
+            [(content_hash, rendition_id) for rendition_id, content_hash in group],
+        )
+        return len(group)
+
+    def _apply_file_hash(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        conn.executemany(
+            "UPDATE renditions SET content_hash = ? WHERE rel = ?",
+            [(content_hash, rel) for rel, content_hash in group],
+        )
+        conn.executemany(
+            "UPDATE songs SET content_hash = ? WHERE source_rel = ?",
+            [(content_hash, rel) for rel, content_hash in group],
+        )
+        return len(group)
+
+    def _apply_media_tags(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        now = _now_iso()
+        conn.executemany(
+            """
+            INSERT INTO media_tags (rel, title, artist, album, updated_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(rel) DO UPDATE SET title = excluded.title, artist = excluded.artist,
+                album = excluded.album, updated_at = excluded.updated_at
+            """,
+            [(*args, now) for args in group],
+        )
+        return len(group)
+
+    def _apply_delete_version(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        conn.executemany("DELETE FROM versions WHERE version_id = ?", group)
+        return len(group)
+
+    def _apply_delete_song(self, conn: sqlite3.Connection, group: list[tuple]) -> int:
+        conn.executemany("DELETE FROM songs WHERE song_id = ?", group)
+        return len(group)
+
+
+def _rendition_rows(version_id: str, renditions: list[dict]) -> list[tuple[str, str, str]]:
+    rows = []
+    for rendition in renditions or []:
+        fmt = rendition.get("format") or _format_from_rel(rendition.get("rel"))
+        rel = rendition.get("rel")
+        if fmt and rel:
+            rows.append((version_id, fmt, rel))
+    return rows
+
+
+def pending_analysis(limit: int) -> list[dict]:
+    """Unanalyzed song sources and versions without metrics, newest first (songs before versions).
+
+    Items are {"kind": "song"|"version", "id", "song_id", "rel"}.
+    """
+    init_db()
+    limit = max(0, int(limit))
+    conn = _read_conn()
+    try:
+        items = [
+            {"kind": "song", "id": row["song_id"], "song_id": row["song_id"], "rel": row["source_rel"]}
+            for row in conn.execute(
+                "SELECT song_id, source_rel FROM songs WHERE source_analyzed = 0 ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            )
+        ]
+        if len(items) >= limit:
+            return items
+        version_rows = conn.execute(
+            """
+            SELECT v.version_id, v.song_id FROM versions v
+            LEFT JOIN version_metrics m ON m.version_id = v.version_id
+            WHERE m.version_id IS NULL OR (m.duration_sec IS NULL AND m.lufs_i IS NULL AND m.true_peak_dbtp IS NULL)
+            ORDER BY v.created_at DESC LIMIT ?
+            """,
+            (limit - len(items),),
+        ).fetchall()
+        renditions_map: dict[str, list[dict]] = {}
+        if version_rows:
+            version_ids = [row["version_id"] for row in version_rows]
+            placeholders = ",".join(["?"] * len(version_ids))
+            for row in conn.execute(
+                f"SELECT version_id, format, rel FROM renditions WHERE version_id IN ({placeholders}) ORDER BY rendition_id",
+                version_ids,
+            ):
+                renditions_map.setdefault(row["version_id"], []).append({"format": row["format"], "rel": row["rel"]})
+    finally:
+        conn.close()
+    for row in version_rows:
+        primary = _primary_rendition(renditions_map.get(row["version_id"], []))
+        if primary and primary.get("rel"):
+            items.append({"kind": "version", "id": row["version_id"], "song_id": row["song_id"], "rel": primary["rel"]})
+    return items
+
+
+def pending_hashes(limit: int) -> list[dict]:
+    """Song sources and renditions that have no content hash yet: [{"kind": "song"|"rendition", "id", "rel"}]."""
+    init_db()
+    limit = max(0, int(limit))
+    conn = _read_conn()
+    try:
+        items = [
+            {"kind": "song", "id": row["song_id"], "rel": row["source_rel"]}
+            for row in conn.execute(
+                "SELECT song_id, source_rel FROM songs WHERE content_hash IS NULL ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            )
+        ]
+        if len(items) < limit:
+            items.extend(
+                {"kind": "rendition", "id": row["rendition_id"], "rel": row["rel"]}
+                for row in conn.execute(
+                    "SELECT rendition_id, rel FROM renditions WHERE content_hash IS NULL ORDER BY rendition_id DESC LIMIT ?",
+                    (limit - len(items),),
+                )
+            )
+    finally:
+        conn.close()
+    return items
+
+
+def find_duplicate(content_hash: str | None, pcm_hash: str | None = None) -> dict | None:
+    """Existing library audio with the same bytes (or, failing that, the same decoded PCM).
+
+    Returns {"kind": "source"|"rendition", "match": "content"|"pcm", "song_id", "version_id", "rel",
+    "analyzed", "metrics"} with analyzed sources preferred, or None. Only a "content" match is
+    byte-identical; a "pcm" match is a different encoding of the same audio.
+    """
+    if not content_hash and not pcm_hash:
+        return None
+    init_db()
+    conn = _read_conn()
+    try:
+        for column, match, value in (("content_hash", "content", content_hash), ("pcm_hash", "pcm", pcm_hash)):
+            if not value:
+                continue
+            row = conn.execute(
+                f"SELECT * FROM songs WHERE {column} = ? ORDER BY source_analyzed DESC, created_at LIMIT 1",
+                (value,),
+            ).fetchone()
+            if row:
+                metrics_row = conn.execute("SELECT * FROM song_metrics WHERE song_id = ?", (row["song_id"],)).fetchone()
+                return {
+                    "kind": "source",
+                    "match": match,
+                    "song_id": row["song_id"],
+                    "version_id": None,
+                    "rel": row["source_rel"],
+                    "analyzed": bool(row["source_analyzed"]),
+                    "metrics": _metrics_from_row(metrics_row, duration_override=row["duration_sec"]),
+                }
+        if not content_hash:
+            return None
+        row = conn.execute(
+            """
+            SELECT r.rel AS dup_rel, v.version_id AS dup_version_id, v.song_id AS dup_song_id, m.*
+            FROM renditions r
+            JOIN versions v ON v.version_id = r.version_id
+            LEFT JOIN version_metrics m ON m.version_id = v.version_id
+            WHERE r.content_hash = ? LIMIT 1
+            """,
+            (content_hash,),
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    metrics = _metrics_from_row(row)
+    return {
+        "kind": "rendition",
+        "match": "content",
+        "song_id": row["dup_song_id"],
+        "version_id": row["dup_version_id"],
+        "rel": row["dup_rel"],
+        "analyzed": any(metrics.get(field) is not None for field in ("duration_sec", "lufs_i", "true_peak_dbtp")),
+        "metrics": metrics,
+    }
+
+
 def delete_song(song_id: str) -> tuple[bool, list[str]]:
     init_db()
     rels: list[str] = []
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             row = conn.execute("SELECT source_rel FROM songs WHERE song_id = ?", (song_id,)).fetchone()
             if not row:
@@ -1158,7 +2479,7 @@ def delete_version(song_id: str, version_id: str) -> tuple[bool, list[str]]:
     init_db()
     rels: list[str] = []
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             row = conn.execute(
                 "SELECT version_id FROM versions WHERE song_id = ? AND version_id = ?",
@@ -1184,7 +2505,7 @@ def remove_rendition(song_id: str, version_id: str, rel: str) -> tuple[bool, lis
         return False, [], "missing_rel"
     removed: list[str] = []
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             row = conn.execute(
                 "SELECT version_id FROM versions WHERE song_id = ? AND version_id = ?",
@@ -1224,7 +2545,7 @@ def add_rendition(song_id: str, version_id: str, fmt: str, rel: str) -> bool:
         return False
     now = _now_iso()
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             row = conn.execute(
                 "SELECT version_id FROM versions WHERE song_id = ? AND version_id = ?",
@@ -1256,7 +2577,7 @@ def promote_version(version_id: str) -> bool:
     init_db()
     now = _now_iso()
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             row = conn.execute(
                 "SELECT song_id FROM versions WHERE version_id = ?",
@@ -1283,7 +2604,7 @@ def rename_song(song_id: str, title: str) -> bool:
     init_db()
     new_title = _clean_title(title)
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             cur = conn.execute("UPDATE songs SET title = ?, updated_at = ? WHERE song_id = ?", (_clean_title(new_title), _now_iso(), song_id))
             conn.commit()
@@ -1295,7 +2616,7 @@ def rename_song(song_id: str, title: str) -> bool:
 def update_last_used(song_id: str) -> None:
     init_db()
     with _WRITE_LOCK:
-        conn = _connect()
+        conn = _write_conn()
         try:
             conn.execute("UPDATE songs SET last_used_at = ? WHERE song_id = ?", (_now_iso(), song_id))
             conn.commit()
@@ -1333,7 +2654,8 @@ def reconcile_library_fs(max_log_examples: int = 10) -> dict:
     kept_versions = 0
     kept_songs = 0
     examples: list[str] = []
-    conn = _connect()
+    writer = LibraryBulkWriter()
+    conn = _read_conn()
     try:
         song_rows = conn.execute("SELECT song_id, source_rel, is_demo FROM songs").fetchall()
         version_rows = conn.execute("SELECT version_id, song_id FROM versions").fetchall()
@@ -1406,14 +2728,13 @@ def reconcile_library_fs(max_log_examples: int = 10) -> dict:
                 if len(examples) < max_log_examples:
                     examples.append(f"version:{version_id} wav=missing")
 
-        with _WRITE_LOCK:
-            if removed_versions:
-                placeholders = ",".join(["?"] * len(removed_versions))
-                conn.execute(f"DELETE FROM versions WHERE version_id IN ({placeholders})", removed_versions)
-            if removed_songs:
-                placeholders = ",".join(["?"] * len(removed_songs))
-                conn.execute(f"DELETE FROM songs WHERE song_id IN ({placeholders})", removed_songs)
-            conn.commit()
+        with writer:
+            for version_id in removed_versions:
+                writer.delete_version(None, version_id)
+            for song_id in removed_songs:
+                writer.delete_song(song_id)
+        for tag, _song_id, exc in writer.errors:
+            log_error("db", "reconcile delete failed", item=tag, err=str(exc))
     except Exception as exc:
         log_error("db", "reconcile failed", err=str(exc))
     finally:
@@ -1424,6 +2745,7 @@ def reconcile_library_fs(max_log_examples: int = 10) -> dict:
         "reconcile removed",
         removed_songs=len(removed_songs),
         removed_versions=len(removed_versions),
+        rows_per_sec=writer.rows_per_sec,
     )
     if examples:
         log_debug("db", "reconcile examples", examples=examples)
@@ -1432,10 +2754,112 @@ def reconcile_library_fs(max_log_examples: int = 10) -> dict:
         "removed_songs": len(removed_songs),
         "kept_versions": kept_versions,
         "kept_songs": kept_songs,
+        "db_rows": writer.rows,
+        "rows_per_sec": writer.rows_per_sec,
     }
 
 
-def sync_library_fs(max_log_examples: int = 10) -> dict:
+# Directories whose mtime is this close to the scan start are re-listed next time, since a
+# same-tick change (coarse NAS timestamps) would otherwise go unnoticed.
+FS_INDEX_RACY_NS = 2_000_000_000
+
+
+def _fs_index_visit(
+    path: Path,
+    parent: str | None,
+    fs_index: dict[str, dict],
+    index_children: dict[str, list[str]],
+    seen: dict[str, dict],
+    scan_ns: int,
+) -> tuple[bool, list[str]]:
+    """Check one directory against its fs_index signature; returns (changed, subdirectory names).
+
+    The directory is only listed when its mtime moved; otherwise its subdirectories come from the index.
+    """
+    key = str(path)
+    prev = fs_index.get(key)
+    try:
+        st = path.stat()
+    except OSError:
+        return prev is not None, []
+    if prev and prev["mtime_ns"] and prev["mtime_ns"] == st.st_mtime_ns:
+        seen[key] = prev
+        return False, [Path(child).name for child in index_children.get(key, [])]
+    try:
+        with os.scandir(path) as it:
+            entries = sorted((entry.name, entry.is_dir()) for entry in it)
+    except OSError:
+        return prev is not None, []
+    names = [name for name, _is_dir in entries]
+    names_hash = hashlib.blake2b("\0".join(names).encode("utf-8", "surrogateescape"), digest_size=16).hexdigest()
+    mtime_ns = 0 if st.st_mtime_ns >= scan_ns - FS_INDEX_RACY_NS else st.st_mtime_ns
+    seen[key] = {
+        "path": key,
+        "parent": parent,
+        "mtime_ns": mtime_ns,
+        "entries": len(names),
+        "names_hash": names_hash,
+    }
+    changed = not prev or prev["entries"] != len(names) or prev["names_hash"] != names_hash
+    return changed, [name for name, is_dir in entries if is_dir]
+
+
+def _fs_song_tree_changed(
+    song_dir: Path,
+    fs_index: dict[str, dict],
+    index_children: dict[str, list[str]],
+    seen: dict[str, dict],
+    scan_ns: int,
+) -> bool:
+    """Visit every directory sync_library_fs reads for one song (no short-circuit, so `seen` is complete)."""
+    changed, subdirs = _fs_index_visit(song_dir, str(SONGS_DIR), fs_index, index_children, seen, scan_ns)
+    if "source" in subdirs:
+        changed |= _fs_index_visit(song_dir / "source", str(song_dir), fs_index, index_children, seen, scan_ns)[0]
+    if "versions" in subdirs:
+        versions_dir = song_dir / "versions"
+        versions_changed, version_names = _fs_index_visit(
+            versions_dir, str(song_dir), fs_index, index_children, seen, scan_ns
+        )
+        changed |= versions_changed
+        for name in version_names:
+            changed |= _fs_index_visit(
+                versions_dir / name, str(versions_dir), fs_index, index_children, seen, scan_ns
+            )[0]
+    return changed
+
+
+def _fs_index_save(fs_index: dict[str, dict], seen: dict[str, dict], failed_songs: set[str]) -> None:
+    """Persist new signatures. Songs that failed to sync lose theirs so the next sync rescans them."""
+    failed_prefixes = tuple(str(SONGS_DIR / song_id) for song_id in failed_songs)
+
+    def _failed(path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + os.sep) for prefix in failed_prefixes)
+
+    upserts = [
+        (row["path"], row["parent"], row["mtime_ns"], row["entries"], row["names_hash"])
+        for path, row in seen.items()
+        if row is not fs_index.get(path) and not _failed(path)
+    ]
+    deletes = [(path,) for path in fs_index if path not in seen or _failed(path)]
+    if not upserts and not deletes:
+        return
+    with _WRITE_LOCK:
+        conn = _write_conn()
+        try:
+            conn.executemany(
+                "INSERT INTO fs_index (path, parent, mtime_ns, entries, names_hash) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET parent = excluded.parent, mtime_ns = excluded.mtime_ns, "
+                "entries = excluded.entries, names_hash = excluded.names_hash",
+                upserts,
+            )
+            conn.executemany("DELETE FROM fs_index WHERE path = ?", deletes)
+            conn.commit()
+        finally:
+            conn.close()
+    log_debug("db", "fs_index saved", updated=len(upserts), removed=len(deletes))
+
+
+def sync_library_fs(max_log_examples: int = 10, full: bool = False) -> dict:
     init_db()
     ensure_data_roots()
     t0 = time.monotonic()
@@ -1446,6 +2870,8 @@ def sync_library_fs(max_log_examples: int = 10) -> dict:
     removed_versions = 0
     imported_from_inbox = 0
     examples: list[str] = []
+    failed_songs: set[str] = set()
+    writer = LibraryBulkWriter()
 
     try:
         LIBRARY_IMPORT_DIR.mkdir(parents=True, exist_ok=True)
@@ -1472,27 +2898,51 @@ def sync_library_fs(max_log_examples: int = 10) -> dict:
             fp.replace(dest)
             rel = rel_from_path(dest)
             fmt = dest.suffix.lower().lstrip(".")
-            upsert_song_for_source(
-                rel,
-                dest.stem,
-                None,
-                fmt,
-                {},
-                False,
-                song_id=song_id,
-            )
+            writer.upsert_song(rel, dest.stem, None, fmt, {}, False, song_id, tag=f"inbox:{fp.name}")
             imported_from_inbox += 1
             imported_songs += 1
         except Exception as exc:
             errors.append(f"inbox:{fp.name}:{exc!r}")
+    # Inbox songs must be visible to the diff below.
+    writer.flush()
+
+    # Only song trees whose directory signatures moved since the last sync are rescanned
+    # and diffed; an empty fs_index (first run) or full=True rescans everything.
+    scan_ns = time.time_ns()
+    conn = _read_conn()
+    try:
+        fs_index = {row["path"]: dict(row) for row in conn.execute("SELECT * FROM fs_index")}
+        db_song_ids = {row[0] for row in conn.execute("SELECT song_id FROM songs")}
+    except Exception as exc:
+        conn.close()
+        errors.append(f"db_read:{exc!r}")
+        fs_index = {}
+        db_song_ids = set()
+    full = full or not fs_index
+    index_children: dict[str, list[str]] = {}
+    for path, row in fs_index.items():
+        if row["parent"] is not None:
+            index_children.setdefault(row["parent"], []).append(path)
+    seen: dict[str, dict] = {}
+    song_names: list[str] = []
+    dirty: set[str] = set()
+    if SONGS_DIR.exists():
+        _changed, song_names = _fs_index_visit(SONGS_DIR, None, fs_index, index_children, seen, scan_ns)
+        for name in song_names:
+            if _fs_song_tree_changed(SONGS_DIR / name, fs_index, index_children, seen, scan_ns) or full:
+                dirty.add(name)
+    # Folders whose song row is gone and song rows whose folder is gone are always rescanned,
+    # whatever their directory signatures say.
+    dirty |= db_song_ids - set(song_names)
+    dirty |= set(song_names) - db_song_ids
 
     fs_songs: dict[str, dict] = {}
     fs_versions: dict[tuple[str, str], list[dict]] = {}
     if SONGS_DIR.exists():
-        for song_dir in SONGS_DIR.iterdir():
+        for song_id in sorted(dirty):
+            song_dir = SONGS_DIR / song_id
             if not song_dir.is_dir():
                 continue
-            song_id = song_dir.name
             source_dir = song_dir / "source"
             source_files = _iter_audio_files(source_dir)
             source_file = _pick_preferred_file(source_files)
@@ -1522,11 +2972,25 @@ def sync_library_fs(max_log_examples: int = 10) -> dict:
                     })
                 fs_versions[(song_id, version_id)] = renditions
 
-    conn = _connect()
+    song_rows: list[sqlite3.Row] = []
+    version_rows: list[sqlite3.Row] = []
+    rendition_rows: list[sqlite3.Row] = []
     try:
-        song_rows = conn.execute("SELECT song_id, source_rel, title FROM songs").fetchall()
-        version_rows = conn.execute("SELECT song_id, version_id FROM versions").fetchall()
-        rendition_rows = conn.execute("SELECT version_id, format, rel FROM renditions").fetchall()
+        dirty_ids = sorted(dirty)
+        for start in range(0, len(dirty_ids), 500):
+            chunk = dirty_ids[start:start + 500]
+            placeholders = ",".join(["?"] * len(chunk))
+            song_rows += conn.execute(
+                f"SELECT song_id, source_rel, title FROM songs WHERE song_id IN ({placeholders})", chunk
+            ).fetchall()
+            version_rows += conn.execute(
+                f"SELECT song_id, version_id FROM versions WHERE song_id IN ({placeholders})", chunk
+            ).fetchall()
+            rendition_rows += conn.execute(
+                "SELECT r.version_id, r.format, r.rel FROM renditions r "
+                f"JOIN versions v ON v.version_id = r.version_id WHERE v.song_id IN ({placeholders})",
+                chunk,
+            ).fetchall()
     except Exception as exc:
         conn.close()
         errors.append(f"db_read:{exc!r}")
@@ -1556,18 +3020,7 @@ def sync_library_fs(max_log_examples: int = 10) -> dict:
             imported_songs += 1
         db_rel = (db_row["source_rel"] if db_row else "") or ""
         if not db_row or db_rel.lstrip("/") != fs_entry["source_rel"].lstrip("/"):
-            try:
-                upsert_song_for_source(
-                    fs_entry["source_rel"],
-                    title,
-                    None,
-                    fs_entry["format"],
-                    {},
-                    False,
-                    song_id=song_id,
-                )
-            except Exception as exc:
-                errors.append(f"song:{song_id}:{exc!r}")
+            writer.upsert_song(fs_entry["source_rel"], title, None, fs_entry["format"], {}, False, song_id)
 
     for (song_id, version_id), renditions in fs_versions.items():
         if (song_id, version_id) not in db_versions:
@@ -1579,44 +3032,14 @@ def sync_library_fs(max_log_examples: int = 10) -> dict:
             )
             kind = "master" if "master" in version_id.lower() else "version"
             label = "Master" if kind == "master" else "Version"
-            try:
-                create_version_with_renditions(
-                    song_id,
-                    kind,
-                    label,
-                    song_title,
-                    {},
-                    {},
-                    renditions,
-                    version_id=version_id,
-                )
-                imported_versions += 1
-            except Exception as exc:
-                errors.append(f"version:{version_id}:{exc!r}")
+            writer.add_version(song_id, kind, label, song_title, {}, {}, renditions, version_id=version_id)
+            imported_versions += 1
             continue
         existing = renditions_map.get(version_id, [])
         existing_rels = sorted([r.get("rel") for r in existing if r.get("rel")])
         new_rels = sorted([r.get("rel") for r in renditions if r.get("rel")])
         if existing_rels != new_rels:
-            try:
-                with _WRITE_LOCK:
-                    conn.execute("DELETE FROM renditions WHERE version_id = ?", (version_id,))
-                    for rendition in renditions:
-                        fmt = rendition.get("format") or _format_from_rel(rendition.get("rel"))
-                        rel = rendition.get("rel")
-                        if not fmt or not rel:
-                            continue
-                        conn.execute(
-                            "INSERT INTO renditions (version_id, format, rel) VALUES (?, ?, ?)",
-                            (version_id, fmt, rel),
-                        )
-                    conn.execute(
-                        "UPDATE versions SET updated_at = ? WHERE version_id = ?",
-                        (_now_iso(), version_id),
-                    )
-                    conn.commit()
-            except Exception as exc:
-                errors.append(f"renditions:{version_id}:{exc!r}")
+            writer.replace_renditions(song_id, version_id, renditions)
 
     for song_id in db_songs.keys():
         if song_id not in fs_songs:
@@ -1629,22 +3052,28 @@ def sync_library_fs(max_log_examples: int = 10) -> dict:
             if len(examples) < max_log_examples:
                 examples.append(f"version:{key[1]}")
 
-    if removed_versions or removed_songs:
-        try:
-            with _WRITE_LOCK:
-                if removed_versions:
-                    version_ids = [vid for (_sid, vid) in db_versions if ( _sid, vid) not in fs_versions]
-                    placeholders = ",".join(["?"] * len(version_ids))
-                    conn.execute(f"DELETE FROM versions WHERE version_id IN ({placeholders})", version_ids)
-                if removed_songs:
-                    song_ids = [sid for sid in db_songs.keys() if sid not in fs_songs]
-                    placeholders = ",".join(["?"] * len(song_ids))
-                    conn.execute(f"DELETE FROM songs WHERE song_id IN ({placeholders})", song_ids)
-                conn.commit()
-        except Exception as exc:
-            errors.append(f"delete:{exc!r}")
+    for song_id, version_id in db_versions:
+        if (song_id, version_id) not in fs_versions:
+            writer.delete_version(song_id, version_id)
+    for song_id in db_songs.keys():
+        if song_id not in fs_songs:
+            writer.delete_song(song_id)
+    writer.flush()
+    for tag, song_id, exc in writer.errors:
+        errors.append(f"{tag}:{exc!r}")
+        if song_id:
+            failed_songs.add(song_id)
+        if tag.startswith("inbox:"):
+            imported_from_inbox -= 1
+            imported_songs -= 1
+        elif tag.startswith("version:"):
+            imported_versions -= 1
 
     conn.close()
+    try:
+        _fs_index_save(fs_index, seen, failed_songs)
+    except Exception as exc:
+        errors.append(f"fs_index:{exc!r}")
     total_ms = (time.monotonic() - t0) * 1000
     log_summary(
         "db",
@@ -1654,6 +3083,10 @@ def sync_library_fs(max_log_examples: int = 10) -> dict:
         removed_songs=removed_songs,
         removed_versions=removed_versions,
         imported_from_inbox=imported_from_inbox,
+        scanned_songs=len(dirty),
+        full=full,
+        db_rows=writer.rows,
+        rows_per_sec=writer.rows_per_sec,
         ms=round(total_ms, 1),
     )
     if examples:
@@ -1664,5 +3097,9 @@ def sync_library_fs(max_log_examples: int = 10) -> dict:
         "removed_songs": removed_songs,
         "removed_versions": removed_versions,
         "imported_from_inbox": imported_from_inbox,
+        "scanned_songs": len(dirty),
+        "full": full,
+        "db_rows": writer.rows,
+        "rows_per_sec": writer.rows_per_sec,
         "errors": errors,
     }
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import argparse, json, shlex, subprocess, sys, re, os, time, hashlib
+import argparse, json, shlex, subprocess, sys, re, os, time, hashlib, signal
 import threading
 from pathlib import Path
 import shutil
@@ -302,8 +302,161 @@ def analyze_reference(path: Path) -> dict:
         "crest_factor": cf_corr.get("crest_factor"),
     }
 
-def run_ffmpeg(cmd: list[str], *, stage: str = "ffmpeg", capture: bool = True):
-    """Run ffmpeg (or similar) with logging and optional capture."""
+FFMPEG_PROGRESS_INTERVAL_SEC = float(os.getenv("FFMPEG_PROGRESS_INTERVAL_SEC", "1.0"))
+FFMPEG_POLL_SEC = 0.2
+
+class JobCancelled(RuntimeError):
+    """Raised when a running job is cancelled via its cancel event."""
+
+# Per-thread job context: source duration/preset for progress events and the cancel event.
+_JOB_CTX = threading.local()
+
+def _set_job_context(**kwargs) -> None:
+    for key, val in kwargs.items():
+        setattr(_JOB_CTX, key, val)
+
+def _job_context(key: str, default=None):
+    return getattr(_JOB_CTX, key, default)
+
+def _check_cancelled() -> None:
+    cancel = _job_context("cancel_event")
+    if cancel is not None and cancel.is_set():
+        raise JobCancelled("cancelled")
+
+def _probe_duration(path: Path) -> float | None:
+    try:
+        res = subprocess.run(
+            [FFPROBE_BIN, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False,
+        )
+        dur = float((res.stdout or "").strip().splitlines()[0])
+    except Exception:
+        return None
+    return dur if dur > 0 else None
+
+def _kill_process_tree(proc: subprocess.Popen) -> None:
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    except Exception:
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+def _run_ffmpeg_streaming(cmd: list[str], *, stage: str, progress: str | None, capture: bool):
+    """Popen-based runner: parses `-progress pipe:1` output into throttled percentage
+    events and kills the ffmpeg process tree when the job's cancel event is set."""
+    _check_cancelled()
+    cancel = _job_context("cancel_event")
+    duration = _job_context("duration_sec") if progress else None
+    preset = _job_context("preset")
+    event_cb = _get_event_cb()
+    argv = list(cmd)
+    if progress:
+        argv = [argv[0], "-progress", "pipe:1", "-nostats"] + argv[1:]
+    log_debug(stage, "exec", args=argv)
+    popen_kw = {}
+    if os.name == "posix":
+        popen_kw["start_new_session"] = True
+    elif hasattr(subprocess, "CREATE_NEW_PROCESS_GROUP"):
+        popen_kw["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    proc = subprocess.Popen(
+        argv,
+        text=True,
+        stdout=subprocess.PIPE if (capture or progress) else None,
+        stderr=subprocess.PIPE if capture else None,
+        **popen_kw,
+    )
+    out_chunks: list[str] = []
+    err_chunks: list[str] = []
+    state = {"last_emit": 0.0, "last_pct": -1.0}
+
+    def _emit_progress(pct: float) -> None:
+        now = time.monotonic()
+        if state["last_pct"] >= 100.0:
+            return
+        if pct < 100.0 and (now - state["last_emit"] < FFMPEG_PROGRESS_INTERVAL_SEC or pct - state["last_pct"] < 1.0):
+            return
+        state["last_emit"] = now
+        state["last_pct"] = pct
+        if not event_cb:
+            return
+        try:
+            event_cb({
+                "ts": round(time.time(), 3),
+                "stage": "progress",
+                "detail": f"{progress} {pct:.0f}%",
+                "preset": preset,
+                "progress_stage": progress,
+                "percent": round(pct, 1),
+            })
+        except Exception:
+            pass
+
+    def _read_stdout() -> None:
+        for line in proc.stdout:
+            if not progress:
+                out_chunks.append(line)
+                continue
+            key, _, val = line.strip().partition("=")
+            if key in ("out_time_us", "out_time_ms") and duration:
+                # ffmpeg reports both keys in microseconds
+                try:
+                    pct = min(100.0, max(0.0, int(val) / 1e6 / duration * 100.0))
+                except ValueError:
+                    continue
+                _emit_progress(pct)
+            elif key == "progress" and val == "end" and duration:
+                _emit_progress(100.0)
+
+    def _read_stderr() -> None:
+        for line in proc.stderr:
+            err_chunks.append(line)
+
+    readers = []
+    if proc.stdout is not None:
+        readers.append(threading.Thread(target=_read_stdout, daemon=True))
+    if proc.stderr is not None:
+        readers.append(threading.Thread(target=_read_stderr, daemon=True))
+    for t in readers:
+        t.start()
+    cancelled = False
+    while True:
+        try:
+            proc.wait(timeout=FFMPEG_POLL_SEC)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                _kill_process_tree(proc)
+                proc.wait()
+                break
+    for t in readers:
+        t.join(timeout=2)
+    if cancelled:
+        log_summary(stage, "cancelled", pid=proc.pid)
+        raise JobCancelled("cancelled")
+    res = subprocess.CompletedProcess(argv, proc.returncode, "".join(out_chunks), "".join(err_chunks))
+    if res.returncode != 0:
+        stderr_tail = (res.stderr or "")[-1000:] if capture else ""
+        log_error(stage, "returncode", returncode=res.returncode, stderr=stderr_tail)
+    return res
+
+def run_ffmpeg(cmd: list[str], *, stage: str = "ffmpeg", capture: bool = True, progress: str | None = None):
+    """Run ffmpeg (or similar) with logging and optional capture.
+    progress names the stage for percentage events (measure/apply/encode); jobs with a
+    cancel event always use the streaming runner so the child can be killed."""
+    if progress or _job_context("cancel_event") is not None:
+        return _run_ffmpeg_streaming(cmd, stage=stage, progress=progress, capture=capture)
     log_debug(stage, "exec", args=cmd)
     res = subprocess.run(
         cmd,
@@ -381,7 +534,7 @@ def run_ffmpeg_wav(input_path: Path, output_path: Path, af: str, sample_rate: in
         "-af", af,
         "-ar", str(sample_rate), "-ac", "2", "-c:a", _pcm_codec_for_depth(bit_depth),
         str(output_path)
-    ], stage="tone_render")
+    ], stage="tone_render", progress="apply")
     if r.returncode != 0:
         raise RuntimeError(r.stderr.strip() or "ffmpeg failed")
 
@@ -424,6 +577,8 @@ def render_with_static_loudness(source: Path, tone_filters: str, final_wav: Path
     # Pass 1: measure
     try:
         stats = loudnorm_measure_json(source, tone_filters or "anull", target_I, target_TP, target_LRA)
+    except JobCancelled:
+        raise
     except Exception as exc:
         print(f"[loudness] {log_label} measure failed: {exc}", file=sys.stderr, flush=True)
         # fallback to tone render without loudnorm
@@ -451,7 +606,7 @@ def render_with_static_loudness(source: Path, tone_filters: str, final_wav: Path
         "-af", af,
         "-ar", str(sample_rate), "-ac", "2", "-c:a", _pcm_codec_for_depth(bit_depth),
         str(final_wav)
-    ], stage="loudnorm_apply")
+    ], stage="loudnorm_apply", progress="apply")
     txt = (r.stderr or "") + "\n" + (r.stdout or "")
     out_stats = {}
     try:
@@ -658,7 +813,7 @@ def make_mp3(wav_path: Path, mp3_path: Path, bitrate_kbps: int, vbr_mode: str):
     else:
         cmd += ["-b:a", f"{int(bitrate_kbps)}k"]
     cmd.append(str(mp3_path))
-    r = run_cmd(cmd)
+    r = run_ffmpeg(cmd, stage="encode_mp3", progress="encode")
     if r.returncode != 0:
         raise RuntimeError(r.stderr.strip() or "mp3 encode failed")
 
@@ -672,22 +827,22 @@ def make_aac(wav_path: Path, out_path: Path, bitrate_kbps: int, codec: str = "aa
     if out_path.suffix.lower() == ".m4a":
         cmd += ["-movflags", "+faststart"]
     cmd.append(str(out_path))
-    r = run_cmd(cmd)
+    r = run_ffmpeg(cmd, stage="encode_aac", progress="encode")
     if r.returncode != 0 and codec != "aac":
         # Fallback to native AAC if preferred codec is missing
         cmd = [c if c != codec else "aac" for c in cmd]
-        r = run_cmd(cmd)
+        r = run_ffmpeg(cmd, stage="encode_aac", progress="encode")
     if r.returncode != 0:
         raise RuntimeError(r.stderr.strip() or "aac encode failed")
 
 def make_ogg(wav_path: Path, ogg_path: Path, quality: float = 5.0):
     q = max(-1.0, min(10.0, quality))
-    r = run_cmd([
+    r = run_ffmpeg([
         FFMPEG_BIN, "-y", "-hide_banner", "-loglevel", "error",
         "-i", str(wav_path),
         "-c:a", "libvorbis", "-q:a", str(q),
         str(ogg_path)
-    ])
+    ], stage="encode_ogg", progress="encode")
     if r.returncode != 0:
         raise RuntimeError(r.stderr.strip() or "ogg encode failed")
 
@@ -706,7 +861,7 @@ def make_flac(wav_path: Path, flac_path: Path, level: int = 5, sample_rate: int
         bd = clamp(int(bit_depth), 16, 24)
         cmd += ["-sample_fmt", "s32" if bd >= 24 else "s16"]
     cmd.append(str(flac_path))
-    r = run_cmd(cmd)
+    r = run_ffmpeg(cmd, stage="encode_flac", progress="encode")
     if r.returncode != 0:
         raise RuntimeError(r.stderr.strip() or "flac encode failed")
 
@@ -862,12 +1017,12 @@ def loudnorm_measure_json(input_path: Path, pre_filters: str, target_I: float, t
         af = f"{af},{ln}"
     else:
         af = ln
-    r = run_cmd([
+    r = run_ffmpeg([
         FFMPEG_BIN, "-hide_banner", "-nostats",
         "-i", str(input_path),
         "-af", af,
         "-f", "null", "-"
-    ])
+    ], stage="loudnorm_measure", progress="measure")
     txt = (r.stderr or "") + "\n" + (r.stdout or "")
     start = txt.find("{")
     end = txt.rfind("}")
@@ -1184,9 +1339,11 @@ def append_status(folder: Path, stage: str, detail: str = "", preset: str | None
     except Exception:
         pass
 
-def _run_with_args(args, event_cb=None) -> dict:
+def _run_with_args(args, event_cb=None, cancel_event=None) -> dict:
     prev_cb = _get_event_cb()
     _set_event_cb(event_cb)
+    prev_ctx = {key: _job_context(key) for key in ("duration_sec", "preset", "cancel_event")}
+    _set_job_context(duration_sec=None, preset=None, cancel_event=cancel_event)
     result = None
     try:
         # Normalize voicing mode/name early so downstream logic always sees a value
@@ -1265,6 +1422,8 @@ def _run_with_args(args, event_cb=None) -> dict:
             infile = IN_DIR / infile
         if not infile.exists():
             raise RuntimeError(f"Input not found: {infile}")
+        # Source duration drives percentage progress for every render of this job.
+        _set_job_context(duration_sec=_probe_duration(infile))
 
         if args.output_dir:
             song_dir = Path(args.output_dir)
@@ -1336,6 +1495,8 @@ def _run_with_args(args, event_cb=None) -> dict:
                         continue
                     safe_presets.append(raw)
                 for p in safe_presets:
+                    _check_cancelled()
+                    _set_job_context(preset=p)
                     preset_path = None
                     roots = [PRESET_DIR, GEN_PRESET_DIR]
                     roots.extend(_builtin_profile_dirs())
@@ -1445,6 +1606,7 @@ def _run_with_args(args, event_cb=None) -> dict:
                             pass
             elif do_master and voicing_mode == "voicing":
                 slug = voicing_name or "universal"
+                _set_job_context(preset=slug)
                 width_req = None
                 if args.width is not None:
                     width_req = float(args.width)
@@ -1560,6 +1722,7 @@ def _run_with_args(args, event_cb=None) -> dict:
                 }
                 base_tag, descriptor_str = build_variant_tag(descriptor, base_stem=infile.stem)
                 wav_out = song_dir / f"{infile.stem}__{base_tag}.wav"
+                _set_job_context(preset="source")
                 print(f"[pack] variant tag={base_tag} preset=source", file=sys.stderr, flush=True)
                 append_status(song_dir, "preset_start", "Passthrough (no mastering)", preset="source")
                 # Identity filter + optional static loudness guard/TP ceiling
@@ -1628,6 +1791,11 @@ def _run_with_args(args, event_cb=None) -> dict:
             log_summary("master", "job_complete", infile=infile.name, outputs=len(outputs))
             job_completed = True
             result = {"outputs": outputs, "run_dir": str(song_dir)}
+        except JobCancelled:
+            append_status(song_dir, "cancelled", "Job cancelled")
+            log_summary("master", "job_cancelled", infile=infile.name)
+            job_completed = True
+            raise
         except Exception as exc:
             append_status(song_dir, "error", f"Job failed: {exc}", level="error")
             log_error("master", "job_failed", error=str(exc))
@@ -1641,6 +1809,7 @@ def _run_with_args(args, event_cb=None) -> dict:
                     pass
     finally:
         _set_event_cb(prev_cb)
+        _set_job_context(**prev_ctx)
     return result
 
 def run_master_job(
@@ -1680,6 +1849,7 @@ def run_master_job(
     voicing_mode: str = "presets",
     voicing_name: str | None = None,
     event_cb=None,
+    cancel_event=None,
 ) -> dict:
     if presets is None:
         presets = ",".join(DEFAULT_PRESETS)
@@ -1724,7 +1894,7 @@ def run_master_job(
         voicing_mode=voicing_mode,
         voicing_name=voicing_name,
     )
-    return _run_with_args(args, event_cb=event_cb)
+    return _run_with_args(args, event_cb=event_cb, cancel_event=cancel_event)
 
 def main():
     ap = argparse.ArgumentParser()
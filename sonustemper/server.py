@@ -7,26 +7,31 @@ import re
 import mimetypes
 import threading
 import sys
+import queue
 import tempfile
 import asyncio
 import logging
 import time
 import hashlib
 import hmac
+import traceback
 import uuid
 import unicodedata
-from collections import deque
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import os
 import sonustemper.master_pack as mastering_pack
 from urllib.parse import quote
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Body, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Body, BackgroundTasks, Query
 from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response, HTMLResponse
 from sonustemper.tools import bundle_root, is_frozen, resolve_tool
 from fastapi.templating import Jinja2Templates
 from .tagger import TaggerService
 from . import library_db as library_store
+from . import library_async
 from . import storage as storage
 from .storage import (
     DATA_ROOT,
@@ -46,6 +51,9 @@ from .storage import (
     resolve_rel,
     new_song_id,
     describe_db_location,
+    content_hash,
+    link_or_copy,
+    song_root,
     LIBRARY_DB,
 )
 from fastapi.staticfiles import StaticFiles
@@ -65,11 +73,28 @@ PREVIEW_CLEAN_INTERVAL_SEC = int(os.getenv("PREVIEW_CLEAN_INTERVAL_SEC", "600"))
 PREVIEW_SESSION_CAP = int(os.getenv("PREVIEW_SESSION_CAP", "5"))
 PREVIEW_SEGMENT_START = int(os.getenv("PREVIEW_SEGMENT_START", "30"))
 PREVIEW_SEGMENT_DURATION = int(os.getenv("PREVIEW_SEGMENT_DURATION", "12"))
-PREVIEW_NORMALIZE_MODE = os.getenv("PREVIEW_NORMALIZE_MODE", "limiter").lower()
+PREVIEW_NORMALIZE_MODES = ("limiter", "loudnorm", "matched")
+PREVIEW_NORMALIZE_MODE = os.getenv("PREVIEW_NORMALIZE_MODE", "limiter").strip().lower()
+if PREVIEW_NORMALIZE_MODE not in PREVIEW_NORMALIZE_MODES:
+    PREVIEW_NORMALIZE_MODE = "limiter"
+PREVIEW_MATCH_PROBE_SEC = float(os.getenv("PREVIEW_MATCH_PROBE_SEC", "3"))
+PREVIEW_MATCH_STRIDE = 5
 PREVIEW_GUARD_MAX_WIDTH = float(os.getenv("PREVIEW_GUARD_MAX_WIDTH", "1.1"))
 PREVIEW_SESSION_COOKIE = "st_preview_session"
 PREVIEW_BITRATE_KBPS = int(os.getenv("PREVIEW_BITRATE_KBPS", "128"))
 PREVIEW_SAMPLE_RATE = int(os.getenv("PREVIEW_SAMPLE_RATE", "44100"))
+PREVIEW_DEBOUNCE_MS = int(os.getenv("PREVIEW_DEBOUNCE_MS", "150"))
+PREVIEW_BATCH_MAX = int(os.getenv("PREVIEW_BATCH_MAX", "18"))
+PREVIEW_PCM_CACHE_BYTES = int(os.getenv("PREVIEW_PCM_CACHE_MB", "64")) * 1024 * 1024
+PREVIEW_CACHE_TTL_SEC = int(os.getenv("PREVIEW_CACHE_TTL_SEC", str(PREVIEW_TTL_SEC)))
+PREVIEW_CACHE_BYTES = int(os.getenv("PREVIEW_CACHE_MB", "256")) * 1024 * 1024
+PREVIEW_PREFETCH_ENABLED = os.getenv("PREVIEW_PREFETCH", "0").strip().lower() in ("1", "true", "yes", "on")
+PREVIEW_PREFETCH_BUDGET_SEC = float(os.getenv("PREVIEW_PREFETCH_BUDGET_SEC", "20"))
+PREVIEW_PREFETCH_WINDOW_SEC = int(os.getenv("PREVIEW_PREFETCH_WINDOW_SEC", "300"))
+PREVIEW_PREFETCH_STRENGTH_STEP = 10
+PREVIEW_PREFETCH_NICE = 10
+PREVIEW_STREAM_CHUNK = 4096
+PREVIEW_STREAM_POLL_SEC = 0.05
 PRESET_DIR = PRESETS_DIR
 GEN_PRESET_DIR = PRESETS_DIR
 USER_VOICING_DIR = PRESET_DIR / "voicings"
@@ -310,6 +335,13 @@ TAGGER = TaggerService(
 PREVIEW_REGISTRY: dict[str, dict] = {}
 PREVIEW_SESSION_INDEX: dict[str, deque] = {}
 PREVIEW_LOCK = threading.Lock()
+# Decoded preview windows (stereo f32le at PREVIEW_SAMPLE_RATE), LRU by byte budget
+PREVIEW_PCM_CACHE: "OrderedDict[tuple, bytes]" = OrderedDict()
+PREVIEW_PCM_LOCK = threading.Lock()
+PREVIEW_PCM_FORMAT = "f32le"
+# Finished preview MP3s shared across sessions, keyed by render parameters + source fingerprint
+PREVIEW_RESULT_CACHE: "OrderedDict[str, dict]" = OrderedDict()
+PREVIEW_CACHE_DIR = PREVIEW_DIR / "cache"
 
 def _preview_session_key(request: Request) -> str:
     cookie = request.cookies.get(PREVIEW_SESSION_COOKIE)
@@ -321,6 +353,14 @@ def _preview_session_key(request: Request) -> str:
     return hashlib.sha256(raw).hexdigest()[:32]
 
 def _preview_remove(preview_id: str, entry: dict) -> None:
+    cancel_event = entry.get("cancel")
+    if isinstance(cancel_event, threading.Event):
+        cancel_event.set()
+    for loop, fut in entry.pop("waiters", None) or []:
+        try:
+            loop.call_soon_threadsafe(_resolve_preview_waiter, fut, "error")
+        except RuntimeError:
+            pass
     path = entry.get("file_path")
     try:
         if path:
@@ -353,12 +393,17 @@ def _preview_cleanup(session_key: str | None = None) -> int:
             _preview_remove(pid, entry)
         if session_key and session_key in PREVIEW_SESSION_INDEX:
             queue = PREVIEW_SESSION_INDEX[session_key]
-            while len(queue) > PREVIEW_SESSION_CAP:
-                old = queue.popleft()
-                entry = PREVIEW_REGISTRY.pop(old, None)
-                if entry:
-                    removed += 1
-                    _preview_remove(old, entry)
+            # A batch counts as one preview against the cap and is evicted as a whole.
+            def _group(pid: str) -> str:
+                return (PREVIEW_REGISTRY.get(pid) or {}).get("batch_id") or pid
+            while len({_group(pid) for pid in queue}) > PREVIEW_SESSION_CAP:
+                oldest = _group(queue[0])
+                for old in [pid for pid in queue if _group(pid) == oldest]:
+                    queue.remove(old)
+                    entry = PREVIEW_REGISTRY.pop(old, None)
+                    if entry:
+                        removed += 1
+                        _preview_remove(old, entry)
     return removed
 
 def _cleanup_previews_fs() -> int:
@@ -412,17 +457,75 @@ def _startup_preview_cleanup() -> None:
     except Exception as exc:
         logger.warning("[preview] cleanup loop start failed: %s", exc)
 
+PREVIEW_TERMINAL_STATUSES = ("ready", "error", "cancelled")
+
 def _preview_update(preview_id: str, status: str, **kwargs) -> None:
     with PREVIEW_LOCK:
         entry = PREVIEW_REGISTRY.get(preview_id)
         if not entry:
             return
+        if entry.get("status") in PREVIEW_TERMINAL_STATUSES:
+            return
         entry["status"] = status
         for key, val in kwargs.items():
             entry[key] = val
-        done_event = entry.get("event")
-        if status in ("ready", "error") and isinstance(done_event, threading.Event):
-            done_event.set()
+        waiters = entry.pop("waiters", None) or []
+    # Wake SSE streams awaiting this preview on their own event loops.
+    for loop, fut in waiters:
+        try:
+            loop.call_soon_threadsafe(_resolve_preview_waiter, fut, status)
+        except RuntimeError:
+            pass
+
+def _resolve_preview_waiter(fut: asyncio.Future, status: str) -> None:
+    if not fut.done():
+        fut.set_result(status)
+
+async def _preview_wait_change(preview_id: str, seen_status: str, timeout: float) -> str:
+    """Await the next status change of a preview without holding a worker thread."""
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    with PREVIEW_LOCK:
+        entry = PREVIEW_REGISTRY.get(preview_id)
+        if not entry:
+            return "error"
+        status = entry.get("status") or "error"
+        if status != seen_status:
+            return status
+        waiter = (loop, fut)
+        entry.setdefault("waiters", []).append(waiter)
+    try:
+        return await asyncio.wait_for(fut, timeout)
+    except asyncio.TimeoutError:
+        return seen_status
+    finally:
+        with PREVIEW_LOCK:
+            waiters = (PREVIEW_REGISTRY.get(preview_id) or {}).get("waiters") or []
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+def _preview_cancel(preview_id: str, reason: str = "cancelled") -> bool:
+    """Stop a building preview (kills its ffmpeg child); returns False if it already finished."""
+    with PREVIEW_LOCK:
+        entry = PREVIEW_REGISTRY.get(preview_id)
+        if not entry or entry.get("status") in PREVIEW_TERMINAL_STATUSES:
+            return False
+        cancel_event = entry.get("cancel")
+    if isinstance(cancel_event, threading.Event):
+        cancel_event.set()
+    _preview_update(preview_id, "cancelled", error_msg=reason)
+    return True
+
+def _preview_supersede(session_key: str, input_path: str, keep_ids: set[str]) -> int:
+    """Cancel older in-flight previews of the same input for this session."""
+    with PREVIEW_LOCK:
+        stale = [
+            pid for pid in PREVIEW_SESSION_INDEX.get(session_key) or ()
+            if pid not in keep_ids
+            and (PREVIEW_REGISTRY.get(pid) or {}).get("input_path") == input_path
+            and (PREVIEW_REGISTRY.get(pid) or {}).get("status") == "building"
+        ]
+    return sum(1 for pid in stale if _preview_cancel(pid, "superseded"))
 
 def _build_preview_filter(voicing: str, strength: int, width: float | None, guardrails: bool) -> str | None:
     if not hasattr(mastering_pack, "_voicing_filters"):
@@ -542,31 +645,261 @@ def _preview_find_voicing_path(slug: str) -> Path | None:
             return fp
     return None
 
-def _render_preview(preview_id: str) -> None:
+def _preview_pcm_segment(input_path: str, seek_start: float,
+                         cancel_event: threading.Event | None) -> bytes | None:
+    """Decoded, resampled preview window for (input, start); decoded once and reused by every voicing.
+    Returns None if cancelled while decoding."""
+    st = Path(input_path).stat()
+    key = (input_path, st.st_mtime_ns, st.st_size, float(seek_start), PREVIEW_SEGMENT_DURATION, PREVIEW_SAMPLE_RATE)
+    with PREVIEW_PCM_LOCK:
+        pcm = PREVIEW_PCM_CACHE.get(key)
+        if pcm is not None:
+            PREVIEW_PCM_CACHE.move_to_end(key)
+            return pcm
+    cmd = [
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "error",
+        "-ss", str(seek_start),
+        "-t", str(PREVIEW_SEGMENT_DURATION),
+        "-i", str(input_path),
+        "-vn", "-ac", "2", "-ar", str(PREVIEW_SAMPLE_RATE),
+        "-f", PREVIEW_PCM_FORMAT, "pipe:1",
+    ]
+    proc = run_cmd_cancellable(cmd, cancel_event, text=False)
+    if proc is None:
+        return None
+    if proc.returncode != 0:
+        err = (proc.stderr or b"").decode("utf-8", "replace").strip()
+        raise RuntimeError(err or "ffmpeg_decode_failed")
+    pcm = proc.stdout or b""
+    if not pcm:
+        raise RuntimeError("preview_segment_empty")
+    with PREVIEW_PCM_LOCK:
+        PREVIEW_PCM_CACHE[key] = pcm
+        total = sum(len(v) for v in PREVIEW_PCM_CACHE.values())
+        while total > PREVIEW_PCM_CACHE_BYTES and len(PREVIEW_PCM_CACHE) > 1:
+            _, old = PREVIEW_PCM_CACHE.popitem(last=False)
+            total -= len(old)
+    return pcm
+
+def _preview_encode_streaming(cmd: list[str], pcm: bytes, out_path: Path,
+                              cancel_event: threading.Event | None, on_first_bytes,
+                              niceness: int = 0) -> tuple[int, bytes] | None:
+    """Run the preview encoder with MP3 on stdout, appending frames to out_path as they arrive so
+    /api/preview/file can relay them before encoding finishes. Returns None if cancelled."""
+    _assert_safe_cmd(cmd)
+    popen_kw = {"start_new_session": True} if os.name == "posix" else {}
+    # CodeQL [py/command-line-injection]: argv is validated, shell=False, fixed binaries; user input does not control executed program
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **popen_kw)
+    if niceness and hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, proc.pid, niceness)
+        except OSError:
+            pass
+    err_chunks: list[bytes] = []
+
+    def _feed() -> None:
+        try:
+            proc.stdin.write(pcm)
+        except OSError:
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    def _copy_out() -> None:
+        first = True
+        with out_path.open("wb") as fh:
+            while True:
+                chunk = proc.stdout.read1(PREVIEW_STREAM_CHUNK)
+                if not chunk:
+                    break
+                fh.write(chunk)
+                fh.flush()
+                if first:
+                    first = False
+                    if on_first_bytes:
+                        on_first_bytes()
+
+    def _drain_err() -> None:
+        err_chunks.append(proc.stderr.read())
+
+    workers = [threading.Thread(target=fn, daemon=True) for fn in (_feed, _copy_out, _drain_err)]
+    for t in workers:
+        t.start()
+    while True:
+        try:
+            proc.wait(timeout=mastering_pack.FFMPEG_POLL_SEC)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel_event is not None and cancel_event.is_set():
+                mastering_pack._kill_process_tree(proc)
+                proc.wait()
+                break
+    for t in workers:
+        t.join(timeout=2)
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+    return proc.returncode, b"".join(err_chunks)
+
+def _preview_link(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+def _preview_cache_prune() -> None:
+    """Drop expired entries, then least recently used ones until under PREVIEW_CACHE_MB. Caller holds PREVIEW_LOCK."""
+    cutoff = time.time() - PREVIEW_CACHE_TTL_SEC
+    for key, item in list(PREVIEW_RESULT_CACHE.items()):
+        if item["created_at"] < cutoff:
+            PREVIEW_RESULT_CACHE.pop(key, None)
+            Path(item["path"]).unlink(missing_ok=True)
+    total = sum(item["size"] for item in PREVIEW_RESULT_CACHE.values())
+    while total > PREVIEW_CACHE_BYTES and PREVIEW_RESULT_CACHE:
+        _, item = PREVIEW_RESULT_CACHE.popitem(last=False)
+        total -= item["size"]
+        Path(item["path"]).unlink(missing_ok=True)
+
+def _preview_cache_lookup(key: str) -> Path | None:
     with PREVIEW_LOCK:
-        entry = PREVIEW_REGISTRY.get(preview_id)
-        if not entry:
-            return
-        input_path = entry.get("input_path")
-        voicing = entry.get("voicing") or "universal"
-        voicing_data = entry.get("voicing_data")
-        strength = int(entry.get("strength") or 0)
-        width = entry.get("width")
-        guardrails = bool(entry.get("guardrails", False))
-        lufs = entry.get("lufs")
-        tp = entry.get("tp")
-        start_s = entry.get("start_s")
-    if not input_path:
-        _preview_update(preview_id, "error", error_msg="missing_input")
+        _preview_cache_prune()
+        item = PREVIEW_RESULT_CACHE.get(key)
+        if not item:
+            return None
+        path = Path(item["path"])
+        if not path.exists():
+            PREVIEW_RESULT_CACHE.pop(key, None)
+            return None
+        PREVIEW_RESULT_CACHE.move_to_end(key)
+        return path
+
+def _preview_cache_store(key: str, out_path: Path) -> None:
+    PREVIEW_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_path = PREVIEW_CACHE_DIR / f"{key}.mp3"
+    try:
+        cache_path.unlink(missing_ok=True)
+        _preview_link(out_path, cache_path)
+        size = cache_path.stat().st_size
+    except OSError as exc:
+        logger.debug("[preview] cache store failed key=%s err=%s", key, exc)
         return
+    with PREVIEW_LOCK:
+        PREVIEW_RESULT_CACHE[key] = {"path": str(cache_path), "size": size, "created_at": time.time()}
+        PREVIEW_RESULT_CACHE.move_to_end(key)
+        _preview_cache_prune()
 
-    PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
-    out_path = PREVIEW_DIR / f"{preview_id}.mp3"
+PREVIEW_RENDER_KEYS = (
+    "input_path", "voicing", "voicing_data", "strength", "width", "guardrails", "lufs", "tp", "start_s",
+    "normalize", "source_lufs",
+)
+
+def _preview_params_hash(params: dict) -> str:
+    """Cache key: render parameters normalized exactly as _preview_render_to applies them, plus the
+    source fingerprint, so identical renders from any session share one cached MP3."""
+    src_stat = Path(params["input_path"]).stat()
+    voicing_data = params.get("voicing_data")
+    voicing_key = json.dumps(voicing_data, sort_keys=True) if voicing_data else params.get("voicing")
+    width = params.get("width")
+    guardrails = bool(params.get("guardrails"))
+    eff_width = min(width, PREVIEW_GUARD_MAX_WIDTH) if (width is not None and guardrails) else width
+    lufs = params.get("lufs")
+    tp = params.get("tp")
+    start_s = params.get("start_s")
+    params_raw = "|".join(str(v) for v in (
+        params["input_path"], src_stat.st_mtime_ns, src_stat.st_size, voicing_key, params.get("strength"),
+        eff_width, guardrails, lufs if lufs is not None else -16.0, tp if tp is not None else -1.0,
+        start_s if start_s is not None else PREVIEW_SEGMENT_START,
+        PREVIEW_SEGMENT_DURATION, params.get("normalize") or PREVIEW_NORMALIZE_MODE, params.get("source_lufs"),
+        PREVIEW_SAMPLE_RATE, PREVIEW_BITRATE_KBPS,
+    ))
+    return hashlib.sha256(params_raw.encode("utf-8")).hexdigest()
+
+def _pcm_loudness_estimate(pcm: bytes) -> float | None:
+    """Unweighted BS.1770-style loudness estimate of stereo f32le PCM (decimated for speed)."""
+    samples = array("f")
+    samples.frombytes(pcm[: len(pcm) - len(pcm) % samples.itemsize])
+    sub = samples[::PREVIEW_MATCH_STRIDE]
+    if not sub:
+        return None
+    mean_sq = math.fsum(x * x for x in sub) / len(sub)
+    if mean_sq <= 0:
+        return None
+    return -0.691 + 10 * math.log10(2 * mean_sq)
+
+def _preview_matched_gains_db(pcm: bytes, specs: list[tuple[str | None, float | None, float]],
+                              cancel_event: threading.Event | None) -> list[float] | None:
+    """Static gains that bring the voiced window to each variant's target loudness.
+    specs holds (chain, source_lufs, target_lufs) per variant. The song's stored integrated loudness
+    anchors the level (the window estimate stands in when it is missing); one ffmpeg pass pushes a short
+    probe through every chain (asplit) to measure how much each voicing adds or removes."""
+    frame = 2 * 4  # stereo f32le
+    probe_len = int(PREVIEW_MATCH_PROBE_SEC * PREVIEW_SAMPLE_RATE) * frame
+    probe = pcm
+    if len(pcm) > probe_len:
+        start = max(0, (len(pcm) // frame // 2) * frame - probe_len // 2)
+        start -= start % frame
+        probe = pcm[start:start + probe_len]
+    dry = _pcm_loudness_estimate(probe)
+    if dry is None:
+        return [0.0] * len(specs)
+    deltas = [0.0] * len(specs)
+    chained = [i for i, (chain, _, _) in enumerate(specs) if chain]
+    if chained:
+        PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=PREVIEW_DIR) as tmp:
+            outs = [Path(tmp) / f"probe{i}.pcm" for i in chained]
+            graph = [f"[0:a]asplit={len(chained)}" + "".join(f"[s{i}]" for i in chained)]
+            graph += [f"[s{i}]{specs[i][0]}[p{i}]" for i in chained]
+            cmd = [
+                FFMPEG_BIN, "-y", "-hide_banner", "-loglevel", "error",
+                "-f", PREVIEW_PCM_FORMAT, "-ar", str(PREVIEW_SAMPLE_RATE), "-ac", "2", "-i", "pipe:0",
+                "-filter_complex", ";".join(graph),
+            ]
+            for i, out in zip(chained, outs):
+                cmd += ["-map", f"[p{i}]", "-f", PREVIEW_PCM_FORMAT, str(out)]
+            proc = run_cmd_cancellable(cmd, cancel_event, input_bytes=probe, text=False)
+            if proc is None:
+                return None
+            if proc.returncode == 0:
+                for i, out in zip(chained, outs):
+                    wet = _pcm_loudness_estimate(out.read_bytes()) if out.exists() else None
+                    if wet is not None:
+                        deltas[i] = wet - dry
+    window_lufs = None
+    gains = []
+    for (_chain, source_lufs, target_lufs), delta in zip(specs, deltas):
+        if isinstance(source_lufs, (int, float)):
+            base = float(source_lufs)
+        else:
+            if window_lufs is None:
+                window_lufs = _pcm_loudness_estimate(pcm)
+            base = window_lufs
+        gains.append(0.0 if base is None else max(-30.0, min(24.0, target_lufs - base - delta)))
+    return gains
+
+def _preview_seek_start(params: dict) -> float:
+    start_s = params.get("start_s")
+    if isinstance(start_s, (int, float)):
+        return max(0.0, float(start_s))
+    return float(PREVIEW_SEGMENT_START)
+
+def _preview_af_parts(params: dict) -> tuple[str | None, str, float, bool]:
+    """(voicing chain, limiter, target LUFS, loudness-matched) for one preview."""
+    voicing = params.get("voicing") or "universal"
+    voicing_data = params.get("voicing_data")
+    strength = int(params.get("strength") or 0)
+    width = params.get("width")
+    guardrails = bool(params.get("guardrails", False))
+    lufs = params.get("lufs")
+    tp = params.get("tp")
     target_lufs = float(lufs) if isinstance(lufs, (int, float)) else -16.0
     target_tp = float(tp) if isinstance(tp, (int, float)) else -1.0
     if width is not None and guardrails:
         width = min(width, PREVIEW_GUARD_MAX_WIDTH)
-    if PREVIEW_NORMALIZE_MODE == "loudnorm":
+    mode = params.get("normalize") or PREVIEW_NORMALIZE_MODE
+    if mode == "loudnorm":
         limiter = f"loudnorm=I={target_lufs:g}:TP={target_tp:g}:LRA=11"
     else:
         limit_linear = 10 ** (target_tp / 20.0)
@@ -576,25 +909,86 @@ def _render_preview(preview_id: str) -> None:
         chain = _build_preview_filter_from_data(voicing_data, strength, width, guardrails)
     else:
         chain = _build_preview_filter(voicing, strength, width, guardrails)
-    af = f"{chain},{limiter}" if chain else limiter
-    seek_start = PREVIEW_SEGMENT_START
-    if isinstance(start_s, (int, float)):
-        seek_start = max(0.0, float(start_s))
+    return chain, limiter, target_lufs, mode == "matched"
+
+def _preview_afs(params_list: list[dict], pcm: bytes, cancel_event) -> list[str] | None:
+    """Voicing chain plus normalization for previews of one window. Returns None if cancelled."""
+    parts = [_preview_af_parts(params) for params in params_list]
+    matched = [i for i, part in enumerate(parts) if part[3]]
+    gains: dict[int, float] = {}
+    if matched:
+        # Equal-loudness A/B: static gain ahead of the true-peak limiter instead of dynamic loudnorm.
+        specs = [(parts[i][0], params_list[i].get("source_lufs"), parts[i][2]) for i in matched]
+        res = _preview_matched_gains_db(pcm, specs, cancel_event)
+        if res is None:
+            return None
+        gains = dict(zip(matched, res))
+    afs = []
+    for i, (chain, limiter, _target, _matched) in enumerate(parts):
+        if i in gains:
+            limiter = f"volume={gains[i]:.2f}dB,{limiter}"
+        afs.append(f"{chain},{limiter}" if chain else limiter)
+    return afs
+
+def _preview_af(params: dict, pcm: bytes, cancel_event: threading.Event | None) -> str | None:
+    """Voicing chain plus normalization for one preview. Returns None if cancelled."""
+    afs = _preview_afs([params], pcm, cancel_event)
+    return afs[0] if afs else None
+
+def _preview_render_to(params: dict, out_path: Path, cancel_event: threading.Event | None,
+                       on_first_bytes=None, niceness: int = 0) -> tuple[int, bytes] | None:
+    """Render one preview MP3 from the cached PCM window. Returns None if cancelled."""
+    pcm = _preview_pcm_segment(str(params["input_path"]), _preview_seek_start(params), cancel_event)
+    if pcm is None:
+        return None
+    af = _preview_af(params, pcm, cancel_event)
+    if af is None:
+        return None
+    # The decoded window is cached, so only the chain and encoder run per voicing change.
     cmd = [
         FFMPEG_BIN, "-y", "-hide_banner", "-loglevel", "error",
-        "-ss", str(seek_start),
-        "-t", str(PREVIEW_SEGMENT_DURATION),
-        "-i", str(input_path),
+        "-f", PREVIEW_PCM_FORMAT, "-ar", str(PREVIEW_SAMPLE_RATE), "-ac", "2",
+        "-i", "pipe:0",
         "-af", af,
         "-vn", "-ac", "2", "-ar", str(PREVIEW_SAMPLE_RATE),
         "-codec:a", "libmp3lame", "-b:a", f"{PREVIEW_BITRATE_KBPS}k",
-        str(out_path),
+        "-f", "mp3", "-flush_packets", "1", "pipe:1",
     ]
+    return _preview_encode_streaming(cmd, pcm, out_path, cancel_event, on_first_bytes, niceness=niceness)
+
+def _render_preview(preview_id: str) -> None:
+    with PREVIEW_LOCK:
+        entry = PREVIEW_REGISTRY.get(preview_id)
+        if not entry:
+            return
+        params = {key: entry.get(key) for key in PREVIEW_RENDER_KEYS}
+        cancel_event = entry.get("cancel")
+        params_hash = entry.get("params_hash")
+        session_key = entry.get("session_key")
+        prefetch = bool(entry.get("prefetch"))
+    if not params.get("input_path"):
+        _preview_update(preview_id, "error", error_msg="missing_input")
+        return
+    # Debounce: a newer preview arriving within the window supersedes this one before ffmpeg starts.
+    if cancel_event is not None and cancel_event.wait(PREVIEW_DEBOUNCE_MS / 1000.0):
+        return
+
+    PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = PREVIEW_DIR / f"{preview_id}.mp3"
+    _preview_foreground(1)
     try:
-        logger.debug("[preview] start id=%s voicing=%s strength=%s", preview_id, voicing, strength)
-        proc = run_cmd(cmd)
-        if proc.returncode != 0:
-            err = (proc.stderr or proc.stdout or "").strip()
+        logger.debug("[preview] start id=%s voicing=%s strength=%s", preview_id, params.get("voicing"), params.get("strength"))
+        res = _preview_render_to(
+            params, out_path, cancel_event,
+            lambda: _preview_update(preview_id, "streaming", file_path=str(out_path), mime="audio/mpeg"),
+        )
+        if res is None or (cancel_event is not None and cancel_event.is_set()):
+            out_path.unlink(missing_ok=True)
+            logger.debug("[preview] cancelled id=%s", preview_id)
+            return
+        returncode, stderr = res
+        if returncode != 0:
+            err = stderr.decode("utf-8", "replace").strip()
             raise RuntimeError(err or "ffmpeg_failed")
         _preview_update(
             preview_id,
@@ -602,6 +996,8 @@ def _render_preview(preview_id: str) -> None:
             file_path=str(out_path),
             mime="audio/mpeg",
         )
+        if params_hash:
+            _preview_cache_store(params_hash, out_path)
         logger.debug("[preview] ready id=%s", preview_id)
     except Exception as exc:
         try:
@@ -611,6 +1007,193 @@ def _render_preview(preview_id: str) -> None:
             pass
         _preview_update(preview_id, "error", error_msg=str(exc))
         logger.debug("[preview] error id=%s err=%s", preview_id, exc)
+        return
+    finally:
+        _preview_foreground(-1)
+    if prefetch and PREVIEW_PREFETCH_ENABLED:
+        _preview_prefetch_schedule(session_key, params)
+
+class _PreviewBatchCancel:
+    """Cancel view over a preview batch: set only once every variant's own cancel event is set,
+    so superseding or evicting one variant doesn't stop the others."""
+
+    def __init__(self, events: list[threading.Event]) -> None:
+        self.events = events
+
+    def is_set(self) -> bool:
+        return all(event.is_set() for event in self.events)
+
+def _render_preview_batch(preview_ids: list[str]) -> None:
+    """Render a preview batch: one decode, one ffmpeg process, asplit=N into N MP3 outputs."""
+    with PREVIEW_LOCK:
+        entries = [(pid, PREVIEW_REGISTRY.get(pid)) for pid in preview_ids]
+        jobs = [(pid, {key: entry.get(key) for key in PREVIEW_RENDER_KEYS}, entry.get("params_hash"))
+                for pid, entry in entries if entry]
+        cancel_event = _PreviewBatchCancel([entry["cancel"] for _, entry in entries if entry])
+    if not jobs:
+        return
+    PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+    out_paths = [PREVIEW_DIR / f"{pid}.mp3" for pid, _, _ in jobs]
+
+    def _finish(status: str, **kwargs) -> None:
+        for (pid, _, _), out_path in zip(jobs, out_paths):
+            if status != "ready":
+                out_path.unlink(missing_ok=True)
+            _preview_update(pid, status, **kwargs)
+
+    _preview_foreground(1)
+    try:
+        first = jobs[0][1]
+        pcm = _preview_pcm_segment(str(first["input_path"]), _preview_seek_start(first), cancel_event)
+        afs = None if pcm is None else _preview_afs([params for _, params, _ in jobs], pcm, cancel_event)
+        if afs is None:
+            _finish("cancelled", error_msg="cancelled")
+            return
+        labels = [f"s{i}" for i in range(len(jobs))]
+        graph = [f"[0:a]asplit={len(jobs)}" + "".join(f"[{lbl}]" for lbl in labels)]
+        graph += [f"[{lbl}]{af}[o{i}]" for i, (lbl, af) in enumerate(zip(labels, afs))]
+        cmd = [
+            FFMPEG_BIN, "-y", "-hide_banner", "-loglevel", "error",
+            "-f", PREVIEW_PCM_FORMAT, "-ar", str(PREVIEW_SAMPLE_RATE), "-ac", "2",
+            "-i", "pipe:0",
+            "-filter_complex", ";".join(graph),
+        ]
+        for i, out_path in enumerate(out_paths):
+            cmd += [
+                "-map", f"[o{i}]",
+                "-ac", "2", "-ar", str(PREVIEW_SAMPLE_RATE),
+                "-codec:a", "libmp3lame", "-b:a", f"{PREVIEW_BITRATE_KBPS}k",
+                str(out_path),
+            ]
+        logger.debug("[preview] batch start ids=%s", len(jobs))
+        proc = run_cmd_cancellable(cmd, cancel_event, input_bytes=pcm, text=False)
+        if proc is None or cancel_event.is_set():
+            _finish("cancelled", error_msg="cancelled")
+            return
+        if proc.returncode != 0:
+            err = (proc.stderr or b"").decode("utf-8", "replace").strip()
+            raise RuntimeError(err or "ffmpeg_failed")
+        for (pid, _, params_hash), out_path, variant_cancel in zip(jobs, out_paths, cancel_event.events):
+            if params_hash:
+                _preview_cache_store(params_hash, out_path)
+            if variant_cancel.is_set():
+                # Cancelled mid-render: already terminal, but its output still fills the cache.
+                out_path.unlink(missing_ok=True)
+                continue
+            _preview_update(pid, "ready", file_path=str(out_path), mime="audio/mpeg")
+        logger.debug("[preview] batch ready ids=%s", len(jobs))
+    except Exception as exc:
+        _finish("error", error_msg=str(exc))
+        logger.debug("[preview] batch error err=%s", exc)
+    finally:
+        _preview_foreground(-1)
+
+# Speculative prefetch: after a foreground preview, render neighbouring strengths/voicings into the
+# preview cache at low priority. One worker, idle-only (no foreground preview or mastering run),
+# per-session render-seconds budget; a new foreground request drops the session's pending work.
+PREVIEW_PREFETCH_COND = threading.Condition()
+PREVIEW_PREFETCH_JOBS: deque = deque()
+PREVIEW_PREFETCH_USAGE: dict[str, deque] = {}
+PREVIEW_PREFETCH_ACTIVE: dict | None = None
+PREVIEW_FOREGROUND = 0
+_PREVIEW_PREFETCH_STARTED = False
+
+def _preview_foreground(delta: int) -> None:
+    global PREVIEW_FOREGROUND
+    with PREVIEW_PREFETCH_COND:
+        PREVIEW_FOREGROUND = max(0, PREVIEW_FOREGROUND + delta)
+        if delta > 0 and PREVIEW_PREFETCH_ACTIVE is not None:
+            PREVIEW_PREFETCH_ACTIVE["cancel"].set()
+        PREVIEW_PREFETCH_COND.notify_all()
+
+def _preview_prefetch_drop(session_key: str) -> None:
+    with PREVIEW_PREFETCH_COND:
+        for job in [j for j in PREVIEW_PREFETCH_JOBS if j["session_key"] == session_key]:
+            PREVIEW_PREFETCH_JOBS.remove(job)
+        if PREVIEW_PREFETCH_ACTIVE is not None and PREVIEW_PREFETCH_ACTIVE["session_key"] == session_key:
+            PREVIEW_PREFETCH_ACTIVE["cancel"].set()
+
+def _preview_prefetch_neighbours(params: dict) -> list[dict]:
+    strength = int(params.get("strength") or 0)
+    out = []
+    for step in (PREVIEW_PREFETCH_STRENGTH_STEP, -PREVIEW_PREFETCH_STRENGTH_STEP):
+        val = max(0, min(100, strength + step))
+        if val != strength:
+            out.append(dict(params, strength=val))
+    if not params.get("voicing_data"):
+        slugs: list[str] = []
+        for item in _preset_items("voicing", include_staging=False):
+            slug = _slug_key(item.get("name"))
+            if slug and slug not in slugs:
+                slugs.append(slug)
+        current = _slug_key(params.get("voicing") or "universal")
+        if current in slugs and len(slugs) > 1:
+            idx = slugs.index(current)
+            for nxt in (slugs[(idx + 1) % len(slugs)], slugs[idx - 1]):
+                if nxt != current and all(p.get("voicing") != nxt for p in out):
+                    out.append(dict(params, voicing=nxt))
+    return out
+
+def _preview_prefetch_schedule(session_key: str, params: dict) -> None:
+    jobs = []
+    for cand in _preview_prefetch_neighbours(params):
+        try:
+            key = _preview_params_hash(cand)
+        except OSError:
+            return
+        if _preview_cache_lookup(key) is None:
+            jobs.append({"session_key": session_key, "params": cand, "params_hash": key, "cancel": threading.Event()})
+    if not jobs:
+        return
+    _start_preview_prefetch_worker()
+    with PREVIEW_PREFETCH_COND:
+        PREVIEW_PREFETCH_JOBS.extend(jobs)
+        PREVIEW_PREFETCH_COND.notify_all()
+
+def _preview_prefetch_budget_left(session_key: str) -> float:
+    cutoff = time.time() - PREVIEW_PREFETCH_WINDOW_SEC
+    usage = PREVIEW_PREFETCH_USAGE.setdefault(session_key, deque())
+    while usage and usage[0][0] < cutoff:
+        usage.popleft()
+    return PREVIEW_PREFETCH_BUDGET_SEC - sum(sec for _, sec in usage)
+
+def _preview_prefetch_loop() -> None:
+    global PREVIEW_PREFETCH_ACTIVE
+    while True:
+        with PREVIEW_PREFETCH_COND:
+            while not PREVIEW_PREFETCH_JOBS or PREVIEW_FOREGROUND > 0 or RUNS_IN_FLIGHT > 0:
+                PREVIEW_PREFETCH_COND.wait(timeout=1.0)
+            job = PREVIEW_PREFETCH_JOBS.popleft()
+            if _preview_prefetch_budget_left(job["session_key"]) <= 0:
+                continue
+            PREVIEW_PREFETCH_ACTIVE = job
+        out_path = PREVIEW_DIR / f"prefetch-{uuid.uuid4().hex}.mp3"
+        started = time.monotonic()
+        try:
+            if _preview_cache_lookup(job["params_hash"]) is None:
+                PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+                res = _preview_render_to(job["params"], out_path, job["cancel"], niceness=PREVIEW_PREFETCH_NICE)
+                if res is not None and res[0] == 0 and not job["cancel"].is_set():
+                    _preview_cache_store(job["params_hash"], out_path)
+                    logger.debug("[preview] prefetched voicing=%s strength=%s",
+                                 job["params"].get("voicing"), job["params"].get("strength"))
+        except Exception as exc:
+            logger.debug("[preview] prefetch failed err=%s", exc)
+        finally:
+            out_path.unlink(missing_ok=True)
+            with PREVIEW_PREFETCH_COND:
+                PREVIEW_PREFETCH_USAGE.setdefault(job["session_key"], deque()).append(
+                    (time.time(), time.monotonic() - started)
+                )
+                PREVIEW_PREFETCH_ACTIVE = None
+
+def _start_preview_prefetch_worker() -> None:
+    global _PREVIEW_PREFETCH_STARTED
+    with PREVIEW_PREFETCH_COND:
+        if _PREVIEW_PREFETCH_STARTED:
+            return
+        _PREVIEW_PREFETCH_STARTED = True
+    threading.Thread(target=_preview_prefetch_loop, daemon=True).start()
 
 # Utility roots for file manager
 UTILITY_ROOTS = {
@@ -654,6 +1237,237 @@ logger.info("[startup] LIBRARY_DB=%s mount=%s", _db_info["LIBRARY_DB"], _db_info
 MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "2"))
 RUNS_IN_FLIGHT = 0
 
+# Batch-level progress for bulk mastering (one batch per _start_master_jobs call)
+MASTER_BATCHES: dict[str, dict] = {}
+MASTER_BATCH_BY_RUN: dict[str, str] = {}
+MASTER_BATCH_LOCK = threading.Lock()
+MASTER_BATCH_TTL_SEC = int(os.getenv("MASTER_BATCH_TTL_SEC", "600"))
+BATCH_STAGE_BUCKETS_SEC = (1, 2, 5, 10, 30, 60, 120, 300, 600)
+
+def _batch_stage_key(stage: str) -> str | None:
+    """Map an event stage to the histogram key it closes, or None if it opens a stage."""
+    stage = (stage or "").strip()
+    if not stage or stage == "start" or stage == "queued" or stage.endswith("_start"):
+        return None
+    if stage.endswith("_done"):
+        return stage[:-5]
+    return stage
+
+def _batch_prune() -> None:
+    cutoff = time.time() - MASTER_BATCH_TTL_SEC
+    with MASTER_BATCH_LOCK:
+        for batch_id, batch in list(MASTER_BATCHES.items()):
+            finished = batch.get("finished_at")
+            if finished and finished < cutoff:
+                MASTER_BATCHES.pop(batch_id, None)
+                for rid in batch.get("run_ids") or []:
+                    if MASTER_BATCH_BY_RUN.get(rid) == batch_id:
+                        MASTER_BATCH_BY_RUN.pop(rid, None)
+
+def _batch_create(run_ids: list[str]) -> str:
+    _batch_prune()
+    batch_id = uuid.uuid4().hex[:12]
+    with MASTER_BATCH_LOCK:
+        MASTER_BATCHES[batch_id] = {
+            "batch_id": batch_id,
+            "run_ids": list(run_ids),
+            "total": len(run_ids),
+            "done": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "cancel_event": threading.Event(),
+            "run_cancel": {rid: threading.Event() for rid in run_ids},
+            "active_run_id": None,
+            "started_at": time.time(),
+            "finished_at": None,
+            "durations": {},
+            "runs": {},
+            "stages": {},
+        }
+        for rid in run_ids:
+            MASTER_BATCH_BY_RUN[rid] = batch_id
+    return batch_id
+
+def _batch_set_duration(batch_id: str, run_id: str, duration_sec) -> None:
+    try:
+        dur = float(duration_sec)
+    except (TypeError, ValueError):
+        return
+    if dur <= 0:
+        return
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        if batch is not None:
+            batch["durations"][run_id] = dur
+
+def _batch_run_started(batch_id: str, run_id: str) -> None:
+    now = time.time()
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        if batch is None:
+            return
+        batch["active_run_id"] = run_id
+        batch["runs"][run_id] = {"started_at": now, "last_ts": now, "elapsed_sec": None, "status": "running"}
+
+def _batch_record_stage(batch_id: str, run_id: str, stage: str) -> None:
+    now = time.time()
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        run = batch["runs"].get(run_id) if batch else None
+        if run is None:
+            return
+        key = _batch_stage_key(stage)
+        elapsed = max(0.0, now - run["last_ts"])
+        run["last_ts"] = now
+        if key is None:
+            return
+        hist = batch["stages"].get(key)
+        if hist is None:
+            hist = {
+                "count": 0,
+                "total_sec": 0.0,
+                "min_sec": None,
+                "max_sec": None,
+                "buckets": [0] * (len(BATCH_STAGE_BUCKETS_SEC) + 1),
+            }
+            batch["stages"][key] = hist
+        hist["count"] += 1
+        hist["total_sec"] += elapsed
+        hist["min_sec"] = elapsed if hist["min_sec"] is None else min(hist["min_sec"], elapsed)
+        hist["max_sec"] = elapsed if hist["max_sec"] is None else max(hist["max_sec"], elapsed)
+        idx = len(BATCH_STAGE_BUCKETS_SEC)
+        for i, bound in enumerate(BATCH_STAGE_BUCKETS_SEC):
+            if elapsed <= bound:
+                idx = i
+                break
+        hist["buckets"][idx] += 1
+
+def _batch_run_finished(batch_id: str, run_id: str, ok: bool, cancelled: bool = False) -> None:
+    now = time.time()
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        if batch is None:
+            return
+        run = batch["runs"].setdefault(run_id, {"started_at": now, "last_ts": now})
+        run["elapsed_sec"] = max(0.0, now - run.get("started_at", now))
+        if cancelled:
+            run["status"] = "cancelled"
+            batch["cancelled"] += 1
+        elif ok:
+            run["status"] = "done"
+            batch["done"] += 1
+        else:
+            run["status"] = "failed"
+            batch["failed"] += 1
+        if batch["active_run_id"] == run_id:
+            batch["active_run_id"] = None
+        if batch["done"] + batch["failed"] + batch["cancelled"] >= batch["total"]:
+            batch["finished_at"] = now
+
+def _batch_cancel_event(batch_id: str) -> threading.Event | None:
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        return batch["cancel_event"] if batch else None
+
+def _batch_run_cancel_event(batch_id: str, run_id: str) -> threading.Event | None:
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        return batch["run_cancel"].get(run_id) if batch else None
+
+def _batch_cancel(batch_id: str) -> bool:
+    """Request cancellation of a batch; returns False when it already finished."""
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        if batch is None or batch["finished_at"] is not None:
+            return False
+        batch["cancel_event"].set()
+        for event in batch["run_cancel"].values():
+            event.set()
+    return True
+
+def _batch_cancel_run(batch_id: str, run_id: str) -> bool:
+    """Request cancellation of one run of a batch; returns False when that run already finished."""
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        event = batch["run_cancel"].get(run_id) if batch else None
+        if event is None or batch["runs"].get(run_id, {}).get("status") in ("done", "failed", "cancelled"):
+            return False
+        event.set()
+    return True
+
+def _batch_snapshot(batch_id: str | None) -> dict | None:
+    """Public view of a batch: counts, stage histograms and an ETA from observed audio-second rates."""
+    if not batch_id:
+        return None
+    now = time.time()
+    with MASTER_BATCH_LOCK:
+        batch = MASTER_BATCHES.get(batch_id)
+        if batch is None:
+            return None
+        durations = dict(batch["durations"])
+        runs = {rid: dict(run) for rid, run in batch["runs"].items()}
+        stages = {key: dict(hist, buckets=list(hist["buckets"])) for key, hist in batch["stages"].items()}
+        snap = {
+            "batch_id": batch_id,
+            "total": batch["total"],
+            "done": batch["done"],
+            "failed": batch["failed"],
+            "cancelled": batch["cancelled"],
+            "cancel_requested": batch["cancel_event"].is_set(),
+            "active_run_id": batch["active_run_id"],
+            "started_at": batch["started_at"],
+            "finished_at": batch["finished_at"],
+        }
+        run_ids = list(batch["run_ids"])
+    # Rate: wall seconds spent per second of source audio, over successfully finished runs.
+    wall = 0.0
+    audio = 0.0
+    wall_unknown = []
+    for rid, run in runs.items():
+        if run.get("status") != "done" or run.get("elapsed_sec") is None:
+            continue
+        if rid in durations:
+            wall += run["elapsed_sec"]
+            audio += durations[rid]
+        else:
+            wall_unknown.append(run["elapsed_sec"])
+    rate = (wall / audio) if audio > 0 else None
+    pending = [rid for rid in run_ids if runs.get(rid, {}).get("status") not in ("done", "failed", "cancelled")]
+    eta = None
+    if pending and snap["finished_at"] is None:
+        known = [d for d in durations.values() if d > 0]
+        avg_dur = (sum(known) / len(known)) if known else None
+        if rate is not None:
+            remaining_audio = 0.0
+            for rid in pending:
+                dur = durations.get(rid, avg_dur)
+                if dur:
+                    remaining_audio += dur
+            active = runs.get(snap["active_run_id"] or "")
+            active_spent = (now - active["started_at"]) if active and active.get("status") == "running" else 0.0
+            eta = max(0.0, remaining_audio * rate - active_spent)
+        elif wall_unknown:
+            eta = (sum(wall_unknown) / len(wall_unknown)) * len(pending)
+    elif snap["finished_at"] is not None:
+        eta = 0.0
+    for hist in stages.values():
+        hist["avg_sec"] = round(hist["total_sec"] / hist["count"], 3) if hist["count"] else None
+        hist["total_sec"] = round(hist["total_sec"], 3)
+        for key in ("min_sec", "max_sec"):
+            if hist[key] is not None:
+                hist[key] = round(hist[key], 3)
+    snap.update({
+        "pending": len(pending),
+        "elapsed_sec": round((snap["finished_at"] or now) - snap["started_at"], 3),
+        "audio_sec_done": round(audio, 3),
+        "sec_per_audio_sec": round(rate, 4) if rate is not None else None,
+        "realtime_factor": round(audio / wall, 3) if wall > 0 else None,
+        "eta_sec": round(eta, 1) if eta is not None else None,
+        "stage_buckets_sec": list(BATCH_STAGE_BUCKETS_SEC),
+        "stages": stages,
+    })
+    return snap
+
 def _import_master_outputs(song_id: str, run_dir: Path, summary: dict | None = None) -> list[dict]:
     outputs = []
     if not run_dir.exists():
@@ -748,6 +1562,8 @@ def _start_master_jobs(song_ids, presets, strength, lufs, tp, width, mono_bass,
     RUNS_IN_FLIGHT = max(0, RUNS_IN_FLIGHT) + 1
     target_loop = getattr(status_bus, "loop", None) or MAIN_LOOP
     run_ids = [str(s) for s in song_ids]
+    batch_id = _batch_create(run_ids)
+    cancel_event = _batch_cancel_event(batch_id)
     def _is_enabled(val):
         if val is None:
             return False
@@ -755,16 +1571,18 @@ def _start_master_jobs(song_ids, presets, strength, lufs, tp, width, mono_bass,
             return bool(val)
         txt = str(val).strip().lower()
         return txt not in ("0","false","off","no","")
-    def _emit(run_id: str, stage: str, detail: str = "", preset: str | None = None):
-        ev = {"stage": stage, "detail": detail, "ts": datetime.utcnow().timestamp()}
-        if preset:
-            ev["preset"] = preset
+    def _dispatch(run_id: str, ev: dict):
         loop_obj = getattr(status_bus, "loop", None) or MAIN_LOOP
         if loop_obj and loop_obj.is_running():
             try:
                 asyncio.run_coroutine_threadsafe(status_bus.append_events(run_id, [ev]), loop_obj)
             except Exception:
                 pass
+    def _emit(run_id: str, stage: str, detail: str = "", preset: str | None = None):
+        ev = {"stage": stage, "detail": detail, "ts": datetime.utcnow().timestamp()}
+        if preset:
+            ev["preset"] = preset
+        _dispatch(run_id, ev)
     def _mark_direct(run_id: str):
         loop_obj = getattr(status_bus, "loop", None) or MAIN_LOOP
         if loop_obj and loop_obj.is_running():
@@ -772,33 +1590,74 @@ def _start_master_jobs(song_ids, presets, strength, lufs, tp, width, mono_bass,
                 asyncio.run_coroutine_threadsafe(status_bus.mark_direct(run_id), loop_obj)
             except Exception:
                 pass
+    def _emit_batch(run_id: str):
+        snap = _batch_snapshot(batch_id)
+        if not snap:
+            return
+        finished = snap["done"] + snap["failed"] + snap["cancelled"]
+        eta = snap.get("eta_sec")
+        detail = f"{finished}/{snap['total']} songs"
+        if snap["failed"]:
+            detail += f" ({snap['failed']} failed)"
+        if snap["cancelled"]:
+            detail += f" ({snap['cancelled']} cancelled)"
+        if eta is not None and snap["pending"]:
+            detail += f", ETA {int(round(eta))}s"
+        _dispatch(run_id, {"stage": "batch", "detail": detail, "ts": datetime.utcnow().timestamp(), "batch": snap})
     final_events: dict[str, dict] = {}
     def _make_event_cb(run_id: str):
         def _cb(event: dict):
             if not isinstance(event, dict):
                 return
             stage = event.get("stage", "")
+            if stage == "progress":
+                # Percentage ticks from the streaming ffmpeg runner pass through untouched.
+                _dispatch(run_id, event)
+                return
+            _batch_record_stage(batch_id, run_id, stage)
             if stage == "complete":
                 final_events[run_id] = event
                 return
+            if stage == "cancelled":
+                # Emitted by run_all once partial outputs are cleaned up.
+                return
             _emit(run_id, stage, event.get("detail", ""), event.get("preset"))
         return _cb
     def run_all():
+        # Resolve every song up front so the batch ETA can weigh pending songs by audio length.
+        song_entries = {}
+        for song_id, rid in zip(song_ids, run_ids):
+            song_entry = _library_find_song(song_id)
+            song_entries[rid] = song_entry
+            if song_entry:
+                source = song_entry.get("source") or {}
+                duration = source.get("duration_sec") or (source.get("metrics") or {}).get("duration_sec")
+                _batch_set_duration(batch_id, rid, duration)
         for song_id, rid in zip(song_ids, run_ids):
             do_analyze  = _is_enabled(stage_analyze)
             do_master   = _is_enabled(stage_master)
             do_loudness = _is_enabled(stage_loudness)
             do_stereo   = _is_enabled(stage_stereo)
             do_output   = _is_enabled(stage_output)
-            song_entry = _library_find_song(song_id)
+            run_cancel = _batch_run_cancel_event(batch_id, rid) or cancel_event
+            if run_cancel.is_set():
+                _batch_run_finished(batch_id, rid, False, cancelled=True)
+                _emit_batch(rid)
+                _emit(rid, "cancelled", "Batch cancelled" if cancel_event.is_set() else "Run cancelled")
+                continue
+            song_entry = song_entries.get(rid)
             if not song_entry or not song_entry.get("source", {}).get("rel"):
                 _emit(rid, "error", "Song source not found")
+                _batch_run_finished(batch_id, rid, False)
+                _emit_batch(rid)
                 continue
             src_rel = song_entry["source"]["rel"]
             try:
                 src_path = resolve_rel(src_rel)
             except ValueError:
                 _emit(rid, "error", "Invalid source path")
+                _batch_run_finished(batch_id, rid, False)
+                _emit_batch(rid)
                 continue
             run_dir = MASTER_RUN_DIR / rid
             try:
@@ -810,11 +1669,15 @@ def _start_master_jobs(song_ids, presets, strength, lufs, tp, width, mono_bass,
                 run_dir.mkdir(parents=True, exist_ok=True)
             except Exception:
                 _emit(rid, "error", "Run directory unavailable")
+                _batch_run_finished(batch_id, rid, False)
+                _emit_batch(rid)
                 continue
             try:
                 print(f"[master-bulk] start song={song_id} presets={presets}", file=sys.stderr)
+                _batch_run_started(batch_id, rid)
                 _emit(rid, "queued", src_path.name)
                 _mark_direct(rid)
+                _emit_batch(rid)
                 mastering_pack.run_master_job(
                     src_path.name,
                     input_path=str(src_path),
@@ -850,6 +1713,7 @@ def _start_master_jobs(song_ids, presets, strength, lufs, tp, width, mono_bass,
                     voicing_mode=voicing_mode or "presets",
                     voicing_name=voicing_name,
                     event_cb=_make_event_cb(rid),
+                    cancel_event=run_cancel,
                 )
                 _import_master_outputs(
                     song_id,
@@ -860,13 +1724,23 @@ def _start_master_jobs(song_ids, presets, strength, lufs, tp, width, mono_bass,
                         "strength": strength,
                     },
                 )
+                _batch_run_finished(batch_id, rid, True)
+                _emit_batch(rid)
                 final_event = final_events.pop(rid, None)
                 if final_event:
                     _emit(rid, final_event.get("stage", "complete"), final_event.get("detail", ""), final_event.get("preset"))
                 else:
                     _emit(rid, "complete", "", None)
                 print(f"[master-bulk] done song={song_id}", file=sys.stderr)
+            except mastering_pack.JobCancelled:
+                shutil.rmtree(run_dir, ignore_errors=True)
+                _batch_run_finished(batch_id, rid, False, cancelled=True)
+                _emit_batch(rid)
+                _emit(rid, "cancelled", "Job cancelled")
+                print(f"[master-bulk] cancelled song={song_id}", file=sys.stderr)
             except Exception as e:
+                _batch_run_finished(batch_id, rid, False)
+                _emit_batch(rid)
                 print(f"[master-bulk] failed song={song_id}: {e}", file=sys.stderr)
     def _run_wrapper():
         global RUNS_IN_FLIGHT
@@ -879,6 +1753,8 @@ def _start_master_jobs(song_ids, presets, strength, lufs, tp, width, mono_bass,
     threading.Thread(target=_run_wrapper, daemon=True).start()
     return run_ids
 # --- SSE status stream with in-memory ring buffer + file watcher ---
+TERMINAL_STAGES = ("complete", "error", "cancelled")
+
 class StatusBus:
     def __init__(self, ttl_sec: int = 600, max_events: int = 256):
         self.ttl = ttl_sec
@@ -921,25 +1797,28 @@ class StatusBus:
         async with self.lock:
             st = await self._ensure_state(run_id)
             for e in events:
-                if st["terminal"] and e.get("stage") in ("complete", "error"):
+                if st["terminal"] and e.get("stage") in TERMINAL_STAGES:
                     continue
                 # attach terminal payload (outlist/metrics) when available
-                if e.get("stage") in ("complete", "error"):
+                if e.get("stage") in TERMINAL_STAGES:
                     try:
                         payload = outlist(run_id)
                         e = dict(e)
                         e["result"] = payload
                     except Exception:
                         pass
+                # Only the latest progress tick is worth replaying; keep the ring buffer for real stages.
+                if e.get("stage") == "progress" and st["events"] and st["events"][-1].get("stage") == "progress":
+                    st["events"].pop()
                 st["last_id"] += 1
                 ev = dict(e)
                 ev["_id"] = st["last_id"]
                 st["events"].append(ev)
                 for q in list(st["waiters"]):
                     await q.put(ev)
-                if ev.get("stage") in ("complete", "error"):
+                if ev.get("stage") in TERMINAL_STAGES:
                     st["terminal"] = True
-            if events and (events[-1].get("stage") in ("complete", "error")):
+            if events and (events[-1].get("stage") in TERMINAL_STAGES):
                 await self._schedule_cleanup(run_id)
     async def snapshot(self, run_id: str):
         st = await self._ensure_state(run_id)
@@ -1010,7 +1889,7 @@ class StatusBus:
                     new_entries = entries[last_len:]
                     last_len = len(entries)
                     await self.append_events(run_id, new_entries)
-                    if new_entries and new_entries[-1].get("stage") in ("complete", "error"):
+                    if new_entries and new_entries[-1].get("stage") in TERMINAL_STAGES:
                         break
                 if last_len > 0 and not path.exists():
                     break
@@ -1079,6 +1958,41 @@ async def _capture_loop():
         status_bus.loop = MAIN_LOOP
     except Exception:
         MAIN_LOOP = None
+    if MAIN_LOOP is not None and LOOP_BLOCK_DEBUG:
+        threading.Thread(
+            target=_loop_block_watchdog,
+            args=(MAIN_LOOP, threading.get_ident()),
+            name="loop-block-watchdog",
+            daemon=True,
+        ).start()
+        logger.info("[loop] blocking-call detector enabled threshold_ms=%s", LOOP_BLOCK_WARN_MS)
+
+# Debug aid: a watchdog thread pings the event loop and, when a ping is not served
+# within LOOP_BLOCK_WARN_MS, logs the loop thread's stack so the blocking call
+# (sync DB query, filesystem scan, subprocess) can be moved off the loop.
+LOOP_BLOCK_DEBUG = os.getenv("LOOP_BLOCK_DEBUG", "1" if os.getenv("LOG_LEVEL", "").lower() == "debug" else "0") == "1"
+LOOP_BLOCK_WARN_MS = max(10.0, float(os.getenv("LOOP_BLOCK_WARN_MS", "100")))
+
+def _loop_block_watchdog(loop, loop_thread_id: int) -> None:
+    threshold = LOOP_BLOCK_WARN_MS / 1000.0
+    while not loop.is_closed():
+        served = threading.Event()
+        started = time.monotonic()
+        try:
+            loop.call_soon_threadsafe(served.set)
+        except RuntimeError:
+            return
+        if not served.wait(threshold):
+            frame = sys._current_frames().get(loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=15)) if frame else ""
+            served.wait()
+            logger.warning(
+                "[loop] event loop blocked %.0f ms (threshold %.0f ms); loop thread was in:\n%s",
+                (time.monotonic() - started) * 1000.0,
+                LOOP_BLOCK_WARN_MS,
+                stack.rstrip(),
+            )
+        time.sleep(threshold)
 
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc: HTTPException):
@@ -1120,7 +2034,7 @@ async def status_stream(song: str, request: Request):
                     e = await asyncio.wait_for(q.get(), timeout=15)
                     yield f"id: {e.get('_id','')}\n"
                     yield f"data: {json.dumps(e)}\n\n"
-                    if e.get("stage") in ("complete", "error"):
+                    if e.get("stage") in TERMINAL_STAGES:
                         break
                 except asyncio.TimeoutError:
                     now = datetime.utcnow().timestamp()
@@ -1217,6 +2131,38 @@ def run_cmd(cmd: list[str]) -> subprocess.CompletedProcess:
     # CodeQL [py/command-line-injection]: argv is validated, shell=False, fixed binaries; user input does not control executed program
     return subprocess.run(cmd, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
 
+def run_cmd_cancellable(cmd: list[str], cancel_event: threading.Event | None, *,
+                        input_bytes: bytes | None = None, text: bool = True) -> subprocess.CompletedProcess | None:
+    """run_cmd that kills the child process tree and returns None once cancel_event is set.
+    input_bytes is written to stdin (requires text=False, which also returns raw stdout/stderr bytes)."""
+    if cancel_event is None and input_bytes is None and text:
+        return run_cmd(cmd)
+    if input_bytes is not None and text:
+        raise ValueError("input_bytes requires text=False")
+    _assert_safe_cmd(cmd)
+    popen_kw = {"start_new_session": True} if os.name == "posix" else {}
+    # CodeQL [py/command-line-injection]: argv is validated, shell=False, fixed binaries; user input does not control executed program
+    proc = subprocess.Popen(
+        cmd,
+        text=text,
+        stdin=subprocess.PIPE if input_bytes is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        **popen_kw,
+    )
+    pending_input = input_bytes
+    while True:
+        try:
+            # stdin can only be handed to communicate() once; retries after a timeout resume it.
+            out, err = proc.communicate(input=pending_input, timeout=mastering_pack.FFMPEG_POLL_SEC)
+            return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+        except subprocess.TimeoutExpired:
+            pending_input = None
+            if cancel_event is not None and cancel_event.is_set():
+                mastering_pack._kill_process_tree(proc)
+                proc.communicate()
+                return None
+
 def run_cmd_passthrough(cmd: list[str]) -> None:
     """Run a command streaming stdout/stderr to the container logs."""
     _assert_safe_cmd(cmd)
@@ -1306,9 +2252,10 @@ def _ffprobe_audio_info(path: Path) -> dict:
     }
 
 
-def _analyze_audio_metrics(path: Path) -> dict:
+def _analyze_audio_metrics(path: Path, info: dict | None = None) -> dict:
     metrics: dict[str, object] = {}
-    info = _ffprobe_audio_info(path)
+    if info is None:
+        info = _ffprobe_audio_info(path)
     for key in ("duration_sec", "sample_rate", "channels"):
         val = info.get(key)
         if val is not None:
@@ -1351,6 +2298,247 @@ def _analyze_audio_metrics(path: Path) -> dict:
             metrics["rms_peak_db"] = astats.get("rms_peak")
     return metrics
 
+# Content-hash dedup: sources are fingerprinted with a streaming BLAKE2b (plus, optionally, a hash
+# of the decoded PCM so re-encodes match). LIBRARY_DEDUP=reuse returns the existing song for a
+# byte-identical upload/import, "link" creates a new song whose file is a copy-on-write reflink of
+# the existing one (a plain copy where the filesystem can't clone) with its metrics copied, "off"
+# disables the lookup. A PCM-only match is a different encoding, so it can be reused as a song but
+# is never linked over or given the other file's metrics: the uploaded bytes are kept and analyzed. LIBRARY_DEDUP_LINK=hardlink opts into shared inodes; the tagger splits
+# them before rewriting ID3 tags in place.
+LIBRARY_DEDUP_MODE = os.getenv("LIBRARY_DEDUP", "reuse").strip().lower()
+LIBRARY_DEDUP_LINK = os.getenv("LIBRARY_DEDUP_LINK", "reflink").strip().lower()
+LIBRARY_DEDUP_PCM = os.getenv("LIBRARY_DEDUP_PCM", "0") == "1"
+
+def _pcm_content_hash(path: Path) -> str | None:
+    """BLAKE2b of the first audio stream decoded to 44.1k stereo s16le, or None if ffmpeg fails."""
+    digest = hashlib.blake2b(digest_size=20)
+    cmd = [FFMPEG_BIN, "-v", "error", "-nostdin", "-i", str(path), "-map", "0:a:0",
+           "-f", "s16le", "-ac", "2", "-ar", "44100", "-"]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    with proc:
+        for chunk in iter(lambda: proc.stdout.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest() if proc.returncode == 0 else None
+
+def _find_duplicate_source(file_hash: str | None, path: Path) -> tuple[dict | None, str | None]:
+    """Look up library audio matching path; returns (duplicate, pcm_hash)."""
+    if LIBRARY_DEDUP_MODE == "off":
+        return None, None
+    dup = library_store.find_duplicate(file_hash)
+    pcm_hash = None
+    if LIBRARY_DEDUP_PCM:
+        pcm_hash = _pcm_content_hash(path)
+        if dup is None and pcm_hash:
+            dup = library_store.find_duplicate(None, pcm_hash)
+    if dup is not None:
+        try:
+            if not resolve_rel(dup["rel"]).is_file():
+                dup = None
+        except ValueError:
+            dup = None
+    return dup, pcm_hash
+
+def _dedup_link(dup: dict, dest: Path) -> str | None:
+    """Replace dest with a link to the duplicate's file; returns the method, or None if it would be a copy."""
+    if LIBRARY_DEDUP_LINK not in ("reflink", "hardlink"):
+        return None
+    tmp = dest.with_name(dest.name + ".dedup")
+    tmp.unlink(missing_ok=True)
+    method = link_or_copy(resolve_rel(dup["rel"]), tmp, LIBRARY_DEDUP_LINK)
+    if method == "copy":
+        tmp.unlink(missing_ok=True)
+        return None
+    os.replace(tmp, dest)
+    return method
+
+# Background analysis backfill: sources inserted with analyzed=False (uploads, import scan,
+# inbox sync) and versions registered without metrics are analyzed in small batches on a few
+# low-priority threads, paused while mastering runs are in flight, and written back in bulk.
+ANALYSIS_BACKFILL_ENABLED = os.getenv("ANALYSIS_BACKFILL", "1") == "1"
+ANALYSIS_BACKFILL_WORKERS = max(1, int(os.getenv("ANALYSIS_BACKFILL_WORKERS", str(max(1, (os.cpu_count() or 2) // 4)))))
+ANALYSIS_BACKFILL_BATCH = max(1, int(os.getenv("ANALYSIS_BACKFILL_BATCH", "8")))
+ANALYSIS_BACKFILL_NICE = int(os.getenv("ANALYSIS_BACKFILL_NICE", "10"))
+ANALYSIS_BACKFILL_IDLE_SEC = float(os.getenv("ANALYSIS_BACKFILL_IDLE_SEC", "300"))
+ANALYSIS_BACKFILL_COND = threading.Condition()
+ANALYSIS_BACKFILL_WAKE = False
+ANALYSIS_BACKFILL_SKIP: set[str] = set()
+_ANALYSIS_BACKFILL_STARTED = False
+
+def _lower_thread_priority(niceness: int) -> None:
+    # Linux applies niceness per thread, and ffmpeg children inherit it from the spawning thread.
+    if niceness <= 0 or not sys.platform.startswith("linux"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), niceness)
+    except (AttributeError, OSError):
+        pass
+
+def _analysis_backfill_one(item: dict) -> tuple[dict, dict | None]:
+    try:
+        path = resolve_rel(item["rel"])
+    except ValueError:
+        return item, None
+    if not path.is_file():
+        return item, None
+    try:
+        return item, _analyze_audio_metrics(path) or None
+    except Exception as exc:
+        logger.debug("[analysis] backfill failed kind=%s id=%s err=%s", item["kind"], item["id"], exc)
+        return item, None
+
+def _hash_backfill_one(item: dict) -> tuple[dict, tuple[str, str | None] | None]:
+    try:
+        path = resolve_rel(item["rel"])
+        if not path.is_file():
+            return item, None
+        pcm_hash = _pcm_content_hash(path) if LIBRARY_DEDUP_PCM and item["kind"] == "song" else None
+        return item, (content_hash(path), pcm_hash)
+    except (OSError, ValueError) as exc:
+        logger.debug("[analysis] hash failed kind=%s id=%s err=%s", item["kind"], item["id"], exc)
+        return item, None
+
+def _analysis_backfill_loop() -> None:
+    global ANALYSIS_BACKFILL_WAKE
+    pool = ThreadPoolExecutor(
+        max_workers=ANALYSIS_BACKFILL_WORKERS,
+        thread_name_prefix="analysis-backfill",
+        initializer=_lower_thread_priority,
+        initargs=(ANALYSIS_BACKFILL_NICE,),
+    )
+    while True:
+        with ANALYSIS_BACKFILL_COND:
+            if not ANALYSIS_BACKFILL_WAKE:
+                ANALYSIS_BACKFILL_COND.wait(timeout=ANALYSIS_BACKFILL_IDLE_SEC)
+            ANALYSIS_BACKFILL_WAKE = False
+            while RUNS_IN_FLIGHT > 0:
+                ANALYSIS_BACKFILL_COND.wait(timeout=1.0)
+        # A failed batch (e.g. "database is locked") must not kill the worker: nothing else
+        # analyzes uploads, syncs or imports.
+        try:
+            more = _analysis_backfill_batch(pool)
+        except Exception as exc:
+            logger.warning("[analysis] backfill batch failed: %s", exc)
+            more = False
+        if more:
+            with ANALYSIS_BACKFILL_COND:
+                ANALYSIS_BACKFILL_WAKE = True
+
+def _analysis_backfill_batch(pool: ThreadPoolExecutor) -> bool:
+    """Analyze, hash or tag-index one batch; returns True when more work is likely pending."""
+    try:
+        pending = library_store.pending_analysis(ANALYSIS_BACKFILL_BATCH + len(ANALYSIS_BACKFILL_SKIP))
+        pending_hashes = []
+        if LIBRARY_DEDUP_MODE != "off":
+            pending_hashes = library_store.pending_hashes(ANALYSIS_BACKFILL_BATCH + len(ANALYSIS_BACKFILL_SKIP))
+    except Exception as exc:
+        logger.warning("[analysis] backfill query failed: %s", exc)
+        return False
+    items = [item for item in pending if item["id"] not in ANALYSIS_BACKFILL_SKIP][:ANALYSIS_BACKFILL_BATCH]
+    hash_items = [
+        item for item in pending_hashes if f"hash:{item['id']}" not in ANALYSIS_BACKFILL_SKIP
+    ][:ANALYSIS_BACKFILL_BATCH]
+    tag_rels = []
+    if not items and not hash_items:
+        try:
+            tag_rels = [rel for rel in library_store.pending_tags(ANALYSIS_BACKFILL_BATCH * 4 + len(ANALYSIS_BACKFILL_SKIP))
+                        if f"tags:{rel}" not in ANALYSIS_BACKFILL_SKIP]
+        except Exception as exc:
+            logger.warning("[analysis] tag backfill query failed: %s", exc)
+    if tag_rels:
+        with library_store.LibraryBulkWriter() as writer:
+            for rel in tag_rels:
+                try:
+                    writer.set_media_tags(rel, TAGGER.read_tags(resolve_rel(rel)))
+                except Exception as exc:
+                    ANALYSIS_BACKFILL_SKIP.add(f"tags:{rel}")
+                    logger.debug("[analysis] tag read failed rel=%s err=%s", rel, exc)
+        logger.debug("[analysis] indexed tags batch=%s rows=%s", len(tag_rels), writer.rows)
+        return True
+    if hash_items:
+        with library_store.LibraryBulkWriter() as writer:
+            for item, hashes in pool.map(_hash_backfill_one, hash_items):
+                if not hashes:
+                    ANALYSIS_BACKFILL_SKIP.add(f"hash:{item['id']}")
+                elif item["kind"] == "song":
+                    writer.set_source_hash(item["id"], *hashes)
+                else:
+                    writer.set_rendition_hash(item["id"], hashes[0])
+        logger.debug("[analysis] hashed batch=%s rows=%s", len(hash_items), writer.rows)
+    if not items:
+        return bool(hash_items)
+    started = time.monotonic()
+    results = list(pool.map(_analysis_backfill_one, items))
+    with library_store.LibraryBulkWriter() as writer:
+        for item, metrics in results:
+            if not metrics:
+                # Missing or undecodable files stay unanalyzed; don't retry them this process.
+                ANALYSIS_BACKFILL_SKIP.add(item["id"])
+            elif item["kind"] == "song":
+                writer.set_song_metrics(item["id"], metrics)
+            else:
+                writer.set_version_metrics(item["song_id"], item["id"], metrics)
+    for tag, _song_id, exc in writer.errors:
+        logger.debug("[analysis] backfill write failed item=%s err=%s", tag, exc)
+    logger.info(
+        "[analysis] backfill batch=%s analyzed=%s skipped=%s in %.1fs rows_per_sec=%s",
+        len(items),
+        sum(1 for _item, metrics in results if metrics),
+        sum(1 for _item, metrics in results if not metrics),
+        time.monotonic() - started,
+        writer.rows_per_sec,
+    )
+    return True
+
+def _analysis_backfill_wake() -> None:
+    """Nudge the backfill worker after inserting unanalyzed songs or versions (starts it on first use)."""
+    global ANALYSIS_BACKFILL_WAKE, _ANALYSIS_BACKFILL_STARTED
+    if not ANALYSIS_BACKFILL_ENABLED:
+        return
+    with ANALYSIS_BACKFILL_COND:
+        ANALYSIS_BACKFILL_WAKE = True
+        ANALYSIS_BACKFILL_COND.notify_all()
+        if _ANALYSIS_BACKFILL_STARTED:
+            return
+        _ANALYSIS_BACKFILL_STARTED = True
+    threading.Thread(target=_analysis_backfill_loop, daemon=True).start()
+
+# Library DB maintenance: checkpoint an oversized WAL, PRAGMA optimize (or ANALYZE after bulk
+# writes) and optional incremental vacuum, every LIBRARY_DB_MAINTENANCE_SEC and after syncs/imports.
+LIBRARY_DB_MAINTENANCE_SEC = float(os.getenv("LIBRARY_DB_MAINTENANCE_SEC", "900"))
+DB_MAINTENANCE_COND = threading.Condition()
+DB_MAINTENANCE_WAKE = False
+_DB_MAINTENANCE_STARTED = False
+
+def _db_maintenance_loop() -> None:
+    global DB_MAINTENANCE_WAKE
+    while True:
+        with DB_MAINTENANCE_COND:
+            if not DB_MAINTENANCE_WAKE:
+                DB_MAINTENANCE_COND.wait(timeout=LIBRARY_DB_MAINTENANCE_SEC)
+            DB_MAINTENANCE_WAKE = False
+        try:
+            done = library_store.run_maintenance()
+            if done.get("analyze") is not None or done.get("vacuum_pages"):
+                logger.info("[db] maintenance %s", done)
+        except Exception as exc:
+            logger.warning("[db] maintenance failed: %s", exc)
+
+def _db_maintenance_wake() -> None:
+    """Run a maintenance pass soon, e.g. after a bulk sync (starts the scheduler on first use)."""
+    global DB_MAINTENANCE_WAKE, _DB_MAINTENANCE_STARTED
+    if LIBRARY_DB_MAINTENANCE_SEC <= 0:
+        return
+    with DB_MAINTENANCE_COND:
+        DB_MAINTENANCE_WAKE = True
+        DB_MAINTENANCE_COND.notify_all()
+        if _DB_MAINTENANCE_STARTED:
+            return
+        _DB_MAINTENANCE_STARTED = True
+    threading.Thread(target=_db_maintenance_loop, name="library-db-maintenance", daemon=True).start()
+
 def _run_ebur128_framelog(path: Path) -> str | None:
     r = run_cmd([
         FFMPEG_BIN, "-hide_banner", "-nostats", "-loglevel", "verbose", "-i", str(path),
@@ -1682,6 +2870,8 @@ def _startup_bootstrap() -> None:
             logger.warning("[startup] sync failed: %s", exc)
     else:
         logger.info("[startup] sync skipped (SONUSTEMPER_RECONCILE_ON_BOOT=0)")
+    _analysis_backfill_wake()
+    _db_maintenance_wake()
 
 app.add_event_handler("startup", _startup_bootstrap)
 def measure_loudness(path: Path) -> dict:
@@ -2732,6 +3922,29 @@ def tagger_temp_clear(payload: dict = Body(...)):
         shutil.rmtree(session_dir, ignore_errors=True)
     return {"cleared": True}
 
+def _index_media_tags(entries: list[tuple[dict, dict]]) -> None:
+    """Feed tags written through the tagger to the library (library files only).
+
+    The search index gets the new tags, and the file's content_hash is recomputed since the
+    ID3 rewrite changed its bytes (a stale hash would keep matching dedup lookups).
+    """
+    with library_store.LibraryBulkWriter() as writer:
+        for entry, tags in entries:
+            if entry.get("root") != "out":
+                continue
+            path = TAGGER.roots["out"] / entry["relpath"]
+            try:
+                rel = rel_from_path(path)
+            except ValueError:
+                continue
+            writer.set_media_tags(rel, tags or {})
+            try:
+                writer.set_file_hash(rel, content_hash(path) if LIBRARY_DEDUP_MODE != "off" else None)
+            except OSError:
+                writer.set_file_hash(rel, None)
+    for tag, _song_id, exc in writer.errors:
+        logger.warning("[tagger] library update failed %s: %s", tag, exc)
+
 @app.get("/api/tagger/file/{file_id}")
 def tagger_get(file_id: str):
     return TAGGER.get_file_payload(file_id)
@@ -2741,7 +3954,9 @@ def tagger_update(file_id: str, body: dict = Body(...)):
     tags = body.get("tags") if isinstance(body, dict) else None
     if tags is None:
         raise HTTPException(status_code=400, detail="missing_tags")
-    return TAGGER.update_file_tags(file_id, tags)
+    result = TAGGER.update_file_tags(file_id, tags)
+    _index_media_tags([(result, result.get("tags"))])
+    return result
 
 @app.post("/api/tagger/import")
 async def tagger_import(file: UploadFile = File(...)):
@@ -2781,7 +3996,17 @@ def tagger_album_apply(body: dict = Body(...)):
     upload_id = artwork.get("upload_id")
     if mode not in {"keep", "apply", "clear"}:
         raise HTTPException(status_code=400, detail="invalid_artwork_mode")
-    return TAGGER.apply_album(file_ids, shared, tracks, artwork_mode=mode, artwork_upload_id=upload_id)
+    entries = {}
+    for fid in file_ids if isinstance(file_ids, list) else []:
+        try:
+            entries[fid] = TAGGER.resolve_id(fid)[0]
+        except HTTPException:
+            continue
+    result = TAGGER.apply_album(file_ids, shared, tracks, artwork_mode=mode, artwork_upload_id=upload_id)
+    _index_media_tags([
+        (entries[item["id"]], item.get("tags")) for item in result.get("updated", []) if item.get("id") in entries
+    ])
+    return result
 
 @app.get("/api/tagger/album/download")
 def tagger_album_download(ids: str, name: str = "album", background_tasks: BackgroundTasks = None):
@@ -2835,19 +4060,12 @@ def presets_paths():
     }
 @app.get("/api/recent")
 def recent(limit: int = 30):
-    lib = library_store.list_library()
     items = []
-    songs = sorted(
-        lib.get("songs", []),
-        key=lambda s: s.get("last_used_at") or s.get("created_at") or "",
-        reverse=True,
-    )
-    for song in songs[:limit]:
-        latest = library_store.latest_version(song.get("song_id"))
+    for song in library_store.recent_songs(limit):
         items.append({
             "song": song.get("title") or song.get("song_id"),
             "song_id": song.get("song_id"),
-            "latest": latest,
+            "latest": song.get("latest"),
         })
     return {"items": items}
 @app.delete("/api/song/{song}")
@@ -3011,12 +4229,7 @@ def _library_find_song(song_key: str) -> dict | None:
     song = library_store.get_song(key)
     if song:
         return song
-    key_lower = key.lower()
-    lib = library_store.list_library()
-    for entry in lib.get("songs", []):
-        if (entry.get("title") or "").strip().lower() == key_lower:
-            return entry
-    return None
+    return library_store.find_song_by_title(key)
 
 
 def _library_find_version(song: dict, token: str | None) -> dict | None:
@@ -3039,24 +4252,135 @@ def _library_find_version(song: dict, token: str | None) -> dict | None:
             return version
     return library_store.latest_version(song.get("song_id"))
 
+def _library_etag(revision: int) -> str:
+    return f'W/"lib-{revision}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match") or ""
+    return any(tag.strip() in (etag, "*") for tag in header.split(","))
+
+
 @app.get("/api/library")
-def library_index_endpoint():
+def library_index_endpoint(
+    request: Request,
+    limit: int | None = None,
+    cursor: str | None = None,
+    sort: str = "created_at",
+    q: str | None = None,
+    kind: str | None = None,
+    versions: bool = True,
+):
+    """Full library by default; passing `limit` switches to a keyset-paginated page
+    (`next_cursor` feeds the following request). Unchanged libraries answer If-None-Match with 304."""
     start = time.monotonic()
     req_id = uuid.uuid4().hex[:8]
     logger.info("[api] /api/library start rid=%s", req_id)
     try:
-        lib = library_store.list_library()
-        payload = {
-            "version": lib.get("version", 1),
-            "songs": lib.get("songs", []),
-        }
+        # Read the revision before the listing so a concurrent write can only make the ETag stale, never ahead.
+        revision = library_store.library_revision()
+        etag = _library_etag(revision)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request, etag):
+            logger.info("[api] /api/library not_modified rid=%s rev=%s", req_id, revision)
+            return Response(status_code=304, headers=headers)
+        if limit is not None:
+            try:
+                songs_json, next_cursor, count = library_store.list_library_page_json(
+                    limit=limit,
+                    cursor=cursor,
+                    sort=sort,
+                    query=q,
+                    kind=kind,
+                    include_versions=versions,
+                )
+            except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc))
+            body = (
+                f'{{"version":{library_store.LIBRARY_VERSION},"revision":{revision},"songs":{songs_json},'
+                f'"next_cursor":{json.dumps(next_cursor)}}}'
+            )
+        else:
+            songs_json, count = library_store.list_library_json()
+            body = f'{{"version":{library_store.LIBRARY_VERSION},"revision":{revision},"songs":{songs_json}}}'
+        # Listings are assembled from cached per-version JSON, so skip the dict round-trip.
         elapsed_ms = (time.monotonic() - start) * 1000
-        logger.info("[api] /api/library ok rid=%s in %.1fms songs=%s", req_id, elapsed_ms, len(payload["songs"]))
-        return payload
+        logger.info("[api] /api/library ok rid=%s in %.1fms songs=%s", req_id, elapsed_ms, count)
+        return Response(body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception:
         logger.exception("[api] /api/library failed rid=%s", req_id)
         raise
 
+@app.get("/api/library/query")
+def library_query_endpoint(
+    scope: str = "versions",
+    filter: list[str] = Query(default=[]),
+    sort: str | None = None,
+    order: str = "desc",
+    limit: int = 100,
+    offset: int = 0,
+    kind: str | None = None,
+    voicing: str | None = None,
+    loudness_profile: str | None = None,
+):
+    """Metric query over song/version metrics, e.g. `?scope=versions&kind=master&filter=delta_i:gt:1&sort=delta_i`.
+
+    Each `filter` is `<metric>:<op>[:<value>]` with op in gt/gte/lt/lte/eq/ne/null/notnull; filters are ANDed."""
+    filters = []
+    for raw in filter:
+        parts = raw.split(":", 2)
+        if len(parts) < 2:
+            raise HTTPException(status_code=400, detail="invalid_filter")
+        field, op = parts[0].strip(), parts[1].strip().lower()
+        value = None
+        if len(parts) == 3 and parts[2].strip():
+            try:
+                value = float(parts[2])
+            except ValueError:
+                raise HTTPException(status_code=400, detail="invalid_value")
+            if not math.isfinite(value):
+                raise HTTPException(status_code=400, detail="invalid_value")
+        filters.append((field, op, value))
+    try:
+        return library_store.query_metrics(
+            scope=scope,
+            filters=filters,
+            sort=sort,
+            order=order,
+            limit=limit,
+            offset=offset,
+            kind=kind,
+            voicing=voicing,
+            loudness_profile=loudness_profile,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.get("/api/library/search")
+def library_search_endpoint(q: str = "", limit: int = 50):
+    """Ranked full-text search over song/version titles and labels, voicings/profiles and MP3 tags."""
+    try:
+        return library_store.search_library(q, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.get("/api/library/changes")
+def library_changes_endpoint(since: int):
+    """Songs changed after revision `since` (upserted songs are full entries, deleted ones are ids).
+    `reset: true` means the client must refetch /api/library."""
+    body, revision = library_store.library_changes_json(since)
+    return Response(body, media_type="application/json",
+                    headers={"ETag": _library_etag(revision), "Cache-Control": "no-cache"})
+
+@app.get("/api/library/song/{song_id}/versions")
+def library_song_versions(song_id: str):
+    versions_json = library_store.list_song_versions_json(song_id)
+    if versions_json is None:
+        raise HTTPException(status_code=404, detail="song_not_found")
+    return Response(f'{{"song_id":{json.dumps(song_id)},"versions":{versions_json}}}', media_type="application/json")
+
 
 @app.post("/api/library/import_source")
 def library_import_source(payload: dict = Body(...)):
@@ -3089,68 +4413,444 @@ def library_import_source(payload: dict = Body(...)):
 
 
 @app.post("/api/library/sync")
-def library_sync():
-    result = library_store.sync_library_fs()
+def library_sync(full: bool = False):
+    result = library_store.sync_library_fs(full=full)
+    if result.get("imported_songs") or result.get("imported_versions"):
+        _analysis_backfill_wake()
+    _db_maintenance_wake()
     return result
 
 
-@app.post("/api/library/import_scan")
-def library_import_scan(payload: dict = Body(default={})):
-    delete_after_import = payload.get("delete_after_import", True)
-    imported = 0
-    skipped = 0
-    errors: list[str] = []
+# Import scan runs as a staged pipeline (copy -> probe -> analyze -> DB write), each stage with
+# its own worker pool, so a large inbox drop overlaps file I/O with ffmpeg work instead of
+# holding one HTTP request for minutes. Progress is published per job for polling and SSE.
+IMPORT_ALLOWED_EXTS = {".wav", ".mp3", ".flac", ".aiff", ".aif", ".m4a", ".aac", ".ogg"}
+IMPORT_HASH_WORKERS = max(1, int(os.getenv("IMPORT_HASH_WORKERS", "2")))
+IMPORT_COPY_WORKERS = max(1, int(os.getenv("IMPORT_COPY_WORKERS", "2")))
+IMPORT_PROBE_WORKERS = max(1, int(os.getenv("IMPORT_PROBE_WORKERS", "4")))
+IMPORT_ANALYZE_WORKERS = max(1, int(os.getenv("IMPORT_ANALYZE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))))
+IMPORT_JOBS_KEEP = max(1, int(os.getenv("IMPORT_JOBS_KEEP", "20")))
+IMPORT_STAGES = ("hash", "copy", "probe", "analyze", "db")
+IMPORT_JOBS: "OrderedDict[str, dict]" = OrderedDict()
+IMPORT_JOBS_LOCK = threading.Lock()
+
+def _import_job_snapshot(job: dict) -> dict:
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "total": job["total"],
+        "stages": dict(job["stages"]),
+        "imported": job["imported"],
+        "skipped": job["skipped"],
+        "duplicates": job["duplicates"],
+        "errors": list(job["errors"]),
+        "current": job.get("current"),
+        "db_rows": job.get("db_rows", 0),
+        "rows_per_sec": job.get("rows_per_sec", 0.0),
+        "started_at": job["started_at"],
+        "finished_at": job.get("finished_at"),
+        "seq": job["seq"],
+    }
+
+def _import_job_update(job_id: str, **changes) -> None:
+    """Apply progress changes to a job and wake its SSE listeners. Caller must not hold IMPORT_JOBS_LOCK."""
+    with IMPORT_JOBS_LOCK:
+        job = IMPORT_JOBS.get(job_id)
+        if not job:
+            return
+        stage = changes.pop("stage", None)
+        if stage:
+            job["stages"][stage] += 1
+        error = changes.pop("error", None)
+        if error:
+            job["errors"].append(error)
+        for key in ("imported", "skipped", "duplicates"):
+            if key in changes:
+                job[key] += changes.pop(key)
+        job.update(changes)
+        job["seq"] += 1
+        waiters, job["waiters"] = job.get("waiters") or [], []
+    for loop, fut in waiters:
+        loop.call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(True))
+
+async def _import_job_wait(job_id: str, seen_seq: int, timeout: float) -> None:
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    with IMPORT_JOBS_LOCK:
+        job = IMPORT_JOBS.get(job_id)
+        if not job or job["seq"] != seen_seq:
+            return
+        waiter = (loop, fut)
+        job.setdefault("waiters", []).append(waiter)
+    try:
+        await asyncio.wait_for(fut, timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        with IMPORT_JOBS_LOCK:
+            waiters = (IMPORT_JOBS.get(job_id) or {}).get("waiters") or []
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+def _import_stage_hash(item: dict) -> dict:
+    item["hash"] = content_hash(item["src"])
+    item["dup"], item["pcm_hash"] = _find_duplicate_source(item["hash"], item["src"])
+    dup = item["dup"]
+    if dup is not None and dup["kind"] == "source" and LIBRARY_DEDUP_MODE == "reuse":
+        item["duplicate_of"] = dup["song_id"]
+    elif dup is not None and dup["match"] == "content" and dup["analyzed"]:
+        item["metrics"] = dup["metrics"]
+    return item
+
+def _import_stage_copy(item: dict) -> dict:
+    fp = item["src"]
+    if item.get("duplicate_of"):
+        if item["move"]:
+            fp.unlink(missing_ok=True)
+        return item
+    dest = allocate_source_path(item["song_id"], fp.name)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dup = item.get("dup")
+    if dup is not None and dup["match"] == "content" and LIBRARY_DEDUP_LINK in ("reflink", "hardlink"):
+        link_or_copy(resolve_rel(dup["rel"]), dest, LIBRARY_DEDUP_LINK)
+        if item["move"]:
+            fp.unlink(missing_ok=True)
+    elif item["move"]:
+        fp.replace(dest)
+    else:
+        shutil.copy2(fp, dest)
+    item["dest"] = dest
+    return item
+
+def _import_stage_probe(item: dict) -> dict:
+    if "metrics" in item:
+        item["info"] = {}
+        return item
+    try:
+        item["info"] = _ffprobe_audio_info(item["dest"]) or {}
+    except Exception as exc:
+        logger.debug("[import] probe failed file=%s err=%s", item["name"], exc)
+        item["info"] = {}
+    return item
+
+def _import_stage_analyze(item: dict) -> dict:
+    if "metrics" in item:
+        return item
+    try:
+        item["metrics"] = _analyze_audio_metrics(item["dest"], info=item["info"]) or {}
+    except Exception as exc:
+        # Unanalyzable files are still imported; the backfill worker may retry them later.
+        logger.debug("[import] analyze failed file=%s err=%s", item["name"], exc)
+        item["metrics"] = {}
+    return item
+
+def _run_import_pipeline(job_id: str, items: list[dict], analyze: bool) -> None:
+    db_queue: "queue.Queue[dict | None]" = queue.Queue()
+    pools = {
+        "hash": ThreadPoolExecutor(max_workers=IMPORT_HASH_WORKERS, thread_name_prefix="import-hash"),
+        "copy": ThreadPoolExecutor(max_workers=IMPORT_COPY_WORKERS, thread_name_prefix="import-copy"),
+        "probe": ThreadPoolExecutor(max_workers=IMPORT_PROBE_WORKERS, thread_name_prefix="import-probe"),
+        "analyze": ThreadPoolExecutor(max_workers=IMPORT_ANALYZE_WORKERS, thread_name_prefix="import-analyze"),
+    }
+    remaining = {"count": len(items)}
+    remaining_lock = threading.Lock()
+
+    def _finish_item(item: dict | None) -> None:
+        if item is not None:
+            db_queue.put(item)
+        with remaining_lock:
+            remaining["count"] -= 1
+            last = remaining["count"] == 0
+        if last:
+            db_queue.put(None)
+
+    def _chain(stage: str, fn, next_stage):
+        def _submit(item: dict) -> None:
+            fut = pools[stage].submit(fn, item)
+
+            def _done(f) -> None:
+                exc = f.exception()
+                if exc is not None:
+                    _import_job_update(job_id, error=f"{item['name']}:{exc!r}")
+                    _settle_group(item, committed=False)
+                    _finish_item(None)
+                    return
+                _import_job_update(job_id, stage=stage, current={"name": item["name"], "stage": stage})
+                if stage == "copy" and item.get("duplicate_of"):
+                    _import_job_update(job_id, duplicates=1)
+                    _finish_item(None)
+                    return
+                if stage == "hash" and item.get("held"):
+                    return
+                next_stage(item)
+
+            fut.add_done_callback(_done)
+        return _submit
+
+    def _skip_analysis(item: dict) -> None:
+        item.setdefault("metrics", {})
+        _finish_item(item)
+
+    to_analyze = _chain("analyze", _import_stage_analyze, _finish_item) if analyze else _skip_analysis
+    to_probe = _chain("probe", _import_stage_probe, to_analyze)
+    to_copy = _chain("copy", _import_stage_copy, to_probe)
+    # Identical files dropped together: the first to finish hashing leads and the others are held
+    # back. They only count as duplicates (and leave the inbox) once the leader's song row is
+    # committed; if the leader fails at any stage, the next one is imported in its place.
+    dup_groups: dict[str, dict] = {}
+    seen_lock = threading.Lock()
+
+    def _drop_duplicate(item: dict, song_id: str) -> None:
+        item["duplicate_of"] = song_id
+        if item["move"]:
+            item["src"].unlink(missing_ok=True)
+        _import_job_update(job_id, duplicates=1)
+        _finish_item(None)
+
+    def _hash_in_job(item: dict) -> dict:
+        _import_stage_hash(item)
+        if LIBRARY_DEDUP_MODE == "reuse" and not item.get("duplicate_of"):
+            with seen_lock:
+                group = dup_groups.setdefault(item["hash"], {"leader": item, "followers": [], "committed": False})
+                if group["leader"] is not item:
+                    item["held"] = True
+                    if not group["committed"]:
+                        group["followers"].append(item)
+                        return item
+                    leader_song = group["leader"]["song_id"]
+                else:
+                    return item
+            _drop_duplicate(item, leader_song)
+        return item
+
+    def _settle_group(item: dict, committed: bool) -> None:
+        key = item.get("hash")
+        if not key or LIBRARY_DEDUP_MODE != "reuse":
+            return
+        promoted = None
+        with seen_lock:
+            group = dup_groups.get(key)
+            if group is None or group["leader"] is not item:
+                return
+            followers, group["followers"] = group["followers"], []
+            if committed:
+                group["committed"] = True
+            elif followers:
+                promoted = followers.pop(0)
+                promoted.pop("held", None)
+                group["leader"], group["followers"] = promoted, followers
+            else:
+                del dup_groups[key]
+        if committed:
+            for follower in followers:
+                _drop_duplicate(follower, item["song_id"])
+        elif promoted is not None:
+            to_copy(promoted)
+
+    to_hash = _chain("hash", _hash_in_job, to_copy) if LIBRARY_DEDUP_MODE != "off" else to_copy
+
+    started = time.monotonic()
+    if not items:
+        db_queue.put(None)
+    for item in items:
+        to_hash(item)
+
+    # Single DB stage: batch whatever the upstream stages have produced and flush when idle.
+    # The writer's chunk exceeds the ops of a full batch (two per item), so it never auto-flushes
+    # behind _flush_pending's back and every error is matched to the pending item it belongs to.
+    batch_size = max(1, library_store.LIBRARY_BULK_CHUNK)
+    writer = library_store.LibraryBulkWriter(chunk=2 * batch_size + 1)
+    pending: list[dict] = []
+    needs_backfill = False
+
+    def _flush_pending() -> None:
+        nonlocal pending
+        if not pending:
+            return
+        seen_errors = len(writer.errors)
+        try:
+            writer.flush()
+        except Exception as exc:
+            # The whole transaction was rolled back: none of these items has a song row.
+            logger.warning("[import] job=%s db flush failed: %s", job_id, exc)
+            for item in pending:
+                _import_job_update(job_id, error=f"{item['name']}:{exc!r}")
+                _settle_group(item, committed=False)
+            pending = []
+            return
+        failed = {tag for tag, _song_id, _exc in writer.errors[seen_errors:]}
+        for tag, _song_id, exc in writer.errors[seen_errors:]:
+            _import_job_update(job_id, error=f"{tag}:{exc!r}")
+        for item in pending:
+            if item["name"] in failed:
+                _settle_group(item, committed=False)
+                continue
+            _settle_group(item, committed=True)
+            _import_job_update(
+                job_id,
+                stage="db",
+                imported=1,
+                current={"name": item["name"], "stage": "db"},
+                db_rows=writer.rows,
+                rows_per_sec=writer.rows_per_sec,
+            )
+        pending = []
+
+    try:
+        done = False
+        while not done:
+            try:
+                item = db_queue.get(timeout=0.25 if pending else None)
+            except queue.Empty:
+                _flush_pending()
+                continue
+            if item is None:
+                done = True
+            else:
+                dest = item["dest"]
+                metrics = item["metrics"]
+                analyzed = bool(metrics)
+                duration = metrics.get("duration_sec") if analyzed else item["info"].get("duration_sec")
+                try:
+                    mtime = datetime.utcfromtimestamp(dest.stat().st_mtime).replace(microsecond=0).isoformat() + "Z"
+                    rel = rel_from_path(dest)
+                except (OSError, ValueError) as exc:
+                    # One vanished file must not strand the rest of the queue without song rows.
+                    _import_job_update(job_id, error=f"{item['name']}:{exc!r}")
+                    _settle_group(item, committed=False)
+                    continue
+                needs_backfill = needs_backfill or not analyzed
+                writer.upsert_song(
+                    rel,
+                    dest.stem,
+                    duration,
+                    dest.suffix.lower().lstrip("."),
+                    metrics,
+                    analyzed,
+                    item["song_id"],
+                    file_mtime_utc=mtime,
+                    tag=item["name"],
+                )
+                if item.get("hash"):
+                    writer.set_source_hash(item["song_id"], item["hash"], item.get("pcm_hash"))
+                pending.append(item)
+                if len(pending) < batch_size and not db_queue.empty():
+                    continue
+            _flush_pending()
+    except Exception as exc:
+        logger.warning("[import] job=%s db stage failed: %s", job_id, exc)
+        _import_job_update(job_id, error=f"db:{exc!r}")
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+    if needs_backfill:
+        _analysis_backfill_wake()
+    _db_maintenance_wake()
+    with IMPORT_JOBS_LOCK:
+        job = IMPORT_JOBS.get(job_id) or {}
+        summary = (job.get("imported"), job.get("skipped"), len(job.get("errors") or []))
+    logger.info(
+        "[import] job=%s done imported=%s skipped=%s errors=%s in %.1fs",
+        job_id,
+        *summary,
+        time.monotonic() - started,
+    )
+    _import_job_update(job_id, status="done", current=None, finished_at=datetime.utcnow().isoformat() + "Z")
+
+def _start_import_job(delete_after_import: bool, analyze: bool) -> tuple[str, bool]:
+    """Queue an import of the inbox; returns (job_id, started). An active job is reused."""
     import_dir = DATA_ROOT / "import"
     try:
         import_dir.mkdir(parents=True, exist_ok=True)
     except Exception:
         import_dir = LIBRARY_IMPORT_DIR
     import_dir.mkdir(parents=True, exist_ok=True)
-    allowed = {".wav", ".mp3", ".flac", ".aiff", ".aif", ".m4a", ".aac", ".ogg"}
-    for fp in import_dir.iterdir():
-        if not fp.is_file():
-            continue
-        if fp.suffix.lower() not in allowed:
-            skipped += 1
-            continue
-        try:
-            song_id = new_song_id()
-            dest = allocate_source_path(song_id, fp.name)
-            dest.parent.mkdir(parents=True, exist_ok=True)
-            if delete_after_import:
-                fp.replace(dest)
+    with IMPORT_JOBS_LOCK:
+        for job in IMPORT_JOBS.values():
+            if job["status"] == "running":
+                # Two scans over the same inbox would import files twice.
+                return job["job_id"], False
+        items: list[dict] = []
+        skipped = 0
+        for fp in sorted(import_dir.iterdir()):
+            if not fp.is_file():
+                continue
+            if fp.suffix.lower() not in IMPORT_ALLOWED_EXTS:
+                skipped += 1
+                continue
+            items.append({"src": fp, "name": fp.name, "song_id": new_song_id(), "move": delete_after_import})
+        job_id = uuid.uuid4().hex[:12]
+        IMPORT_JOBS[job_id] = {
+            "job_id": job_id,
+            "status": "running",
+            "total": len(items),
+            "stages": {stage: 0 for stage in IMPORT_STAGES},
+            "imported": 0,
+            "skipped": skipped,
+            "duplicates": 0,
+            "errors": [],
+            "current": None,
+            "started_at": datetime.utcnow().isoformat() + "Z",
+            "seq": 0,
+        }
+        while len(IMPORT_JOBS) > IMPORT_JOBS_KEEP:
+            oldest = next(iter(IMPORT_JOBS))
+            if IMPORT_JOBS[oldest]["status"] == "running":
+                break
+            IMPORT_JOBS.pop(oldest)
+    logger.info("[import] job=%s start files=%s skipped=%s analyze=%s", job_id, len(items), skipped, analyze)
+    threading.Thread(target=_run_import_pipeline, args=(job_id, items, analyze), daemon=True).start()
+    return job_id, True
+
+@app.post("/api/library/import_scan")
+def library_import_scan(payload: dict = Body(default={})):
+    delete_after_import = payload.get("delete_after_import", True)
+    analyze = payload.get("analyze", True)
+    job_id, started = _start_import_job(bool(delete_after_import), bool(analyze))
+    with IMPORT_JOBS_LOCK:
+        snapshot = _import_job_snapshot(IMPORT_JOBS[job_id])
+    snapshot["started"] = started
+    return JSONResponse(snapshot, status_code=202)
+
+@app.get("/api/library/import_scan/{job_id}")
+def library_import_status(job_id: str):
+    with IMPORT_JOBS_LOCK:
+        job = IMPORT_JOBS.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="import_job_not_found")
+        return _import_job_snapshot(job)
+
+@app.get("/api/library/import_scan/{job_id}/events")
+async def library_import_events(job_id: str, request: Request):
+    with IMPORT_JOBS_LOCK:
+        if job_id not in IMPORT_JOBS:
+            raise HTTPException(status_code=404, detail="import_job_not_found")
+
+    async def event_stream():
+        sent = -1
+        while True:
+            if await request.is_disconnected():
+                return
+            with IMPORT_JOBS_LOCK:
+                job = IMPORT_JOBS.get(job_id)
+                snapshot = _import_job_snapshot(job) if job else None
+            if snapshot is None:
+                return
+            if snapshot["seq"] != sent:
+                yield f"id: {snapshot['seq']}\n"
+                yield f"data: {json.dumps(snapshot)}\n\n"
+                sent = snapshot["seq"]
             else:
-                shutil.copy2(fp, dest)
-            metrics = {}
-            analyzed = False
-            try:
-                metrics = _analyze_audio_metrics(dest)
-                analyzed = bool(metrics)
-            except Exception:
-                metrics = {}
-                analyzed = False
-            rel_path = rel_from_path(dest)
-            fmt = dest.suffix.lower().lstrip(".")
-            duration = metrics.get("duration_sec")
-            mtime = datetime.utcfromtimestamp(dest.stat().st_mtime).replace(microsecond=0).isoformat() + "Z"
-            library_store.upsert_song_for_source(
-                rel_path,
-                dest.stem,
-                duration,
-                fmt,
-                metrics,
-                analyzed,
-                song_id=song_id,
-                file_mtime_utc=mtime,
-            )
-            imported += 1
-        except Exception as exc:
-            errors.append(f"{fp.name}:{exc!r}")
-    return {
-        "imported": imported,
-        "skipped": skipped,
-        "errors": errors,
-    }
+                yield ": keepalive\n\n"
+            if snapshot["status"] != "running":
+                return
+            await _import_job_wait(job_id, sent, 15.0)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/api/library/use_as_source")
@@ -3942,6 +5642,10 @@ def health():
         "build_stamp": BUILD_STAMP,
         "app": "SonusTemper",
     }
+    try:
+        payload["library_db"] = library_store.db_health()
+    except Exception as exc:
+        payload["library_db"] = {"error": str(exc)}
     return JSONResponse(payload, status_code=200 if ok else 503)
 
 
@@ -4744,7 +6448,7 @@ async def analyze_upload(file: UploadFile = File(...)):
     metrics = {}
     analyzed = False
     try:
-        metrics = _analyze_audio_metrics(dest)
+        metrics = await asyncio.to_thread(_analyze_audio_metrics, dest)
         analyzed = bool(metrics)
     except Exception:
         metrics = {}
@@ -4753,7 +6457,7 @@ async def analyze_upload(file: UploadFile = File(...)):
     fmt = dest.suffix.lower().lstrip(".")
     duration = metrics.get("duration_sec")
     mtime = datetime.utcfromtimestamp(dest.stat().st_mtime).replace(microsecond=0).isoformat() + "Z"
-    song = library_store.upsert_song_for_source(
+    song = await library_async.upsert_song_for_source(
         rel_path,
         dest.stem,
         duration,
@@ -5736,15 +7440,51 @@ def _safe_upload_name(name: str) -> str:
         raise HTTPException(status_code=400, detail="invalid_filename")
     return safe
 
+def _register_upload_source(dest: Path, song_id: str, file_hash: str) -> tuple[dict, dict | None]:
+    """Store an uploaded source, deduplicating against existing library audio by content hash."""
+    dup, pcm_hash = _find_duplicate_source(file_hash, dest)
+    if dup is not None and dup["kind"] == "source" and LIBRARY_DEDUP_MODE == "reuse":
+        existing = library_store.get_song(dup["song_id"])
+        if existing:
+            shutil.rmtree(song_root(song_id), ignore_errors=True)
+            logger.info("[upload] duplicate of song=%s file=%s", dup["song_id"], dest.name)
+            return existing, {"song_id": dup["song_id"], "method": "reuse"}
+    dedup = None
+    metrics: dict = {}
+    analyzed = False
+    if dup is not None and dup["match"] == "content":
+        method = _dedup_link(dup, dest)
+        dedup = {"song_id": dup["song_id"], "version_id": dup["version_id"], "method": method or "copy"}
+        if dup["analyzed"]:
+            metrics, analyzed = dup["metrics"], True
+    mtime = datetime.utcfromtimestamp(dest.stat().st_mtime).replace(microsecond=0).isoformat() + "Z"
+    with library_store.LibraryBulkWriter() as writer:
+        writer.upsert_song(
+            rel_from_path(dest),
+            dest.stem,
+            metrics.get("duration_sec"),
+            dest.suffix.lower().lstrip("."),
+            metrics,
+            analyzed,
+            song_id,
+            file_mtime_utc=mtime,
+        )
+        writer.set_source_hash(song_id, file_hash, pcm_hash)
+    if writer.errors:
+        raise writer.errors[0][2]
+    return library_store.get_song(song_id), dedup
+
 @app.post("/api/upload")
 async def upload(files: list[UploadFile] = File(...)):
     saved = []
     saved_songs = []
+    duplicates = []
     for file in files:
         safe_name = _safe_upload_name(file.filename)
         song_id = new_song_id()
         dest = allocate_source_path(song_id, safe_name)
         size = 0
+        digest = hashlib.blake2b(digest_size=20)
         with dest.open("wb") as fout:
             while True:
                 chunk = await file.read(CHUNK_SIZE)
@@ -5755,31 +7495,15 @@ async def upload(files: list[UploadFile] = File(...)):
                     dest.unlink(missing_ok=True)
                     raise HTTPException(status_code=413, detail="file_too_large")
                 fout.write(chunk)
+                digest.update(chunk)
         saved.append(dest.name)
-        metrics = {}
-        analyzed = False
-        try:
-            metrics = _analyze_audio_metrics(dest)
-            analyzed = bool(metrics)
-        except Exception:
-            metrics = {}
-            analyzed = False
-        rel_path = rel_from_path(dest)
-        duration = metrics.get("duration_sec")
-        fmt = dest.suffix.lower().lstrip(".")
-        mtime = datetime.utcfromtimestamp(dest.stat().st_mtime).replace(microsecond=0).isoformat() + "Z"
-        song = library_store.upsert_song_for_source(
-            rel_path,
-            dest.stem,
-            duration,
-            fmt,
-            metrics,
-            analyzed,
-            song_id=song_id,
-            file_mtime_utc=mtime,
-        )
+        # Analysis is left to the backfill worker so the upload returns as soon as the file is stored.
+        song, dedup = await asyncio.to_thread(_register_upload_source, dest, song_id, digest.hexdigest())
+        if dedup:
+            duplicates.append({"file": dest.name, **dedup})
         saved_songs.append(song)
-    return JSONResponse({"message": f"Uploaded: {', '.join(saved)}", "songs": saved_songs})
+    _analysis_backfill_wake()
+    return JSONResponse({"message": f"Uploaded: {', '.join(saved)}", "songs": saved_songs, "duplicates": duplicates})
 @app.post("/api/master")
 def master(
     infile: str = Form(...),
@@ -5955,10 +7679,31 @@ def start_run(
 
 @app.get("/api/run/{run_id}")
 async def run_snapshot(run_id: str):
-    """Return the current run snapshot (events + terminal flag) for reconnects."""
+    """Return the current run snapshot (events + terminal flag + batch progress) for reconnects."""
     await status_bus.ensure_watcher(run_id)
     snap = await status_bus.snapshot(run_id)
+    snap["batch"] = _batch_snapshot(MASTER_BATCH_BY_RUN.get(run_id))
     return snap
+
+@app.post("/api/run/{run_id}/cancel")
+def run_cancel(run_id: str):
+    """Cancel one run: its ffmpeg child is killed if it is active, or it is skipped if still queued.
+    The rest of its batch keeps going; see /api/batch/{batch_id}/cancel to stop everything."""
+    batch_id = MASTER_BATCH_BY_RUN.get(run_id)
+    if not batch_id:
+        raise HTTPException(status_code=404, detail="run_not_found")
+    cancelled = _batch_cancel_run(batch_id, run_id)
+    logger.info("[master-bulk] cancel run=%s batch=%s requested=%s", run_id, batch_id, cancelled)
+    return JSONResponse({"run_id": run_id, "batch_id": batch_id, "cancelled": cancelled})
+
+@app.post("/api/batch/{batch_id}/cancel")
+def batch_cancel(batch_id: str):
+    """Cancel a whole batch: the active ffmpeg child is killed and remaining songs are skipped."""
+    if _batch_cancel_event(batch_id) is None:
+        raise HTTPException(status_code=404, detail="batch_not_found")
+    cancelled = _batch_cancel(batch_id)
+    logger.info("[master-bulk] cancel batch=%s requested=%s", batch_id, cancelled)
+    return JSONResponse({"batch_id": batch_id, "cancelled": cancelled})
 @app.post("/api/master-bulk")
 def master_bulk(
     infiles: str = Form(""),
@@ -6030,10 +7775,18 @@ def _validate_input_file(name: str) -> Path:
         raise HTTPException(status_code=400, detail="input_not_found")
     return candidate
 
-@app.post("/api/preview/start")
-def preview_start(request: Request, body: dict = Body(...), background_tasks: BackgroundTasks = None):
-    if not isinstance(body, dict):
-        raise HTTPException(status_code=400, detail="invalid_payload")
+def _preview_source_lufs(rel: str) -> float | None:
+    """Stored integrated loudness of a library source (song_metrics) or rendition (version_metrics)."""
+    try:
+        song, version = _library_lookup_rel(rel)
+    except Exception:
+        return None
+    metrics = (version or {}).get("metrics") if version else ((song or {}).get("source") or {}).get("metrics")
+    val = (metrics or {}).get("lufs_i")
+    return float(val) if isinstance(val, (int, float)) else None
+
+def _preview_params_from_body(body: dict) -> dict:
+    """Validate and normalize preview render parameters from a request body."""
     song = (body.get("song") or "").strip()
     voicing = (body.get("voicing") or "universal").strip()
     voicing_data = body.get("voicing_data")
@@ -6043,6 +7796,11 @@ def preview_start(request: Request, body: dict = Body(...), background_tasks: Ba
     lufs = body.get("lufs", None)
     tp = body.get("tp", None)
     start_s = body.get("start", None)
+    normalize = PREVIEW_NORMALIZE_MODE
+    if body.get("normalize"):
+        normalize = str(body["normalize"]).strip().lower()
+        if normalize not in PREVIEW_NORMALIZE_MODES:
+            raise HTTPException(status_code=400, detail="invalid_normalize")
     try:
         strength_val = int(strength)
     except Exception:
@@ -6079,79 +7837,162 @@ def preview_start(request: Request, body: dict = Body(...), background_tasks: Ba
     if not voicing_data and not _preview_find_voicing_path(voicing):
         raise HTTPException(status_code=400, detail="invalid_voicing")
     safe_in = _validate_input_file(song)
-    session_key = _preview_session_key(request)
-    preview_id = uuid.uuid4().hex
-    voicing_key = json.dumps(voicing_data, sort_keys=True) if voicing_data else voicing
-    params_raw = f"{song}|{voicing_key}|{strength_val}|{width}|{guardrails}|{lufs}|{tp}|{start_s}"
-    params_hash = hashlib.sha256(params_raw.encode("utf-8")).hexdigest()
-    event = threading.Event()
+    return {
+        "input_path": str(safe_in),
+        "voicing": voicing,
+        "voicing_data": voicing_data,
+        "strength": strength_val,
+        "width": width,
+        "guardrails": guardrails,
+        "lufs": lufs,
+        "tp": tp,
+        "start_s": start_s,
+        "normalize": normalize,
+        "source_lufs": _preview_source_lufs(song) if normalize == "matched" else None,
+    }
 
-    _preview_cleanup(session_key)
+def _preview_register(session_key: str, params: dict, *, prefetch: bool = False,
+                      batch_id: str | None = None) -> tuple[str, str]:
+    """Create a session-scoped registry entry; cache hits are linked in and start out 'ready'."""
+    preview_id = uuid.uuid4().hex
+    params_hash = _preview_params_hash(params)
+    cached = _preview_cache_lookup(params_hash)
+    file_path = None
+    if cached is not None:
+        PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+        try:
+            _preview_link(cached, PREVIEW_DIR / f"{preview_id}.mp3")
+            file_path = str(PREVIEW_DIR / f"{preview_id}.mp3")
+        except OSError:
+            file_path = None
+    status = "ready" if file_path else "building"
     with PREVIEW_LOCK:
         PREVIEW_REGISTRY[preview_id] = {
             "session_key": session_key,
             "created_at": time.time(),
-            "status": "building",
-            "file_path": None,
+            "status": status,
+            "file_path": file_path,
             "mime": "audio/mpeg",
             "params_hash": params_hash,
             "error_msg": None,
-            "input_path": str(safe_in),
-            "voicing": voicing,
-            "voicing_data": voicing_data,
-            "strength": strength_val,
-            "width": width,
-            "guardrails": guardrails,
-            "lufs": lufs,
-            "tp": tp,
-            "start_s": start_s,
-            "event": event,
+            **params,
+            "prefetch": prefetch,
+            "batch_id": batch_id,
+            "cancel": threading.Event(),
         }
         queue = PREVIEW_SESSION_INDEX.setdefault(session_key, deque())
         queue.append(preview_id)
+    return preview_id, status
+
+@app.post("/api/preview/start")
+def preview_start(request: Request, body: dict = Body(...), background_tasks: BackgroundTasks = None):
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="invalid_payload")
+    params = _preview_params_from_body(body)
+    prefetch = bool(body.get("prefetch", False))
+    session_key = _preview_session_key(request)
+    _preview_prefetch_drop(session_key)
+    _preview_cleanup(session_key)
+    preview_id, status = _preview_register(session_key, params, prefetch=prefetch)
+    superseded = _preview_supersede(session_key, params["input_path"], {preview_id})
+    if superseded:
+        logger.debug("[preview] superseded=%s by id=%s", superseded, preview_id)
     _preview_cleanup(session_key)
 
     if background_tasks is None:
         background_tasks = BackgroundTasks()
+    song_name = Path(params["input_path"]).name
+    if status == "ready":
+        if prefetch and PREVIEW_PREFETCH_ENABLED:
+            background_tasks.add_task(_preview_prefetch_schedule, session_key, params)
+        logger.debug("[preview] cache hit id=%s song=%s", preview_id, song_name)
+        return JSONResponse({"preview_id": preview_id, "status": status})
     background_tasks.add_task(_render_preview, preview_id)
-    logger.debug("[preview] start id=%s song=%s", preview_id, safe_in.name)
+    logger.debug("[preview] start id=%s song=%s", preview_id, song_name)
     return JSONResponse({"preview_id": preview_id, "status": "building"})
 
+@app.post("/api/preview/batch")
+def preview_batch(request: Request, body: dict = Body(...), background_tasks: BackgroundTasks = None):
+    """Render several voicings/strengths of one input window from a single decode and ffmpeg process.
+    Each variant gets its own preview_id for /api/preview/stream and /api/preview/file."""
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="invalid_payload")
+    voicings = body.get("voicings")
+    strengths = body.get("strengths")
+    if voicings is not None and not isinstance(voicings, list):
+        raise HTTPException(status_code=400, detail="invalid_voicings")
+    if strengths is not None and not isinstance(strengths, list):
+        raise HTTPException(status_code=400, detail="invalid_strengths")
+    if not voicings and not strengths:
+        raise HTTPException(status_code=400, detail="no_variants")
+    variants = []
+    for voicing in voicings or [None]:
+        for strength in strengths or [None]:
+            variant = dict(body)
+            if voicing is not None:
+                variant["voicing"] = voicing
+                variant["voicing_data"] = None
+            if strength is not None:
+                variant["strength"] = strength
+            variants.append(variant)
+    if len(variants) > PREVIEW_BATCH_MAX:
+        raise HTTPException(status_code=400, detail="too_many_variants")
+    params_list = [_preview_params_from_body(variant) for variant in variants]
+    session_key = _preview_session_key(request)
+    _preview_prefetch_drop(session_key)
+    _preview_cleanup(session_key)
+    batch_id = uuid.uuid4().hex[:12]
+    items = []
+    pending = []
+    for params in params_list:
+        preview_id, status = _preview_register(session_key, params, batch_id=batch_id)
+        items.append({
+            "preview_id": preview_id,
+            "voicing": params["voicing"],
+            "strength": params["strength"],
+            "status": status,
+        })
+        if status == "building":
+            pending.append(preview_id)
+    _preview_supersede(session_key, params_list[0]["input_path"], {item["preview_id"] for item in items})
+    _preview_cleanup(session_key)
+    if pending:
+        if background_tasks is None:
+            background_tasks = BackgroundTasks()
+        background_tasks.add_task(_render_preview_batch, pending)
+    logger.debug("[preview] batch id=%s variants=%s rendering=%s", batch_id, len(items), len(pending))
+    return JSONResponse({"batch_id": batch_id, "items": items})
+
 @app.get("/api/preview/stream")
-def preview_stream(request: Request, preview_id: str):
+async def preview_stream(request: Request, preview_id: str):
     session_key = _preview_session_key(request)
     with PREVIEW_LOCK:
         entry = PREVIEW_REGISTRY.get(preview_id)
         if not entry or entry.get("session_key") != session_key:
             raise HTTPException(status_code=404, detail="preview_not_found")
+    url = f"/api/preview/file?preview_id={quote(preview_id)}"
 
-    def event_stream():
-        with PREVIEW_LOCK:
-            current = PREVIEW_REGISTRY.get(preview_id, {})
-            status = current.get("status") or "error"
-            url = f"/api/preview/file?preview_id={quote(preview_id)}" if status == "ready" else None
-        yield f"data: {json.dumps({'status': status, 'url': url})}\n\n"
-        if status in ("ready", "error"):
-            return
-        done_event = current.get("event")
-        if isinstance(done_event, threading.Event):
-            done_event.wait(timeout=PREVIEW_TTL_SEC)
-        with PREVIEW_LOCK:
-            current = PREVIEW_REGISTRY.get(preview_id, {})
-            status = current.get("status") or "error"
-            if status not in ("ready", "error"):
+    async def event_stream():
+        deadline = time.monotonic() + PREVIEW_TTL_SEC
+        sent = None
+        while True:
+            with PREVIEW_LOCK:
+                current = PREVIEW_REGISTRY.get(preview_id, {})
+                status = current.get("status") or "error"
+            if status not in PREVIEW_TERMINAL_STATUSES and time.monotonic() >= deadline:
+                _preview_update(preview_id, "error", error_msg="preview_timeout")
                 status = "error"
-                current["status"] = "error"
-                current["error_msg"] = current.get("error_msg") or "preview_timeout"
-                done_event = current.get("event")
-                if isinstance(done_event, threading.Event):
-                    done_event.set()
-            payload = {"status": status}
-            if status == "ready":
-                payload["url"] = f"/api/preview/file?preview_id={quote(preview_id)}"
-            if status == "error":
-                payload["message"] = current.get("error_msg") or "preview_failed"
-        yield f"data: {json.dumps(payload)}\n\n"
+            if status != sent:
+                # 'streaming' already carries a playable URL; the stream stays open for the final status.
+                payload = {"status": status, "url": url if status in ("ready", "streaming") else None}
+                if status == "error":
+                    with PREVIEW_LOCK:
+                        payload["message"] = (PREVIEW_REGISTRY.get(preview_id) or {}).get("error_msg") or "preview_failed"
+                yield f"data: {json.dumps(payload)}\n\n"
+                sent = status
+            if status in PREVIEW_TERMINAL_STATUSES:
+                return
+            await _preview_wait_change(preview_id, status, max(0.0, deadline - time.monotonic()))
 
     return StreamingResponse(
         event_stream(),
@@ -6159,6 +8000,40 @@ def preview_stream(request: Request, preview_id: str):
         headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
     )
 
+@app.post("/api/preview/cancel")
+def preview_cancel(request: Request, body: dict = Body(...)):
+    preview_id = str((body or {}).get("preview_id") or "").strip() if isinstance(body, dict) else ""
+    session_key = _preview_session_key(request)
+    with PREVIEW_LOCK:
+        entry = PREVIEW_REGISTRY.get(preview_id)
+        if not entry or entry.get("session_key") != session_key:
+            raise HTTPException(status_code=404, detail="preview_not_found")
+    cancelled = _preview_cancel(preview_id)
+    with PREVIEW_LOCK:
+        status = (PREVIEW_REGISTRY.get(preview_id) or {}).get("status") or "cancelled"
+    logger.debug("[preview] cancel id=%s cancelled=%s", preview_id, cancelled)
+    return JSONResponse({"preview_id": preview_id, "status": status, "cancelled": cancelled})
+
+async def _preview_tail(preview_id: str, fp: Path):
+    """Relay a preview MP3 while the encoder is still appending to it (growing-file reader)."""
+    with fp.open("rb") as fh:
+        while True:
+            chunk = fh.read(PREVIEW_STREAM_CHUNK * 4)
+            if chunk:
+                yield chunk
+                continue
+            with PREVIEW_LOCK:
+                status = (PREVIEW_REGISTRY.get(preview_id) or {}).get("status")
+            if status == "streaming":
+                await asyncio.sleep(PREVIEW_STREAM_POLL_SEC)
+                continue
+            if status == "ready":
+                # Drain anything written between the last read and the status flip.
+                rest = fh.read()
+                if rest:
+                    yield rest
+            return
+
 @app.get("/api/preview/file")
 def preview_file(request: Request, preview_id: str):
     session_key = _preview_session_key(request)
@@ -6166,7 +8041,8 @@ def preview_file(request: Request, preview_id: str):
         entry = PREVIEW_REGISTRY.get(preview_id)
         if not entry or entry.get("session_key") != session_key:
             raise HTTPException(status_code=404, detail="preview_not_found")
-        if entry.get("status") != "ready":
+        status = entry.get("status")
+        if status not in ("ready", "streaming"):
             raise HTTPException(status_code=404, detail="preview_not_ready")
         path = entry.get("file_path")
         mime = entry.get("mime") or "audio/mpeg"
@@ -6175,6 +8051,12 @@ def preview_file(request: Request, preview_id: str):
     fp = Path(path)
     if PREVIEW_DIR.resolve() not in fp.resolve().parents or not fp.exists():
         raise HTTPException(status_code=404, detail="preview_missing")
+    if status == "streaming":
+        return StreamingResponse(
+            _preview_tail(preview_id, fp),
+            media_type=mime,
+            headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+        )
     resp = FileResponse(fp, media_type=mime, filename=f"preview-{preview_id}.mp3")
     resp.headers["Cache-Control"] = "no-store"
     return resp
@@ -1,4 +1,5 @@
 import os
+import hashlib
 import logging
 import re
 import shutil
@@ -254,3 +255,67 @@ def resolve_rel(rel: str) -> Path:
     if target != root and root not in target.parents:
         raise ValueError("invalid_path")
     return target
+
+
+CONTENT_HASH_CHUNK = 1024 * 1024
+# FICLONE from linux/fs.h: share extents copy-on-write (btrfs, XFS, bcachefs).
+_FICLONE = 0x40049409
+
+
+def content_hash(path: Path) -> str:
+    """Streaming BLAKE2b fingerprint of a file's bytes (hex, 160 bits)."""
+    digest = hashlib.blake2b(digest_size=20)
+    with path.open("rb") as handle:
+        while True:
+            chunk = handle.read(CONTENT_HASH_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(src: Path, dest: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with src.open("rb") as fin, dest.open("wb") as fout:
+            fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+    except OSError:
+        dest.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def link_or_copy(src: Path, dest: Path, mode: str = "reflink") -> str:
+    """Materialize src at dest without duplicating data where the filesystem allows.
+
+    mode "reflink" tries a copy-on-write clone and falls back to a copy; "hardlink" shares the
+    inode (in-place writes then show through both paths, see unshare_file); anything else
+    copies. Returns the method that was used.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if mode == "reflink" and _reflink(src, dest):
+        return "reflink"
+    if mode == "hardlink":
+        try:
+            os.link(src, dest)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copy2(src, dest)
+    return "copy"
+
+
+def unshare_file(path: Path) -> bool:
+    """Give a hardlinked file its own inode before it is modified in place; True if it was split."""
+    try:
+        if path.stat().st_nlink <= 1:
+            return False
+    except OSError:
+        return False
+    tmp = path.with_name(path.name + ".unshare")
+    shutil.copy2(path, tmp)
+    os.replace(tmp, path)
+    return True
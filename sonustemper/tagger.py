@@ -25,6 +25,8 @@ from mutagen.id3 import (
     APIC,
 )
 
+from .storage import unshare_file
+
 
 class TaggerService:
     """Backend-only MP3 tagger service (no subprocess usage)."""
@@ -374,7 +376,7 @@ class TaggerService:
         )
         id3.add(apic)
         try:
-            id3.save(path)
+            self._save_id3(id3, path)
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"failed_to_write_artwork: {exc}") from exc
         return {
@@ -398,7 +400,7 @@ class TaggerService:
                     except Exception:
                         pass
         try:
-            id3.save(path)
+            self._save_id3(id3, path)
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"failed_to_clear_artwork: {exc}") from exc
         return {"id": entry["id"], "artwork": {"present": False}}
@@ -467,6 +469,12 @@ class TaggerService:
             "artwork": {"present": bool(artwork_present)},
         }
 
+    @staticmethod
+    def _save_id3(id3: ID3, path: Path) -> None:
+        # ID3 saves rewrite the file in place; a dedup hardlink must not carry the edit to another song.
+        unshare_file(path)
+        id3.save(path)
+
     def write_tags(self, path: Path, tags: Dict) -> Dict:
         if tags is None or not isinstance(tags, dict):
             raise HTTPException(status_code=400, detail="invalid_payload")
@@ -508,7 +516,7 @@ class TaggerService:
             else:
                 id3.setall("COMM", [COMM(encoding=3, lang="eng", desc="", text=[val])])
         try:
-            id3.save(path)
+            self._save_id3(id3, path)
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"failed_to_write_tags: {exc}") from exc
         return self.read_tags(path)